@@ -0,0 +1,350 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Caches shared by the aodh command line invocations and API clients."""
+
+import collections
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+
+def default_path(filename):
+    """Return the path of a cache file in the user cache directory."""
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'aodhclient', filename)
+
+
+class FileCache:
+    """Key/value cache persisted in a JSON file.
+
+    The file is only readable by its owner and is replaced atomically on
+    each change, so concurrent processes never read a partial file. Keys
+    are strings and values must be serializable in JSON.
+
+    :param path: path of the cache file
+    :type path: str
+    :param ttl: default number of seconds an entry is valid
+    :type ttl: float
+    :param maxsize: maximum number of entries, the entries expiring first
+                    are evicted when it is reached
+    :type maxsize: int
+    """
+
+    def __init__(self, path, ttl=3600, maxsize=None):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        now = time.time()
+        return {k: v for k, v in entries.items()
+                if isinstance(v, list) and len(v) == 2 and v[0] > now}
+
+    def _save(self, entries):
+        if self.maxsize is not None and len(entries) > self.maxsize:
+            keep = sorted(entries.items(), key=lambda kv: kv[1][0],
+                          reverse=True)[:self.maxsize]
+            entries = dict(keep)
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key, default=None):
+        entry = self._load().get(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key, value, ttl=None):
+        entries = self._load()
+        ttl = self.ttl if ttl is None else ttl
+        entries[key] = [time.time() + ttl, value]
+        self._save(entries)
+
+    def delete(self, key):
+        entries = self._load()
+        if entries.pop(key, None) is not None:
+            self._save(entries)
+
+    def delete_value(self, value):
+        """Delete all the entries having the value."""
+        entries = self._load()
+        kept = {k: v for k, v in entries.items() if v[1] != value}
+        if len(kept) != len(entries):
+            self._save(kept)
+
+    def delete_prefix(self, prefix):
+        """Delete all the entries whose key starts with the prefix."""
+        entries = self._load()
+        kept = {k: v for k, v in entries.items() if not k.startswith(prefix)}
+        if len(kept) != len(entries):
+            self._save(kept)
+
+    def clear(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class MemoryCache:
+    """Thread-safe key/value cache kept in memory.
+
+    It has the same interface as :py:class:`FileCache`, but entries are
+    only shared within the process.
+
+    :param ttl: default number of seconds an entry is valid
+    :type ttl: float
+    :param maxsize: maximum number of entries, the least recently used
+                    entries are evicted when it is reached
+    :type maxsize: int
+    """
+
+    def __init__(self, ttl=3600, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_value(self, value):
+        """Delete all the entries having the value."""
+        with self._lock:
+            for key in [k for k, v in self._entries.items()
+                        if v[1] == value]:
+                del self._entries[key]
+
+    def delete_prefix(self, prefix):
+        """Delete all the entries whose key starts with the prefix."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class AuthCache:
+    """On-disk cache of the keystone authentication state.
+
+    The token and the service catalog obtained by an authentication plugin
+    are stored until the token expires, so the next invocations with the
+    same credentials reuse them instead of authenticating again. Entries
+    are keyed by the plugin cache ID, a hash of the auth URL, user,
+    project and secrets of the plugin.
+
+    It is enabled by setting the AODH_AUTH_CACHE environment variable to
+    a true value.
+    """
+
+    ENV = 'AODH_AUTH_CACHE'
+
+    def __init__(self, path=None):
+        self.cache = FileCache(path or default_path('auth.json'),
+                               maxsize=100)
+        self._loaded = {}
+
+    @classmethod
+    def from_env(cls):
+        value = os.environ.get(cls.ENV, '').strip().lower()
+        if value in ('1', 't', 'true', 'on', 'y', 'yes'):
+            return cls()
+
+    def _is_trusted(self):
+        # NOTE: the catalog of the cached state decides where the requests
+        # and the token are sent, never use a file others could write.
+        try:
+            st = os.stat(self.cache.path)
+        except OSError:
+            return False
+        return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+    def load(self, auth_plugin):
+        """Install the cached state in the plugin, if any.
+
+        :return: True if a cached state has been installed
+        """
+        cache_id = auth_plugin.get_cache_id()
+        if (cache_id is None or getattr(auth_plugin, 'auth_ref', None)
+                or not self._is_trusted()):
+            return False
+        state = self.cache.get(cache_id)
+        if state is None:
+            return False
+        auth_plugin.set_auth_state(state)
+        self._loaded[cache_id] = state
+        return True
+
+    def save(self, auth_plugin):
+        """Store the state of the plugin until its token expires."""
+        cache_id = auth_plugin.get_cache_id()
+        if cache_id is None:
+            return
+        state = auth_plugin.get_auth_state()
+        expires = getattr(getattr(auth_plugin, 'auth_ref', None),
+                          'expires', None)
+        if not state or expires is None or self._loaded.get(cache_id) == state:
+            return
+        ttl = expires.timestamp() - time.time()
+        if ttl <= 0:
+            return
+        try:
+            self.cache.set(cache_id, state, ttl=ttl)
+        except OSError as e:
+            LOG.warning("Unable to save the authentication cache: %s", e)
+            return
+        self._loaded[cache_id] = state
+
+
+class CachedResponse:
+    """Response rebuilt from an entry of a :py:class:`ResponseCache`."""
+
+    def __init__(self, url, entry, headers=None):
+        self.url = url
+        self.status_code = 200
+        self.reason = 'OK'
+        self.ok = True
+        self.headers = headers if headers is not None else {}
+        self.headers.update(entry['headers'])
+        self.text = entry['body']
+        self.content = self.text.encode('utf-8')
+
+    def json(self, **kwargs):
+        return json.loads(self.text, **kwargs)
+
+
+class ResponseCache:
+    """HTTP cache of the responses to GET requests.
+
+    The body of the responses having an ETag or a Last-Modified header is
+    stored, and the next GET requests of the same URL are sent with an
+    If-None-Match or If-Modified-Since header. When the server answers 304
+    Not Modified, the stored body is returned instead of being downloaded
+    and parsed again. Responses without any of these validators are not
+    stored, so their URLs are requested as usual.
+
+    Writes (POST, PUT, PATCH and DELETE) forget the entries of the
+    collection they modify. Entries are scoped by API endpoint and project.
+
+    :param backend: storage of the entries, a :py:class:`MemoryCache` with
+                    up to `maxsize` entries by default, or a
+                    :py:class:`FileCache` to share it between processes
+    :param ttl: number of seconds an entry is kept
+    :type ttl: float
+    :param maxsize: maximum number of entries of the default backend
+    :type maxsize: int
+    """
+
+    def __init__(self, backend=None, ttl=300, maxsize=256):
+        self.backend = backend or MemoryCache(ttl=ttl, maxsize=maxsize)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scope(api):
+        return '|'.join([api.get_endpoint() or '',
+                         api.get_project_id() or '', ''])
+
+    @staticmethod
+    def _collection(url):
+        # NOTE: v2/alarms/<id>/state belongs to the v2/alarms collection
+        parts = url.split('?', 1)[0].strip('/').split('/')
+        return '/'.join(parts[:2])
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, api, url, headers=None, **kwargs):
+        """Send a conditional GET request through the API adapter."""
+        key = self._scope(api) + url
+        entry = self.backend.get(key)
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        resp = api.get(url, headers=headers, **kwargs)
+        if resp.status_code == 304 and entry is not None:
+            self._count(hit=True)
+            return CachedResponse(url, entry, resp.headers)
+        self._count(hit=False)
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if resp.status_code != 200 or not (etag or last_modified):
+            if entry is not None:
+                self.backend.delete(key)
+            return resp
+        content_type = resp.headers.get('Content-Type')
+        self.backend.set(key, {
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': {'Content-Type': content_type} if content_type else {},
+            'body': resp.text,
+        }, ttl=self.ttl)
+        return resp
+
+    def invalidate(self, api, url):
+        """Forget the entries of the collection the URL belongs to."""
+        # NOTE: Last-Modified has a one second resolution, a change done in
+        # the same second as the cached read would otherwise go unnoticed.
+        self.backend.delete_prefix(self._scope(api) + self._collection(url))
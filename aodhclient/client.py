@@ -10,11 +10,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import socket
+import threading
+import time
+
 from keystoneauth1 import adapter
+from keystoneauth1 import session as ks_session
 from oslo_utils import importutils
-from osprofiler import web
 
 from aodhclient import exceptions
+from aodhclient import tracing
+
+# NOTE: the default pool size of requests
+DEFAULT_POOL_MAXSIZE = 10
 
 
 def Client(version, *args, **kwargs):
@@ -24,14 +32,125 @@ def Client(version, *args, **kwargs):
     return client_class(*args, **kwargs)
 
 
+class _NoKeepAliveAdapter(ks_session.TCPKeepAliveAdapter):
+    """Adapter keeping Nagle's algorithm off but without TCP keep-alive."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault('socket_options',
+                          [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)])
+        super().init_poolmanager(*args, **kwargs)
+
+
+def configure_connection_pool(session, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                              pool_block=False, keep_alive=True):
+    """Configure the HTTP connection pool of a keystoneauth session.
+
+    All the clients using the session, for example several clients of a
+    long-running service built with the same session, share the pool.
+
+    :param session: the session to configure
+    :type session: :py:class:`keystoneauth1.session.Session`
+    :param pool_maxsize: maximum number of connections kept open per host.
+                         Requests beyond it open connections that are closed
+                         after use, unless pool_block is set.
+    :type pool_maxsize: int
+    :param pool_block: wait for a pooled connection to be available instead
+                       of opening a new one when the pool is full.
+    :type pool_block: bool
+    :param keep_alive: send TCP keep-alive probes on idle connections.
+    :type keep_alive: bool
+    """
+    requests_session = getattr(session, 'session', None)
+    if requests_session is None:
+        return
+    adapter_class = (ks_session.TCPKeepAliveAdapter if keep_alive
+                     else _NoKeepAliveAdapter)
+    for scheme in ('https://', 'http://'):
+        current = requests_session.get_adapter(scheme)
+        # Keep the TLS settings of the keystoneauth adapter, if any
+        tls_options = {k: getattr(current, k)
+                       for k in ('tls_ciphers', 'tls_min_version')
+                       if getattr(current, k, None)}
+        requests_session.mount(scheme, adapter_class(
+            pool_connections=pool_maxsize, pool_maxsize=pool_maxsize,
+            pool_block=pool_block, max_retries=current.max_retries,
+            **tls_options))
+
+
+def create_session(auth=None, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                   pool_block=False, keep_alive=True, **kwargs):
+    """Create a keystoneauth session with a configured connection pool.
+
+    The session can be shared by several clients, they then reuse the same
+    authentication and connections::
+
+        session = client.create_session(auth=auth, pool_maxsize=50)
+        aodh = client.Client('2', session=session)
+        other_aodh = client.Client('2', session=session, region_name='r2')
+
+    :param auth: the authentication plugin
+    :param kwargs: other arguments of
+                   :py:class:`keystoneauth1.session.Session`
+    See :py:func:`configure_connection_pool` for the other arguments.
+    """
+    session = ks_session.Session(auth=auth, **kwargs)
+    configure_connection_pool(session, pool_maxsize, pool_block, keep_alive)
+    return session
+
+
 class SessionClient(adapter.Adapter):
+    """keystoneauth adapter raising the aodhclient exceptions.
+
+    :param retry_policy: policy retrying the requests rejected by a rate
+                         limit or an unavailable server, they are not
+                         retried by default
+    :type retry_policy: :py:class:`aodhclient.retry.RetryPolicy`
+    :param rate_limiter: limiter delaying the requests to keep their rate
+                         under the configured limits
+    :type rate_limiter: :py:class:`aodhclient.ratelimit.RateLimiter`
+    """
+
+    def __init__(self, *args, retry_policy=None, rate_limiter=None,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self._wait_times = threading.local()
+
+    @property
+    def wait_time(self):
+        """Seconds the requests of the thread waited before being sent.
+
+        It is the time spent in the rate limiter and before the retries, it
+        only increases.
+        """
+        return getattr(self._wait_times, 'total', 0.0)
+
+    def _waited(self, since):
+        self._wait_times.total = self.wait_time + time.monotonic() - since
+
     def request(self, url, method, **kwargs):
         kwargs.setdefault('headers', kwargs.get('headers', {}))
         # NOTE(sileht): The standard call raises errors from
         # keystoneauth, where we need to raise the aodhclient errors.
         raise_exc = kwargs.pop('raise_exc', True)
-        kwargs['headers'].update(web.get_trace_id_headers())
-        resp = super().request(url, method, raise_exc=False, **kwargs)
+        kwargs['headers'].update(tracing.get_trace_id_headers())
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                since = time.monotonic()
+                self.rate_limiter.acquire(method, url)
+                self._waited(since)
+            resp = super().request(url, method, raise_exc=False, **kwargs)
+            if resp.status_code < 400 or self.retry_policy is None:
+                break
+            since = time.monotonic()
+            retry = self.retry_policy.wait(method, resp, attempt, started_at)
+            self._waited(since)
+            if not retry:
+                break
+            attempt += 1
 
         if raise_exc and resp.status_code >= 400:
             raise exceptions.from_response(resp, url, method)
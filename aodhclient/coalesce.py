@@ -0,0 +1,106 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Coalescing of the identical requests sent at the same time."""
+
+import threading
+import time
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """Share the result of identical calls running at the same time.
+
+    The first call of a key runs the function, the calls of the same key
+    made until it returns wait for it and get its result, or its error,
+    instead of running the function again. With a TTL, results are also
+    reused by the calls made within that number of seconds, which absorbs
+    bursts of calls made one after the other.
+
+    The ``calls``, ``coalesced`` and ``cached`` counters report the number
+    of calls, of calls sharing the result of a call in flight and of calls
+    served by a recent result.
+
+    :param ttl: number of seconds a result is reused, 0 to only share the
+                results of the calls in flight
+    :type ttl: float
+    :param maxsize: maximum number of recent results kept
+    :type maxsize: int
+    """
+
+    def __init__(self, ttl=0, maxsize=1000):
+        if ttl < 0:
+            raise ValueError("The TTL cannot be negative, not %s" % ttl)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.calls = 0
+        self.coalesced = 0
+        self.cached = 0
+        self._in_flight = {}
+        self._recent = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, key, result):
+        now = time.monotonic()
+        for k in [k for k, v in self._recent.items() if v[0] <= now]:
+            del self._recent[k]
+        if len(self._recent) >= self.maxsize:
+            oldest = min(self._recent, key=lambda k: self._recent[k][0])
+            del self._recent[oldest]
+        self._recent[key] = (now + self.ttl, result)
+
+    def clear(self):
+        """Forget the recent results, the calls in flight are kept."""
+        with self._lock:
+            self._recent.clear()
+
+    def call(self, key, func, *args, **kwargs):
+        """Call func(*args, **kwargs), or share the result of its key."""
+        with self._lock:
+            self.calls += 1
+            recent = self._recent.get(key)
+            if recent is not None and recent[0] > time.monotonic():
+                self.cached += 1
+                return recent[1]
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if self.ttl and flight.error is None:
+                    self._remember(key, flight.result)
+            flight.done.set()
+        return flight.result
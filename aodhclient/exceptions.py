@@ -11,6 +11,30 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+from email import utils as email_utils
+import math
+
+
+def parse_retry_after(value):
+    """Return the number of seconds to wait asked by a Retry-After header.
+
+    The header is either a number of seconds or an HTTP date, 0 is
+    returned if it is invalid or in the past.
+    """
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        date = email_utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    delay = (date - datetime.datetime.now(datetime.timezone.utc))
+    return max(0, math.ceil(delay.total_seconds()))
+
 
 class ClientException(Exception):
     """The base exception class for all exceptions this library raises."""
@@ -41,10 +65,7 @@ class ClientException(Exception):
 class RetryAfterException(ClientException):
     """The base exception for ClientExceptions that use Retry-After header."""
     def __init__(self, *args, **kwargs):
-        try:
-            self.retry_after = int(kwargs.pop('retry_after'))
-        except (KeyError, ValueError):
-            self.retry_after = 0
+        self.retry_after = parse_retry_after(kwargs.pop('retry_after', 0))
 
         super().__init__(*args, **kwargs)
 
@@ -120,6 +141,15 @@ class RateLimit(RetryAfterException):
     message = "Rate limit"
 
 
+class ServiceUnavailable(RetryAfterException):
+    """HTTP 503 - Service Unavailable:
+
+    the server is overloaded or down for maintenance.
+    """
+    http_status = 503
+    message = "Service Unavailable"
+
+
 class NoUniqueMatch(Exception):
     pass
 
@@ -135,7 +165,7 @@ class NotImplemented(ClientException):
 
 _error_classes = [BadRequest, Unauthorized, Forbidden, NotFound,
                   MethodNotAllowed, NotAcceptable, Conflict, OverLimit,
-                  RateLimit, NotImplemented]
+                  RateLimit, NotImplemented, ServiceUnavailable]
 _error_classes_enhanced = {}
 _code_map = {
     c.http_status: (c, _error_classes_enhanced.get(c, []))
@@ -165,7 +195,8 @@ def from_response(response, url, method=None):
         'request_id': req_id,
     }
 
-    if "retry-after" in response.headers:
+    if ("retry-after" in response.headers and
+            issubclass(cls, RetryAfterException)):
         kwargs['retry_after'] = response.headers.get('retry-after')
 
     if content_type == "application/json":
@@ -14,8 +14,12 @@
 
 """OpenStackClient plugin for Telemetry Alarming service."""
 
+import atexit
+
 from osc_lib import utils
 
+from aodhclient import cache
+
 
 DEFAULT_ALARMING_API_VERSION = '2'
 API_VERSION_OPTION = 'os_alarming_api_version'
@@ -39,6 +43,13 @@ def make_client(instance):
         API_VERSIONS)
     # NOTE(sileht): ensure setup of the session is done
     instance.setup_auth()
+    # NOTE: openstackclient usually authenticates before loading the
+    # plugin, the cache then only saves the token for the next runs of
+    # the aodh command.
+    auth_cache = cache.AuthCache.from_env()
+    if auth_cache is not None:
+        auth_cache.load(instance.auth)
+        atexit.register(auth_cache.save, instance.auth)
     return aodh_client(session=instance.session,
                        interface=instance.interface,
                        region_name=instance.region_name)
@@ -0,0 +1,148 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Client side limit of the rate of requests sent to the API."""
+
+import threading
+import time
+
+HTTP_METHODS = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class TokenBucket:
+    """Token bucket refilled at a constant rate.
+
+    :param rate: number of tokens added per second
+    :type rate: float
+    :param burst: maximum number of tokens, that is the number of requests
+                  that can be sent at once after an idle period
+    :type burst: float
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("The rate must be positive, not %s" % rate)
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before using it.
+
+        Tokens are reserved in the calling order, so concurrent callers
+        are served fairly.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens +
+                               (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Limit the rate of requests, globally, per method and per endpoint.
+
+    A request waits until it fits in all the limits that apply to it. A
+    limiter can be shared by several clients and threads, for example the
+    workers of a bulk operation.
+
+    :param rate: maximum number of requests per second, None for no limit
+    :type rate: float
+    :param method_rates: maximum number of requests per second for HTTP
+                         methods, for example {'PUT': 5}
+    :type method_rates: dict
+    :param endpoint_rates: maximum number of requests per second for the
+                           URLs starting with a prefix, relative to the API
+                           endpoint, for example {'v2/alarms': 10}. Only the
+                           longest matching prefix applies.
+    :type endpoint_rates: dict
+    :param burst: number of requests that can be sent at once after an idle
+                  period for each limit
+    :type burst: float
+    """
+
+    def __init__(self, rate=None, method_rates=None, endpoint_rates=None,
+                 burst=1):
+        self._bucket = (TokenBucket(rate, burst) if rate is not None
+                        else None)
+        self._method_buckets = {
+            method.upper(): TokenBucket(r, burst)
+            for method, r in (method_rates or {}).items()}
+        self._endpoint_buckets = sorted(
+            ((prefix.lstrip('/'), TokenBucket(r, burst))
+             for prefix, r in (endpoint_rates or {}).items()),
+            key=lambda pb: len(pb[0]), reverse=True)
+        self.waits = 0
+        self.wait_time = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sleep(delay):
+        time.sleep(delay)
+
+    def _buckets(self, method, url):
+        if self._bucket is not None:
+            yield self._bucket
+        bucket = self._method_buckets.get(method.upper())
+        if bucket is not None:
+            yield bucket
+        url = url.lstrip('/')
+        for prefix, bucket in self._endpoint_buckets:
+            if url.startswith(prefix):
+                yield bucket
+                break
+
+    def acquire(self, method, url):
+        """Wait until a request can be sent.
+
+        :param method: HTTP method of the request
+        :param url: URL of the request, relative to the API endpoint
+        """
+        delay = max([b.reserve() for b in self._buckets(method, url)],
+                    default=0)
+        if delay > 0:
+            self._sleep(delay)
+            with self._lock:
+                self.waits += 1
+                self.wait_time += delay
+
+    @classmethod
+    def from_specs(cls, specs, burst=1):
+        """Build a limiter from a list of [KEY=]RATE strings.
+
+        KEY is either an HTTP method or a URL prefix. A RATE without KEY
+        applies to all the requests.
+        """
+        rate = None
+        method_rates = {}
+        endpoint_rates = {}
+        for spec in specs:
+            key, sep, value = spec.rpartition('=')
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError("Invalid rate %r, the [METHOD=|URL=]RATE "
+                                 "format is expected" % spec)
+            if not sep:
+                rate = value
+            elif key.upper() in HTTP_METHODS:
+                method_rates[key] = value
+            else:
+                endpoint_rates[key] = value
+        return cls(rate, method_rates, endpoint_rates, burst)
@@ -0,0 +1,117 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Retry of the requests rejected by rate limits or unavailable servers."""
+
+import logging
+import random
+import threading
+import time
+
+from aodhclient import exceptions
+
+LOG = logging.getLogger(__name__)
+
+# NOTE: the server did not process the request, retrying it is always safe
+RATE_LIMIT_STATUSES = (413, 429)
+# NOTE: the request may have been processed, only idempotent ones are retried
+UNAVAILABLE_STATUSES = (502, 503, 504)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a failed request.
+
+    Requests rejected by a rate limit (HTTP 413 and 429) are retried
+    whatever their method, the ones failing with HTTP 502, 503 or 504 only
+    if their method is idempotent. The delay sent by the server in the
+    Retry-After header is honored, otherwise the delay grows exponentially
+    with a random jitter so concurrent callers do not retry all at once.
+
+    A policy can be shared by several clients and threads, its counters
+    then sum up all their retries.
+
+    :param max_retries: maximum number of retries of a request
+    :type max_retries: int
+    :param deadline: maximum number of seconds between the first attempt of
+                     a request and its last retry, None for no limit
+    :type deadline: float
+    :param backoff: base delay in seconds of the exponential backoff
+    :type backoff: float
+    :param max_backoff: maximum delay in seconds between two attempts,
+                        when the server does not ask for a longer one
+    :type max_backoff: float
+    """
+
+    def __init__(self, max_retries=3, deadline=None, backoff=0.5,
+                 max_backoff=30):
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        self.backoff_time = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sleep(delay):
+        time.sleep(delay)
+
+    def should_retry(self, method, status_code):
+        if status_code in RATE_LIMIT_STATUSES:
+            return True
+        return (status_code in UNAVAILABLE_STATUSES and
+                method.upper() in IDEMPOTENT_METHODS)
+
+    def get_delay(self, attempt, retry_after=None):
+        """Return the number of seconds to wait before a retry.
+
+        :param attempt: number of the retry, starting at 0
+        :param retry_after: Retry-After header of the failed response
+        """
+        if retry_after:
+            delay = exceptions.parse_retry_after(retry_after)
+            if delay > 0:
+                return delay
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def wait(self, method, response, attempt, started_at):
+        """Wait before retrying the request if it has to be.
+
+        :param method: HTTP method of the request
+        :param response: the failed response
+        :param attempt: number of retries already done for the request
+        :param started_at: time.monotonic() of the first attempt
+        :return: True if the request has to be retried, the response is
+                 then closed
+        """
+        if (attempt >= self.max_retries or
+                not self.should_retry(method, response.status_code)):
+            return False
+        delay = self.get_delay(attempt,
+                               response.headers.get('retry-after'))
+        if (self.deadline is not None and
+                time.monotonic() + delay - started_at > self.deadline):
+            LOG.debug("Not retrying %s %s, its deadline would be exceeded",
+                      method, response.url)
+            return False
+        LOG.debug("Retrying %s %s in %.2fs after HTTP %d", method,
+                  response.url, delay, response.status_code)
+        # NOTE: release the connection of the response while waiting
+        response.close()
+        self._sleep(delay)
+        with self._lock:
+            self.retries += 1
+            self.backoff_time += delay
+        return True
@@ -13,43 +13,76 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import argparse
 import logging
 import os
+import shlex
+import socket
 import sys
+import time
 import warnings
 
 from cliff import app
 from cliff import commandmanager
 from keystoneauth1 import exceptions
 from keystoneauth1 import loading
+from oslo_utils import importutils
 
 from aodhclient import __version__
+from aodhclient import cache
 from aodhclient import client
 from aodhclient import noauth
-from aodhclient.v2 import alarm_cli
-from aodhclient.v2 import alarm_history_cli
-from aodhclient.v2 import capabilities_cli
-from aodhclient.v2 import metrics_cli
+from aodhclient import ratelimit
+from aodhclient import retry
+from aodhclient import timing
+from aodhclient import tracing
+
+
+class LazyCommand:
+    """An entrypoint-like object importing its command class on first use."""
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+        self.load_time = 0.0
+        self._command_class = None
+
+    def load(self):
+        if self._command_class is None:
+            start = time.perf_counter()
+            self._command_class = importutils.import_class(self.value)
+            self.load_time = time.perf_counter() - start
+        return self._command_class
 
 
 class AodhCommandManager(commandmanager.CommandManager):
+    # NOTE: the command modules are only imported when their command is
+    # run, so a single command does not pay for importing all of them.
     SHELL_COMMANDS = {
-        "alarm create": alarm_cli.CliAlarmCreate,
-        "alarm delete": alarm_cli.CliAlarmDelete,
-        "alarm list": alarm_cli.CliAlarmList,
-        "alarm show": alarm_cli.CliAlarmShow,
-        "alarm update": alarm_cli.CliAlarmUpdate,
-        "alarm state get": alarm_cli.CliAlarmStateGet,
-        "alarm state set": alarm_cli.CliAlarmStateSet,
-        "alarm-history show": alarm_history_cli.CliAlarmHistoryShow,
-        "alarm-history search": alarm_history_cli.CliAlarmHistorySearch,
-        "capabilities list": capabilities_cli.CliCapabilitiesList,
-        "alarm metrics": metrics_cli.CliMetrics,
+        "alarm create": "aodhclient.v2.alarm_cli.CliAlarmCreate",
+        "alarm bulk create": "aodhclient.v2.alarm_cli.CliAlarmBulkCreate",
+        "alarm delete": "aodhclient.v2.alarm_cli.CliAlarmDelete",
+        "alarm list": "aodhclient.v2.alarm_cli.CliAlarmList",
+        "alarm show": "aodhclient.v2.alarm_cli.CliAlarmShow",
+        "alarm update": "aodhclient.v2.alarm_cli.CliAlarmUpdate",
+        "alarm state get": "aodhclient.v2.alarm_cli.CliAlarmStateGet",
+        "alarm state set": "aodhclient.v2.alarm_cli.CliAlarmStateSet",
+        "alarm-history show":
+            "aodhclient.v2.alarm_history_cli.CliAlarmHistoryShow",
+        "alarm-history search":
+            "aodhclient.v2.alarm_history_cli.CliAlarmHistorySearch",
+        "alarm-history export":
+            "aodhclient.v2.alarm_history_cli.CliAlarmHistoryExport",
+        "alarm-history tail":
+            "aodhclient.v2.alarm_history_cli.CliAlarmHistoryTail",
+        "capabilities list":
+            "aodhclient.v2.capabilities_cli.CliCapabilitiesList",
+        "alarm metrics": "aodhclient.v2.metrics_cli.CliMetrics",
     }
 
     def load_commands(self, namespace):
-        for name, command_class in self.SHELL_COMMANDS.items():
-            self.add_command(name, command_class)
+        for name, path in self.SHELL_COMMANDS.items():
+            self.commands[name] = LazyCommand(name, path)
 
 
 class AodhShell(app.App):
@@ -62,6 +95,13 @@ class AodhShell(app.App):
         )
 
         self._client = None
+        self._auth_cache = None
+        self._retry_policy = None
+        self._rate_limiter = None
+        self._batch = None
+        self._batch_result = None
+        self._timings = None
+        self._phases = None
 
     def build_option_parser(self, description, version):
         """Return an argparse option parser for this application.
@@ -96,6 +136,92 @@ class AodhShell(app.App):
             '--aodh-api-version',
             default=os.environ.get('AODH_API_VERSION', '2'),
             help='Defaults to env[AODH_API_VERSION] or 2.')
+        parser.add_argument(
+            '--aodh-pool-maxsize',
+            metavar='<size>',
+            dest='pool_maxsize',
+            type=int,
+            default=os.environ.get('AODH_POOL_MAXSIZE'),
+            help='Maximum number of HTTP connections kept open per host, '
+                 'raise it for commands with a high --concurrency. '
+                 'Defaults to 10. (Env: AODH_POOL_MAXSIZE)')
+        parser.add_argument(
+            '--aodh-pool-block',
+            dest='pool_block',
+            action='store_const',
+            const=True,
+            help='Wait for a pooled HTTP connection to be free instead of '
+                 'opening a new one when the pool is full.')
+        parser.add_argument(
+            '--aodh-no-keep-alive',
+            dest='keep_alive',
+            action='store_const',
+            const=False,
+            help='Do not send TCP keep-alive probes on idle connections.')
+        parser.add_argument(
+            '--aodh-max-retries',
+            metavar='<retries>',
+            dest='max_retries',
+            type=int,
+            default=os.environ.get('AODH_MAX_RETRIES', 0),
+            help='Maximum number of retries of the requests rejected by a '
+                 'rate limit (any request) or by an unavailable server '
+                 '(idempotent requests only). The Retry-After delay of the '
+                 'server is honored, otherwise an exponential backoff is '
+                 'used. Defaults to 0. (Env: AODH_MAX_RETRIES)')
+        parser.add_argument(
+            '--aodh-retry-deadline',
+            metavar='<seconds>',
+            dest='retry_deadline',
+            type=float,
+            default=os.environ.get('AODH_RETRY_DEADLINE'),
+            help='Do not retry a request more than this number of seconds '
+                 'after its first attempt. (Env: AODH_RETRY_DEADLINE)')
+        parser.add_argument(
+            '--aodh-max-rps',
+            metavar='[<method>=|<url>=]<rate>',
+            dest='max_rps',
+            action='append',
+            help='Maximum number of requests per second sent to the API. '
+                 'The limit applies to all the requests, to an HTTP method '
+                 'such as PUT=5, or to the URLs starting with a prefix '
+                 'such as v2/alarms=10. Can be repeated.')
+        parser.add_argument(
+            '--timing',
+            action='store_true',
+            help='Print the time spent in each API request and in each '
+                 'phase of the command (import, authentication, HTTP, '
+                 'rate limit and retry wait, formatting) on stderr when '
+                 'the command exits.')
+        parser.add_argument(
+            '--profile',
+            metavar='<file>',
+            help='Profile the command with cProfile and save the '
+                 'statistics to a file, to be read with pstats or '
+                 'snakeviz. The time spent in each phase of the command is '
+                 'printed on stderr.')
+        parser.add_argument(
+            '--os-profile',
+            metavar='<hmac-key>',
+            default=os.environ.get('OS_PROFILE'),
+            help='Trace the command with osprofiler, the HMAC key must be '
+                 'one of those configured in the Aodh API. The trace ID is '
+                 'printed on stderr when the command exits. '
+                 '(Env: OS_PROFILE)')
+        parser.add_argument(
+            '--os-profile-connection-string',
+            metavar='<url>',
+            default=os.environ.get('OS_PROFILE_CONNECTION_STRING'),
+            help='osprofiler storage receiving the spans of the client, '
+                 'e.g. redis://localhost:6379, it should be the one used by '
+                 'the Aodh API. Without it, only the spans of the server are '
+                 'recorded. (Env: OS_PROFILE_CONNECTION_STRING)')
+        parser.add_argument(
+            '--batch',
+            metavar='<file>',
+            help='Run the commands listed in a file, one per line, with the '
+                 'same authenticated client. Use "-" to read them from '
+                 'stdin. Empty lines and lines starting with # are ignored.')
         loading.register_session_argparse_arguments(parser=parser)
         plugin = loading.register_auth_argparse_arguments(
             parser=parser, argv=sys.argv, default="password")
@@ -121,19 +247,194 @@ class AodhShell(app.App):
                 endpoint_override = None
             auth_plugin = loading.load_auth_from_argparse_arguments(
                 self.options)
+            self._auth_cache = cache.AuthCache.from_env()
+            if self._auth_cache is not None:
+                self._auth_cache.load(auth_plugin)
             session = loading.load_session_from_argparse_arguments(
                 self.options, auth=auth_plugin)
+            if self._phases is not None:
+                # NOTE: authenticate now, so that the authentication is
+                # not accounted as the time of the first request.
+                start = time.perf_counter()
+                session.get_auth_headers()
+                self._phases['auth'] += time.perf_counter() - start
+                self._timings = timing.TimingCollector()
+            if self.options.max_rps:
+                self._rate_limiter = ratelimit.RateLimiter.from_specs(
+                    self.options.max_rps)
+            if self.options.max_retries > 0:
+                self._retry_policy = retry.RetryPolicy(
+                    max_retries=self.options.max_retries,
+                    deadline=self.options.retry_deadline)
 
-            self._client = client.Client(self.options.aodh_api_version,
-                                         session=session,
-                                         interface=self.options.interface,
-                                         region_name=self.options.region_name,
-                                         endpoint_override=endpoint_override)
+            self._client = client.Client(
+                self.options.aodh_api_version,
+                session=session,
+                interface=self.options.interface,
+                region_name=self.options.region_name,
+                endpoint_override=endpoint_override,
+                pool_maxsize=self.options.pool_maxsize,
+                pool_block=self.options.pool_block,
+                keep_alive=self.options.keep_alive,
+                retry_policy=self._retry_policy,
+                rate_limiter=self._rate_limiter,
+                timings=self._timings)
         return self._client
 
+    @staticmethod
+    def _profile_path(argv):
+        # NOTE: the profiler must be started before the options are parsed
+        # by cliff, so --profile is looked for here.
+        parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+        parser.add_argument('--profile')
+        return parser.parse_known_args(argv)[0].profile
+
+    def run(self, argv):
+        profile_path = self._profile_path(argv)
+        if profile_path:
+            import cProfile
+            profiler = cProfile.Profile()
+            result = profiler.runcall(super().run, argv)
+            profiler.dump_stats(profile_path)
+        else:
+            result = super().run(argv)
+        if self._batch_result is not None:
+            return self._batch_result
+        return result
+
+    def _import_time(self):
+        return sum(c.load_time for c in self.command_manager.commands.values()
+                   if isinstance(c, LazyCommand))
+
+    def run_subcommand(self, argv):
+        if self.options.timing or self.options.profile:
+            self._phases = {'start': time.perf_counter(),
+                            'import': self._import_time(),
+                            'auth': 0.0}
+            if self._timings is not None:
+                self._timings.clear()
+        if self.options.os_profile:
+            return self._run_traced_subcommand(argv)
+        return super().run_subcommand(argv)
+
+    def _run_traced_subcommand(self, argv):
+        # NOTE: osprofiler is slow to import, only do it when tracing
+        from osprofiler import profiler
+        trace = profiler.init(self.options.os_profile)
+        try:
+            with tracing.span('shell', {'command': ' '.join(argv)}):
+                return super().run_subcommand(argv)
+        finally:
+            profiler.clean()
+            self.stderr.write(
+                "Trace ID: %s\nDisplay the trace with: osprofiler trace show "
+                "--html %s\n" % (trace.get_base_id(), trace.get_base_id()))
+
+    def _print_timings(self):
+        summary = self._timings.summary() if self._timings else []
+        if self.options.timing and summary:
+            rows = [('Method', 'URL', 'Status', 'Count', 'Total (s)',
+                     'Mean (s)', 'Max (s)', 'Decode (s)', 'Bytes')]
+            rows.extend((s['method'], s['url'], str(s['status']),
+                         str(s['count']), '%.3f' % s['latency_total'],
+                         '%.3f' % s['latency_mean'],
+                         '%.3f' % s['latency_max'],
+                         '%.3f' % s['decode_time_total'], str(s['bytes']))
+                        for s in summary)
+            widths = [max(len(r[i]) for r in rows)
+                      for i in range(len(rows[0]))]
+            for row in rows:
+                self.stderr.write('  '.join(
+                    v.ljust(w) if i < 2 else v.rjust(w)
+                    for i, (v, w) in enumerate(zip(row, widths))).rstrip()
+                    + '\n')
+        total = time.perf_counter() - self._phases['start']
+        imports = self._import_time() - self._phases['import']
+        auth = self._phases['auth']
+        http = sum(s['latency_total'] for s in summary)
+        decode = sum(s['decode_time_total'] for s in summary)
+        wait = sum(s['wait_time_total'] for s in summary)
+        # NOTE: concurrent requests overlap, their total can exceed the
+        # duration of the command.
+        other = max(total - imports - auth - http - wait - decode, 0.0)
+        self.stderr.write(
+            "Time: import %.3fs, auth %.3fs, HTTP %.3fs, wait %.3fs, "
+            "decode %.3fs, formatting and other %.3fs, total %.3fs\n" % (
+                imports, auth, http, wait, decode, other, total))
+
+    def initialize_app(self, argv):
+        if (self.options.os_profile and
+                self.options.os_profile_connection_string):
+            from osprofiler import notifier
+            notifier.set(notifier.create(
+                self.options.os_profile_connection_string,
+                project='aodhclient', service='shell',
+                host=socket.gethostname()))
+        if self.options.batch:
+            if argv:
+                raise ValueError("--batch cannot be used with a command")
+            if self.options.batch == '-':
+                self._batch = self.stdin
+            else:
+                self._batch = open(self.options.batch)
+
+    def interact(self):
+        if self._batch is None:
+            return super().interact()
+        try:
+            self._batch_result = self._run_batch(self._batch)
+        finally:
+            if self._batch is not self.stdin:
+                self._batch.close()
+
+    def _run_batch_command(self, line):
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            self.LOG.error("Invalid command %r: %s", line, e)
+            return 2
+        try:
+            return self.run_subcommand(argv)
+        except SystemExit as e:
+            # NOTE: raised by argparse on invalid arguments or --help
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            return 1
+
+    def _run_batch(self, lines):
+        # NOTE: the commands are not run in interactive mode, so they report
+        # their errors and exit statuses as if run one by one.
+        self.interactive_mode = False
+        total = failed = 0
+        for lineno, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            total += 1
+            result = self._run_batch_command(line)
+            if result:
+                failed += 1
+                self.stderr.write("Line %d: '%s' failed with exit status "
+                                  "%d\n" % (lineno, line, result))
+            self.stdout.flush()
+        self.stderr.write("%d command(s) run, %d failed\n" % (total, failed))
+        return 1 if failed else 0
+
     def clean_up(self, cmd, result, err):
         if isinstance(err, exceptions.HttpError) and err.details:
             print(err.details, file=sys.stderr)
+        if self._phases is not None:
+            self._print_timings()
+        if self._auth_cache is not None and self._client is not None:
+            self._auth_cache.save(self._client.api.session.auth)
+        if self._retry_policy is not None and self._retry_policy.retries:
+            self.LOG.info("%d request(s) retried, %.2fs spent backing off",
+                          self._retry_policy.retries,
+                          self._retry_policy.backoff_time)
+        if self._rate_limiter is not None and self._rate_limiter.waits:
+            self.LOG.info("%d request(s) delayed by the rate limit, %.2fs "
+                          "spent waiting", self._rate_limiter.waits,
+                          self._rate_limiter.wait_time)
 
     def configure_logging(self):
         if self.options.debug:
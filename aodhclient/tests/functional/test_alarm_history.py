@@ -21,6 +21,8 @@ class AlarmHistoryTest(base.ClientTestBase):
     def test_help(self):
         self.aodh("help", params="alarm-history show")
         self.aodh("help", params="alarm-history search")
+        self.aodh("help", params="alarm-history tail")
+        self.aodh("help", params="alarm-history export")
 
     def test_alarm_history_scenario(self):
 
@@ -0,0 +1,291 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Benchmark of the API managers and of the aodh commands.
+
+The managers and the commands are run against an in-process fake of the
+Aodh API, see aodhclient.tests.perf.fake_api, so the results only depend on
+the client and on the configured latency. The results can be saved as JSON
+and compared with the ones of another release::
+
+    python -m aodhclient.tests.perf.bench_api [--alarms 1000]
+        [--history 10] [--latency 0.005] [--iterations 20]
+        [--concurrency 10] [--only alarm.get,command:alarm list]
+        [--output results.json] [--compare baseline.json]
+        [--max-regression 20]
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import logging
+import platform
+import sys
+import time
+
+from aodhclient import __version__
+from aodhclient import client
+from aodhclient import shell
+from aodhclient.tests.perf import fake_api
+from aodhclient import timing
+
+QUERY = json.dumps({'and': [{'=': {'type': 'event'}},
+                            {'!=': {'severity': 'low'}}]})
+HISTORY_QUERY = json.dumps({'=': {'type': 'state transition'}})
+
+
+def _manager_benchmarks(alarm_ids, concurrency):
+    """Return the (name, function, operations per call) of the benchmarks."""
+    ids = itertools.cycle(alarm_ids)
+    new_alarm = fake_api.make_alarm(0, 'gnocchi_resources_threshold')
+    del new_alarm['alarm_id']
+    bulk_size = concurrency * 5
+
+    def create_delete_many(aodh):
+        alarms = [dict(new_alarm, name='bench-%d' % i)
+                  for i in range(bulk_size)]
+        created = aodh.alarm.create_many(alarms, concurrency=concurrency)
+        errors = [e for _a, e in created if e] + aodh.alarm.delete_many(
+            [a['alarm_id'] for a, _e in created if a],
+            concurrency=concurrency)
+        if errors:
+            raise RuntimeError("%d bulk operations failed: %s"
+                               % (len(errors), errors[0]))
+
+    return [
+        ('alarm.get', lambda aodh: aodh.alarm.get(next(ids)), 1),
+        ('alarm.list', lambda aodh: aodh.alarm.list(), 1),
+        ('alarm.list stream', lambda aodh: list(
+            aodh.alarm.list(stream=True)), 1),
+        ('alarm.list limit=100', lambda aodh: aodh.alarm.list(limit=100),
+         1),
+        ('alarm.iter_list page_size=100', lambda aodh: list(
+            aodh.alarm.iter_list(page_size=100)), 1),
+        ('alarm.query', lambda aodh: aodh.alarm.query(QUERY), 1),
+        ('alarm.update', lambda aodh: aodh.alarm.update(
+            next(ids), {'description': 'updated'}), 1),
+        ('alarm.set_state', lambda aodh: aodh.alarm.set_state(
+            next(ids), 'ok'), 1),
+        ('alarm.create_many+delete_many', create_delete_many,
+         2 * bulk_size),
+        ('alarm_history.get', lambda aodh: aodh.alarm_history.get(
+            next(ids)), 1),
+        ('alarm_history.search', lambda aodh: aodh.alarm_history.search(
+            HISTORY_QUERY, limit=1000), 1),
+        ('quota.list', lambda aodh: aodh.quota.list('admin'), 1),
+        ('metrics.get', lambda aodh: aodh.metrics.get(), 1),
+    ]
+
+
+def _command_benchmarks(alarm_ids):
+    alarm_id = alarm_ids[0]
+    return [
+        ('command:alarm list', ['alarm', 'list']),
+        ('command:alarm list --query', ['alarm', 'list', '--query',
+                                        'type=event and severity!=low']),
+        ('command:alarm list --page-size', ['alarm', 'list', '--page-size',
+                                            '100']),
+        ('command:alarm show', ['alarm', 'show', alarm_id]),
+        ('command:alarm update', ['alarm', 'update', '--description',
+                                  'updated', alarm_id]),
+        ('command:alarm-history show', ['alarm-history', 'show', alarm_id]),
+        ('command:alarm-history search', ['alarm-history', 'search',
+                                          '--query', 'type=creation']),
+        ('command:alarm metrics', ['alarm', 'metrics']),
+        ('command:capabilities list', ['capabilities', 'list']),
+    ]
+
+
+def _stats(name, latencies, operations, http_time=None, requests=None):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'name': name,
+        'iterations': len(latencies),
+        'operations': operations,
+        'total_time': total,
+        'throughput': operations / total if total else None,
+        'latency_mean': total / len(latencies),
+        'latency_p50': timing.percentile(latencies, 50),
+        'latency_p95': timing.percentile(latencies, 95),
+        'latency_max': latencies[-1],
+        'http_time': http_time,
+        'requests': requests,
+    }
+
+
+def _run_manager(name, func, operations, aodh, timings, api, iterations):
+    func(aodh)  # NOTE: warm up
+    timings.clear()
+    requests = api.requests
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(aodh)
+        latencies.append(time.perf_counter() - start)
+    return _stats(name, latencies, operations * iterations,
+                  http_time=sum(t.latency for t in timings.timings),
+                  requests=api.requests - requests)
+
+
+@contextlib.contextmanager
+def _shell_environment(argv):
+    # NOTE: the shell reads the auth type in sys.argv, and cliff adds a
+    # logging handler each time a command is run.
+    saved_argv = sys.argv
+    root_logger = logging.getLogger('')
+    saved_handlers = list(root_logger.handlers)
+    saved_level = root_logger.level
+    sys.argv = ['aodh'] + argv
+    try:
+        yield
+    finally:
+        sys.argv = saved_argv
+        root_logger.handlers[:] = saved_handlers
+        root_logger.setLevel(saved_level)
+
+
+def _run_shell(argv):
+    with _shell_environment(argv):
+        aodh = shell.AodhShell()
+        aodh.stdout = aodh.stderr = io.StringIO()
+        status = aodh.run(argv)
+    if status:
+        raise RuntimeError("aodh %s failed: %s"
+                           % (' '.join(argv), aodh.stdout.getvalue()))
+
+
+def _run_command(name, argv, api, iterations):
+    argv = ['--os-auth-type', 'none', '--aodh-endpoint', api.url] + argv
+    _run_shell(argv)  # NOTE: warm up, the command modules are imported
+    requests = api.requests
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _run_shell(argv)
+        latencies.append(time.perf_counter() - start)
+    return _stats(name, latencies, iterations,
+                  requests=api.requests - requests)
+
+
+def run(alarms=1000, history=10, latency=0.0, iterations=20,
+        concurrency=10, only=None):
+    """Run the benchmarks, return their results as a JSON serializable dict.
+
+    :param only: names of the benchmarks to run, all by default
+    """
+    results = []
+    with fake_api.FakeAodhAPI(alarms=alarms, history=history,
+                              latency=latency) as api:
+        alarm_ids = list(api.alarms)
+        timings = timing.TimingCollector()
+        session = client.create_session(pool_maxsize=concurrency)
+        aodh = client.Client('2', session=session,
+                             endpoint_override=api.url, timings=timings)
+        for name, func, operations in _manager_benchmarks(alarm_ids,
+                                                          concurrency):
+            if only is None or name in only:
+                results.append(_run_manager(name, func, operations, aodh,
+                                            timings, api, iterations))
+        for name, argv in _command_benchmarks(alarm_ids):
+            if only is None or name in only:
+                results.append(_run_command(name, argv, api, iterations))
+    return {
+        'metadata': {
+            'aodhclient': __version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'config': {'alarms': alarms, 'history': history, 'latency': latency,
+                   'iterations': iterations, 'concurrency': concurrency},
+        'results': results,
+    }
+
+
+def compare(baseline, current, key='latency_mean'):
+    """Return the (name, baseline, current, change %) of a result key.
+
+    Only the benchmarks present in both results are compared.
+    """
+    previous = {r['name']: r for r in baseline['results']}
+    changes = []
+    for r in current['results']:
+        if r['name'] in previous:
+            old = previous[r['name']][key]
+            changes.append((r['name'], old, r[key],
+                            100.0 * (r[key] - old) / old))
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--alarms", type=int, default=1000,
+                        help="Number of alarms of the fake API")
+    parser.add_argument("--history", type=int, default=10,
+                        help="Number of history entries per alarm")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds added to each response of the API")
+    parser.add_argument("--iterations", type=int, default=20,
+                        help="Number of runs of each benchmark")
+    parser.add_argument("--concurrency", type=int, default=10,
+                        help="Concurrency of the bulk operations")
+    parser.add_argument("--only",
+                        help="Comma separated names of the benchmarks to "
+                             "run")
+    parser.add_argument("--output", metavar="FILE",
+                        help="Save the results as JSON to a file")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="Compare the results with those of a file")
+    parser.add_argument("--max-regression", type=float, metavar="PERCENT",
+                        help="Exit with status 1 when a mean latency is "
+                             "more than PERCENT higher than in the compared "
+                             "results")
+    args = parser.parse_args(argv)
+    results = run(args.alarms, args.history, args.latency, args.iterations,
+                  args.concurrency,
+                  args.only.split(",") if args.only else None)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    print("%-36s %8s %12s %12s %12s %10s" % (
+        "benchmark", "requests", "ops/s", "mean (ms)", "p95 (ms)",
+        "HTTP (ms)"))
+    for r in results['results']:
+        print("%-36s %8d %12.1f %12.3f %12.3f %10s" % (
+            r['name'], r['requests'] // r['iterations'], r['throughput'],
+            r['latency_mean'] * 1000, r['latency_p95'] * 1000,
+            '-' if r['http_time'] is None else
+            '%.3f' % (r['http_time'] * 1000 / r['iterations'])))
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        changes = compare(json.load(f), results)
+    print("\n%-36s %14s %14s %8s" % ("benchmark", "baseline (ms)",
+                                     "current (ms)", "change"))
+    regressions = 0
+    for name, old, new, change in changes:
+        print("%-36s %14.3f %14.3f %+7.1f%%" % (name, old * 1000, new * 1000,
+                                                change))
+        if args.max_regression is not None and change > args.max_regression:
+            regressions += 1
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Micro-benchmark of the formatting of the CLI rows.
+
+Time utils.list2cols, alarm_cli._format_alarm for each alarm type,
+CliMetrics.metrics2cols and utils.cli_to_array on 10k and 100k rows built
+from realistic alarms, see aodhclient.tests.perf.fake_api. The results of
+a run can be compared with the baseline kept in bench_format_baseline.json,
+measured on the machine described in its metadata::
+
+    python -m aodhclient.tests.perf.bench_format [--rows 10000,100000]
+        [--repeat 5] [--output results.json]
+        [--compare aodhclient/tests/perf/bench_format_baseline.json]
+        [--max-regression 20]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+from aodhclient import __version__
+from aodhclient.tests.perf import bench_api
+from aodhclient.tests.perf import fake_api
+from aodhclient import utils
+from aodhclient.v2 import alarm_cli
+from aodhclient.v2 import metrics_cli
+
+DEFAULT_ROWS = (10000, 100000)
+BASELINE = os.path.join(os.path.dirname(__file__),
+                        'bench_format_baseline.json')
+# NOTE: rows are built from this number of distinct alarms per type
+_POOL_SIZE = 1000
+
+
+def _alarm_pool(alarm_type=None):
+    return [fake_api.make_alarm(i, alarm_type) for i in range(_POOL_SIZE)]
+
+
+def _rows(pool, rows):
+    return list(itertools.islice(itertools.cycle(pool), rows))
+
+
+def _queries(pool):
+    """Return the --query options of alarms, as given to the CLI."""
+    queries = []
+    for alarm in pool:
+        rule = alarm['%s_rule' % alarm['type']]
+        if isinstance(rule.get('query'), list):
+            queries.append(';'.join(
+                '%s%s%s' % (q['field'], alarm_cli.ALARM_OP_MAP[q['op']],
+                            q['type'] + '::' + q['value'] if q['type']
+                            else q['value'])
+                for q in rule['query']))
+        else:
+            queries.append('project_id=%s;state=string::%s;threshold>=%s' % (
+                alarm['project_id'], alarm['state'],
+                rule.get('threshold', 0)))
+    return queries
+
+
+def _metrics(pool, rows):
+    return {'evaluation_results': [
+        {'alarm_id': a['alarm_id'], 'project_id': a['project_id'],
+         'state_counters': {'ok': i % 7, 'alarm': i % 3,
+                            'insufficient data': i % 2}}
+        for i, a in enumerate(_rows(pool, rows))]}
+
+
+def _cases(rows):
+    """Yield the (name, setup, function) of the benchmarks.
+
+    setup() returns the argument of function, it is called before each
+    timing as the functions may modify it.
+    """
+    pool = _alarm_pool()
+    alarms = _rows(pool, rows)
+    yield ('list2cols', lambda: alarms,
+           lambda a: utils.list2cols(alarm_cli.ALARM_LIST_COLS, a))
+    for alarm_type in alarm_cli.ALARM_TYPES:
+        typed = _rows(_alarm_pool(alarm_type), rows)
+        # NOTE: _format_alarm only modifies the alarm dict itself
+        yield ('_format_alarm[%s]' % alarm_type,
+               lambda typed=typed: [dict(a) for a in typed],
+               lambda a: [alarm_cli._format_alarm(alarm) for alarm in a])
+    metrics = _metrics(pool, rows)
+    yield ('metrics2cols', lambda: metrics,
+           metrics_cli.CliMetrics.metrics2cols)
+    queries = _rows(_queries(pool), rows)
+    yield ('cli_to_array', lambda: queries,
+           lambda q: [utils.cli_to_array(query) for query in q])
+
+
+def _best(setup, func, repeat):
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(rows=DEFAULT_ROWS, repeat=5, only=None):
+    results = []
+    for n in rows:
+        for name, setup, func in _cases(n):
+            if only is not None and name not in only:
+                continue
+            best = _best(setup, func, repeat)
+            results.append({'name': '%s/%d' % (name, n), 'rows': n,
+                            'time': best, 'per_row': best / n})
+    return {
+        'metadata': {
+            'aodhclient': __version__,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'config': {'rows': list(rows), 'repeat': repeat},
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default=",".join(map(str, DEFAULT_ROWS)),
+                        help="Comma separated numbers of rows")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Number of timing runs, the best is kept")
+    parser.add_argument("--only",
+                        help="Comma separated names of the functions to "
+                             "time, e.g. list2cols,_format_alarm[event]")
+    parser.add_argument("--output", metavar="FILE",
+                        help="Save the results as JSON to a file")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="Compare the results with those of a file, "
+                             "such as %s" % os.path.relpath(BASELINE))
+    parser.add_argument("--max-regression", type=float, metavar="PERCENT",
+                        help="Exit with status 1 when a time is more than "
+                             "PERCENT higher than in the compared results")
+    args = parser.parse_args(argv)
+    results = run([int(n) for n in args.rows.split(",")], args.repeat,
+                  args.only.split(",") if args.only else None)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    print("%-64s %10s %12s" % ("benchmark", "time (ms)", "row (us)"))
+    for r in results['results']:
+        print("%-64s %10.1f %12.3f" % (r['name'], r['time'] * 1000,
+                                       r['per_row'] * 1e6))
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        changes = bench_api.compare(json.load(f), results, key='time')
+    print("\n%-64s %14s %14s %8s" % ("benchmark", "baseline (ms)",
+                                     "current (ms)", "change"))
+    regressions = 0
+    for name, old, new, change in changes:
+        print("%-64s %14.1f %14.1f %+7.1f%%" % (name, old * 1000, new * 1000,
+                                                change))
+        if args.max_regression is not None and change > args.max_regression:
+            regressions += 1
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
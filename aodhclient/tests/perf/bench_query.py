@@ -0,0 +1,103 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Benchmark of the rich query parser.
+
+Compare the parser of aodhclient.utils.search_query_builder, with and
+without its cache of parsed queries, with the pyparsing implementation it
+replaced, on generated queries of 1 to 500 terms::
+
+    python -m aodhclient.tests.perf.bench_query [--terms 1,10,100,500]
+                                                [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+
+from aodhclient.tests.perf import legacy_query
+from aodhclient import utils
+
+DEFAULT_TERMS = (1, 10, 50, 100, 250, 500)
+
+_TERMS = ('state="alarm"', 'severity!=low', 'enabled=true',
+          'repeat_actions=false', 'threshold>=42.5', 'description=null',
+          'alarm_id=0a1b2c3d-4e5f-6a7b-8c9d-0e1f2a3b4c5d', "name='cpu high'")
+
+
+def make_query(terms):
+    """Build a query of `terms` conditions mixing and, or, not and ()."""
+    parts = []
+    for i in range(terms):
+        term = _TERMS[i % len(_TERMS)]
+        if i % 7 == 3:
+            term = "not " + term
+        if i:
+            parts.append("or" if i % 5 == 0 else "and")
+        parts.append(term)
+    query = " ".join(parts)
+    return "(%s) and project_id=demo" % query if terms > 1 else query
+
+
+def _best(func, query, repeat):
+    timer = timeit.Timer(lambda: func(query))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def _uncached(query):
+    return utils._QueryParser(query).parse()
+
+
+def run(terms=DEFAULT_TERMS, repeat=5):
+    results = []
+    for n in terms:
+        query = make_query(n)
+        expected = legacy_query.search_query_builder(query)
+        if utils.search_query_builder(query) != expected:
+            raise AssertionError("Parsers disagree on %r" % query)
+        results.append({
+            "terms": n,
+            "query_length": len(query),
+            "pyparsing": _best(legacy_query.search_query_builder, query,
+                               repeat),
+            "parser": _best(_uncached, query, repeat),
+            "cached": _best(utils.search_query_builder, query, repeat),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", default=",".join(map(str, DEFAULT_TERMS)),
+                        help="Comma separated numbers of query terms")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Number of timing runs, the best is kept")
+    parser.add_argument("--json", action="store_true",
+                        help="Output the results as JSON")
+    args = parser.parse_args(argv)
+    results = run([int(n) for n in args.terms.split(",")], args.repeat)
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    print("%6s %14s %14s %14s %9s" % ("terms", "pyparsing (s)", "parser (s)",
+                                      "cached (s)", "speedup"))
+    for r in results:
+        print("%6d %14.6f %14.6f %14.6f %8.1fx" % (
+            r["terms"], r["pyparsing"], r["parser"], r["cached"],
+            r["pyparsing"] / r["parser"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""In-process fake of the Aodh API, for the benchmarks.
+
+It serves v2/alarms, v2/query/alarms, v2/alarms/{id}/history,
+v2/query/alarms/history, v2/quotas, v2/metrics and v2/capabilities from
+memory, with generated alarms of every type. Each response is delayed by a
+configurable latency to simulate the network and the server::
+
+    with fake_api.FakeAodhAPI(alarms=1000, history=10, latency=0.005) as api:
+        aodh = client.Client('2', session=..., endpoint_override=api.url)
+"""
+
+import datetime
+import functools
+import http.server
+import json
+import operator
+import random
+import threading
+import time
+from urllib import parse as urllib_parse
+import uuid
+
+from aodhclient.v2 import alarm_cli
+
+_COMPARISONS = {'=': operator.eq, '==': operator.eq, 'eq': operator.eq,
+                '!=': operator.ne, 'ne': operator.ne,
+                '<': operator.lt, 'lt': operator.lt,
+                '<=': operator.le, 'le': operator.le,
+                '>': operator.gt, 'gt': operator.gt,
+                '>=': operator.ge, 'ge': operator.ge}
+_EPOCH = datetime.datetime(2024, 1, 1)
+_TIME_CONSTRAINTS = [{'name': 'business-hours', 'start': '0 9 * * 1-5',
+                      'duration': 32400, 'timezone': 'Europe/Paris',
+                      'description': 'Only during business hours'}]
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _timestamp(seconds):
+    return (_EPOCH + datetime.timedelta(seconds=seconds)).isoformat()
+
+
+def _threshold(rng):
+    return {'comparison_operator': rng.choice(alarm_cli.ALARM_OPERATORS),
+            'threshold': float(rng.randint(1, 100)),
+            'evaluation_periods': rng.randint(1, 5)}
+
+
+def make_rule(alarm_type, rng):
+    """Return a realistic rule of an alarm type."""
+    if alarm_type == 'threshold':
+        return dict(_threshold(rng), meter_name='cpu_util', period=600,
+                    statistic=rng.choice(alarm_cli.STATISTICS),
+                    exclude_outliers=False,
+                    query=[{'field': 'resource_id', 'op': 'eq', 'type': '',
+                            'value': _uuid(rng)}])
+    if alarm_type == 'gnocchi_resources_threshold':
+        return dict(_threshold(rng), metric='cpu', resource_id=_uuid(rng),
+                    resource_type='instance', granularity=300,
+                    aggregation_method='rate:mean')
+    if alarm_type == 'gnocchi_aggregation_by_metrics_threshold':
+        return dict(_threshold(rng), granularity=60,
+                    aggregation_method='mean',
+                    metrics=[_uuid(rng) for _ in range(3)])
+    if alarm_type == 'gnocchi_aggregation_by_resources_threshold':
+        return dict(_threshold(rng), metric='memory.usage',
+                    resource_type='instance', granularity=300,
+                    aggregation_method='mean',
+                    query=json.dumps({'=': {'server_group': _uuid(rng)}}))
+    if alarm_type == 'event':
+        return {'event_type': 'compute.instance.update',
+                'query': [{'field': 'traits.instance_id', 'op': 'eq',
+                           'type': 'string', 'value': _uuid(rng)},
+                          {'field': 'traits.state', 'op': 'eq',
+                           'type': 'string', 'value': 'error'}]}
+    if alarm_type == 'prometheus':
+        return dict(_threshold(rng),
+                    query='avg(rate(ceilometer_cpu{resource_id="%s"}[5m]))'
+                          % _uuid(rng))
+    if alarm_type == 'loadbalancer_member_health':
+        return {'pool_id': _uuid(rng), 'stack_id': _uuid(rng),
+                'autoscaling_group_id': _uuid(rng)}
+    if alarm_type == 'composite':
+        return {'or': [
+            dict(make_rule('gnocchi_resources_threshold', rng),
+                 type='gnocchi_resources_threshold'),
+            {'and': [dict(make_rule('prometheus', rng), type='prometheus'),
+                     dict(make_rule('threshold', rng), type='threshold')]}]}
+    raise ValueError("Unknown alarm type %r" % alarm_type)
+
+
+def make_alarm(index, alarm_type=None, seed=0):
+    """Return an alarm as returned by the API, of any type by default."""
+    rng = random.Random('%s-%s' % (seed, index))
+    alarm_type = alarm_type or alarm_cli.ALARM_TYPES[
+        index % len(alarm_cli.ALARM_TYPES)]
+    alarm = {
+        'alarm_id': _uuid(rng),
+        'name': '%s-alarm-%d' % (alarm_type.replace('_', '-'), index),
+        'description': 'Alarm %d of type %s' % (index, alarm_type),
+        'type': alarm_type,
+        'enabled': index % 10 != 0,
+        'state': rng.choice(alarm_cli.ALARM_STATES),
+        'state_reason': 'Transition to alarm due to 3 samples outside '
+                        'threshold, most recent: 97.5',
+        'severity': rng.choice(alarm_cli.ALARM_SEVERITY),
+        'timestamp': _timestamp(index),
+        'state_timestamp': _timestamp(index + 60),
+        'user_id': _uuid(rng),
+        'project_id': _uuid(rng),
+        'repeat_actions': False,
+        'alarm_actions': ['log://', 'trust+http://localhost:8000/%d' % index],
+        'ok_actions': [],
+        'insufficient_data_actions': [],
+        'time_constraints': _TIME_CONSTRAINTS if index % 4 == 0 else [],
+        '%s_rule' % alarm_type: make_rule(alarm_type, rng),
+    }
+    return alarm
+
+
+def make_history(alarm, count):
+    """Return the history entries of an alarm, oldest first."""
+    entries = []
+    states = alarm_cli.ALARM_STATES
+    offset = int(alarm['alarm_id'][:4], 16)
+    for i in range(count):
+        if i == 0:
+            entry_type, detail = 'creation', alarm
+        elif i % 5 == 0:
+            entry_type, detail = 'rule change', {'description': 'v%d' % i}
+        else:
+            entry_type = 'state transition'
+            detail = {'state': states[i % len(states)],
+                      'transition_reason': 'Transition due to %d samples '
+                                           'outside threshold' % i}
+        entries.append({
+            'event_id': str(uuid.uuid5(uuid.NAMESPACE_URL, '%s/%d' % (
+                alarm['alarm_id'], i))),
+            'alarm_id': alarm['alarm_id'],
+            'timestamp': _timestamp(3600 * i + offset),
+            'type': entry_type,
+            'detail': json.dumps(detail),
+            'severity': alarm['severity'],
+            'user_id': alarm['user_id'],
+            'project_id': alarm['project_id'],
+            'on_behalf_of': alarm['project_id'],
+        })
+    return entries
+
+
+def match(query, item):
+    """Whether an item matches a complex query filter."""
+    op, operand = next(iter(query.items()))
+    op = op.lower()
+    if op == 'and':
+        return all(match(q, item) for q in operand)
+    if op == 'or':
+        return any(match(q, item) for q in operand)
+    if op == 'not':
+        return not match(operand, item)
+    field, value = next(iter(operand.items()))
+    actual = item.get(field)
+    if op == 'in':
+        return actual in value
+    try:
+        return _COMPARISONS[op](actual, value)
+    except TypeError:
+        return False
+
+
+def _sort(items, orderby):
+    for order in reversed(orderby):
+        (field, direction), = order.items()
+        items.sort(key=lambda i: (i.get(field) is None, i.get(field)),
+                   reverse=direction.lower() == 'desc')
+    return items
+
+
+class _HTTPError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # NOTE: keep the connections alive, as the API behind a proxy does,
+    # without delaying the body sent after the headers.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        api = self.server.api
+        url = urllib_parse.urlsplit(self.path)
+        params = urllib_parse.parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        if api.latency:
+            time.sleep(api.latency)
+        try:
+            status, result = api.handle(method, url.path.strip('/'), params,
+                                        body)
+        except _HTTPError as e:
+            status, result = e.code, {'error_message': {
+                'faultstring': str(e)}}
+        data = b'' if result is None else json.dumps(result).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = functools.partialmethod(_dispatch, 'GET')
+    do_POST = functools.partialmethod(_dispatch, 'POST')
+    do_PUT = functools.partialmethod(_dispatch, 'PUT')
+    do_DELETE = functools.partialmethod(_dispatch, 'DELETE')
+
+
+class FakeAodhAPI:
+    """Fake Aodh API served by a thread of the current process.
+
+    :param alarms: number of alarms generated, of all the types
+    :param history: number of history entries per alarm
+    :param latency: seconds added to each response
+    :param seed: seed of the generated data, for reproducible runs
+    """
+
+    def __init__(self, alarms=1000, history=10, latency=0.0, seed=0):
+        self.latency = latency
+        self.requests = 0
+        self.alarms = {}
+        self.history = {}
+        for i in range(alarms):
+            alarm = make_alarm(i, seed=seed)
+            self.alarms[alarm['alarm_id']] = alarm
+            self.history[alarm['alarm_id']] = make_history(alarm, history)
+        self.quotas = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                                       _Handler)
+        self._server.daemon_threads = True
+        self._server.api = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _alarm(self, alarm_id):
+        try:
+            return self.alarms[alarm_id]
+        except KeyError:
+            raise _HTTPError(404, "Alarm %s not found" % alarm_id)
+
+    @staticmethod
+    def _paginate(items, params, key):
+        for sort in reversed(params.get('sort', [])):
+            field, _, direction = sort.partition(':')
+            items = _sort(items, [{field: direction or 'asc'}])
+        if 'marker' in params:
+            ids = [i[key] for i in items]
+            try:
+                items = items[ids.index(params['marker'][0]) + 1:]
+            except ValueError:
+                raise _HTTPError(400, "Invalid marker %s"
+                                 % params['marker'][0])
+        if 'limit' in params:
+            items = items[:int(params['limit'][0])]
+        return items
+
+    @staticmethod
+    def _query(items, body):
+        body = body or {}
+        if body.get('filter'):
+            query = body['filter']
+            query = json.loads(query) if isinstance(query, str) else query
+            items = [i for i in items if match(query, i)]
+        if body.get('orderby'):
+            items = _sort(items, json.loads(body['orderby']))
+        if body.get('limit'):
+            items = items[:body['limit']]
+        return items
+
+    def handle(self, method, path, params, body):
+        """Return the (status, body) of a request."""
+        with self._lock:
+            self.requests += 1
+        parts = path.split('/')
+        if parts[:2] == ['v2', 'alarms']:
+            return self._handle_alarms(method, parts[2:], params, body)
+        if path == 'v2/query/alarms' and method == 'POST':
+            return 200, self._query(list(self.alarms.values()), body)
+        if path == 'v2/query/alarms/history' and method == 'POST':
+            return 200, self._query([e for h in self.history.values()
+                                     for e in h], body)
+        if path == 'v2/quotas':
+            return self._handle_quotas(method, params, body)
+        if path == 'v2/metrics' and method == 'GET':
+            return 200, {'evaluation_results': [
+                {'alarm_id': a['alarm_id'], 'project_id': a['project_id'],
+                 'state_counters': {'ok': i % 7, 'alarm': i % 3,
+                                    'insufficient data': i % 2}}
+                for i, a in enumerate(self.alarms.values())]}
+        if path == 'v2/capabilities' and method == 'GET':
+            return 200, {'alarm_storage': {'storage:production_ready': True},
+                         'api': {'alarms:query:simple': True,
+                                 'alarms:query:complex': True,
+                                 'alarms:history:query:simple': True,
+                                 'alarms:history:query:complex': True}}
+        raise _HTTPError(404, "Resource %s not found" % path)
+
+    def _handle_alarms(self, method, parts, params, body):
+        if not parts:
+            if method == 'GET':
+                alarms = list(self.alarms.values())
+                for field, value in zip(params.get('q.field', []),
+                                        params.get('q.value', [])):
+                    alarms = [a for a in alarms if str(a.get(field)) == value]
+                return 200, self._paginate(alarms, params, 'alarm_id')
+            if method == 'POST':
+                alarm = dict(body, alarm_id=str(uuid.uuid4()), state=body.get(
+                    'state', 'insufficient data'))
+                with self._lock:
+                    self.alarms[alarm['alarm_id']] = alarm
+                    self.history[alarm['alarm_id']] = make_history(alarm, 1)
+                return 201, alarm
+        elif len(parts) == 1:
+            alarm = self._alarm(parts[0])
+            if method == 'GET':
+                return 200, alarm
+            if method == 'PUT':
+                body['alarm_id'] = alarm['alarm_id']
+                with self._lock:
+                    self.alarms[alarm['alarm_id']] = body
+                return 200, body
+            if method == 'DELETE':
+                with self._lock:
+                    self.alarms.pop(alarm['alarm_id'], None)
+                    self.history.pop(alarm['alarm_id'], None)
+                return 204, None
+        elif parts[1:] == ['state']:
+            alarm = self._alarm(parts[0])
+            if method == 'GET':
+                return 200, alarm['state']
+            if method == 'PUT':
+                alarm['state'] = body
+                return 200, body
+        elif parts[1:] == ['history'] and method == 'GET':
+            self._alarm(parts[0])
+            history = list(reversed(self.history[parts[0]]))
+            return 200, self._paginate(history, params, 'event_id')
+        raise _HTTPError(405, "Method %s not allowed" % method)
+
+    def _handle_quotas(self, method, params, body):
+        if method == 'GET':
+            project = params.get('project_id', ['admin'])[0]
+            return 200, {'project_id': project,
+                         'quotas': self.quotas.get(project, [
+                             {'resource': 'alarms', 'limit': -1}])}
+        if method == 'POST':
+            with self._lock:
+                self.quotas[body['project_id']] = body['quotas']
+            return 201, body
+        raise _HTTPError(405, "Method %s not allowed" % method)
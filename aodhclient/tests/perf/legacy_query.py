@@ -0,0 +1,87 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""pyparsing implementation of the rich query syntax.
+
+This is the implementation aodhclient.utils.search_query_builder used
+before it got its own parser, it is kept as a reference for the parity
+tests and the benchmark.
+"""
+
+import functools
+
+import pyparsing as pp
+
+uninary_operators = ("not", )
+binary_operator = (">=", "<=", "!=", ">", "<", "=", "==", "eq", "ne",
+                   "lt", "gt", "ge", "le")
+multiple_operators = ("and", "or")
+
+
+@functools.lru_cache(maxsize=None)
+def _grammar():
+    operator = pp.Regex("|".join(binary_operator))
+    null = pp.Regex("None|none|null").set_parse_action(pp.replace_with(None))
+    boolean = pp.Regex("False|True|false|true").set_parse_action(
+        lambda t: t[0].lower() == "true")
+    hex_string = lambda n: pp.Word(pp.hexnums, exact=n)  # noqa: E731
+    uuid = pp.Combine(hex_string(8) + ("-" + hex_string(4)) * 3 +
+                      "-" + hex_string(12))
+    number = r"[+-]?\d+(:?\.\d*)?(:?[eE][+-]?\d+)?"
+    number = pp.Regex(number).set_parse_action(lambda t: float(t[0]))
+    identifier = pp.Word(pp.alphas, pp.alphanums + "_")
+    quoted_string = pp.QuotedString('"') | pp.QuotedString("'")
+    comparison_term = (null | boolean | uuid | identifier | number |
+                       quoted_string)
+    condition = pp.Group(comparison_term + operator + comparison_term)
+
+    return pp.infix_notation(condition, [
+        ("not", 1, pp.opAssoc.RIGHT, ),
+        ("and", 2, pp.opAssoc.LEFT, ),
+        ("or", 2, pp.opAssoc.LEFT, ),
+    ])
+
+
+def _parsed_query2dict(parsed_query):
+    result = None
+    while parsed_query:
+        part = parsed_query.pop()
+        if part in binary_operator:
+            result = {part: {parsed_query.pop(): result}}
+
+        elif part in multiple_operators:
+            if result.get(part):
+                result[part].append(
+                    _parsed_query2dict(parsed_query.pop()))
+            else:
+                result = {part: [result]}
+
+        elif part in uninary_operators:
+            result = {part: result}
+        elif isinstance(part, pp.ParseResults):
+            kind = part.get_name()
+            if kind == "list":
+                res = part.as_list()
+            else:
+                res = _parsed_query2dict(part)
+            if result is None:
+                result = res
+            elif isinstance(result, dict):
+                list(result.values())[0].append(res)
+        else:
+            result = part
+    return result
+
+
+def search_query_builder(query):
+    parsed_query = _grammar().parse_string(query)[0]
+    return _parsed_query2dict(parsed_query)
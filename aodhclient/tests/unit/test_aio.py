@@ -0,0 +1,82 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import asyncio
+import threading
+from unittest import mock
+
+from keystoneauth1 import session
+import testtools
+
+from aodhclient.v2 import aio
+from aodhclient.v2 import alarm
+
+
+class AsyncClientTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.session = session.Session()
+        self.client = aio.Client(session=self.session, max_concurrency=20)
+        self.addCleanup(self.client.close)
+
+    def test_connection_pool_resized(self):
+        adapter = self.session.session.get_adapter('https://')
+        self.assertIsInstance(adapter, session.TCPKeepAliveAdapter)
+        self.assertEqual(20, adapter._pool_maxsize)
+
+    @mock.patch.object(alarm.AlarmManager, 'get')
+    def test_gather(self, mock_get):
+        mock_get.side_effect = lambda alarm_id: {'alarm_id': alarm_id}
+
+        async def run():
+            return await asyncio.gather(
+                *[self.client.alarm.get(str(i)) for i in range(5)])
+
+        alarms = asyncio.run(run())
+        self.assertEqual([str(i) for i in range(5)],
+                         [a['alarm_id'] for a in alarms])
+        self.assertEqual(5, mock_get.call_count)
+
+    @mock.patch.object(alarm.AlarmManager, 'list')
+    def test_async_generator(self, mock_list):
+        mock_list.side_effect = [[{'alarm_id': 'a1'}, {'alarm_id': 'a2'}],
+                                 [{'alarm_id': 'a3'}]]
+
+        async def run():
+            return [a['alarm_id'] async for a in
+                    self.client.alarm.iter_list(page_size=2)]
+
+        self.assertEqual(['a1', 'a2', 'a3'], asyncio.run(run()))
+
+    def test_async_generator_closed(self):
+        closed_by = []
+
+        def iter_list(manager, **kwargs):
+            try:
+                yield from ({'alarm_id': 'a%d' % i} for i in range(5))
+            finally:
+                closed_by.append(threading.current_thread())
+
+        async def run():
+            items = self.client.alarm.iter_list(page_size=2)
+            async for a in items:
+                break
+            await items.aclose()
+            self.assertEqual(1, len(closed_by))
+            return a['alarm_id']
+
+        with mock.patch.object(alarm.AlarmManager, 'iter_list', iter_list):
+            self.assertEqual('a0', asyncio.run(run()))
+        # NOTE: closed by the executor, not garbage collected by the loop
+        self.assertIsNot(threading.main_thread(), closed_by[0])
@@ -14,13 +14,284 @@
 #    under the License.
 
 import argparse
+import io
+import os
+import tempfile
 from unittest import mock
 
+import fixtures
 import testtools
 
+from aodhclient import exceptions
 from aodhclient.v2 import alarm_cli
 
 
+class CliAlarmListTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = mock.Mock()
+        self.alarm_mgr_mock = self.app.client_manager.alarming.alarm
+        self.parser = mock.Mock()
+        self.cli_alarm_list = alarm_cli.CliAlarmList(self.app, self.parser)
+
+    def test_list_with_page_size(self):
+        self.alarm_mgr_mock.iter_list.return_value = iter([
+            {'alarm_id': 'a1', 'type': 'event', 'name': 'n1',
+             'state': 'ok', 'severity': 'low', 'enabled': True}])
+        parser = self.cli_alarm_list.get_parser('aodh alarm list')
+        args = parser.parse_args(['--page-size', '50'])
+        cols, rows = self.cli_alarm_list.take_action(args)
+        self.alarm_mgr_mock.iter_list.assert_called_once_with(
+            filters=None, sorts=None, page_size=50, marker=None,
+            prefetch=1)
+        self.alarm_mgr_mock.list.assert_not_called()
+        self.assertEqual(alarm_cli.ALARM_LIST_COLS, cols)
+        self.assertEqual([('a1', 'event', 'n1', 'ok', 'low', True)],
+                         list(rows))
+
+    def test_list_with_page_size_and_limit(self):
+        parser = self.cli_alarm_list.get_parser('aodh alarm list')
+        args = parser.parse_args(['--page-size', '50', '--limit', '10'])
+        self.assertRaises(exceptions.CommandError,
+                          self.cli_alarm_list.take_action, args)
+
+
+class CliAlarmBulkCreateTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = mock.Mock()
+        self.alarm_mgr_mock = self.app.client_manager.alarming.alarm
+        self.parser = mock.Mock()
+        self.cli_bulk_create = alarm_cli.CliAlarmBulkCreate(
+            self.app, self.parser)
+
+    def _write_file(self, content):
+        f = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False)
+        self.addCleanup(os.unlink, f.name)
+        with f:
+            f.write(content)
+        return f.name
+
+    def test_bulk_create(self):
+        path = self._write_file(
+            '{"name": "a1", "type": "event"}\n'
+            '\n'
+            '{"name": "a2", "type": "event"}\n')
+        self.alarm_mgr_mock.create_many.return_value = [
+            ({'alarm_id': 'id1', 'name': 'a1'}, None),
+            (None, exceptions.Conflict('Alarm a2 already exists')),
+        ]
+        parser = self.cli_bulk_create.get_parser('aodh alarm bulk create')
+        args = parser.parse_args(['--from-file', path,
+                                  '--concurrency', '4'])
+        cols, rows = self.cli_bulk_create.take_action(args)
+        self.alarm_mgr_mock.create_many.assert_called_once_with(
+            [{'name': 'a1', 'type': 'event'},
+             {'name': 'a2', 'type': 'event'}], concurrency=4)
+        self.assertEqual([(1, 'id1', 'a1', 'created'),
+                          (3, None, 'a2',
+                           'Alarm a2 already exists (HTTP 409)')], rows)
+        self.assertEqual(1, self.cli_bulk_create.failures)
+
+    def test_bulk_create_exit_code(self):
+        path = self._write_file('{"name": "a1", "type": "event"}\n')
+        self.alarm_mgr_mock.create_many.return_value = [
+            (None, exceptions.Conflict())]
+        parser = self.cli_bulk_create.get_parser('aodh alarm bulk create')
+        args = parser.parse_args(['--from-file', path, '-f', 'value'])
+        self.app.stdout = io.StringIO()
+        self.assertEqual(1, self.cli_bulk_create.run(args))
+
+    def test_bulk_create_invalid_line(self):
+        path = self._write_file('{"name": "a1", "type": "event"}\n'
+                                '{"name": \n')
+        parser = self.cli_bulk_create.get_parser('aodh alarm bulk create')
+        args = parser.parse_args(['--from-file', path])
+        self.assertRaises(exceptions.CommandError,
+                          self.cli_bulk_create.take_action, args)
+        self.alarm_mgr_mock.create_many.assert_not_called()
+
+
+class CliAlarmDeleteTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = mock.Mock()
+        self.app.stdout = io.StringIO()
+        self.app.stderr = io.StringIO()
+        self.alarm_mgr_mock = self.app.client_manager.alarming.alarm
+        self.alarm_mgr_mock.delete_many.return_value = []
+        self.parser = mock.Mock()
+        self.cli_alarm_delete = alarm_cli.CliAlarmDelete(
+            self.app, self.parser)
+
+    def _parse(self, argv):
+        parser = self.cli_alarm_delete.get_parser('aodh alarm delete')
+        return parser.parse_args(argv)
+
+    def test_delete_by_filter(self):
+        self.alarm_mgr_mock.iter_list.return_value = iter(
+            [{'alarm_id': 'a1'}, {'alarm_id': 'a2'}])
+        args = self._parse(['--filter', 'project_id=p1', '--yes',
+                            '--concurrency', '5'])
+        self.assertIsNone(self.cli_alarm_delete.take_action(args))
+        self.alarm_mgr_mock.iter_list.assert_called_once_with(
+            filters={'project_id': 'p1'}, page_size=1000)
+        self.alarm_mgr_mock.delete_many.assert_called_once_with(
+            ['a1', 'a2'], concurrency=5, progress=mock.ANY)
+        self.assertIn('0 failed', self.app.stdout.getvalue())
+
+    def test_delete_by_query(self):
+        self.alarm_mgr_mock.query.return_value = [{'alarm_id': 'a1'}]
+
+        def delete_many(alarm_ids, concurrency, progress):
+            for alarm_id in alarm_ids:
+                progress(alarm_id, exceptions.NotFound())
+            return [('a1', exceptions.NotFound())]
+
+        self.alarm_mgr_mock.delete_many.side_effect = delete_many
+        args = self._parse(['--query', 'state=alarm', '--yes'])
+        self.assertEqual(1, self.cli_alarm_delete.take_action(args))
+        self.alarm_mgr_mock.query.assert_called_once_with(
+            query='{"=": {"state": "alarm"}}', stream=True)
+        self.assertIn('Deleted 0 alarm(s)', self.app.stdout.getvalue())
+        self.assertIn('1 failed', self.app.stdout.getvalue())
+
+    def test_delete_progress(self):
+        self.alarm_mgr_mock.iter_list.return_value = iter(
+            {'alarm_id': 'a%d' % i} for i in range(250))
+
+        def delete_many(alarm_ids, concurrency, progress):
+            for alarm_id in alarm_ids:
+                progress(alarm_id, None)
+            return []
+
+        self.alarm_mgr_mock.delete_many.side_effect = delete_many
+        args = self._parse(['--filter', 'project_id=p1', '--yes'])
+        self.assertIsNone(self.cli_alarm_delete.take_action(args))
+        lines = self.app.stderr.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].startswith('100 alarm(s) processed, '))
+        self.assertTrue(lines[1].startswith('200 alarm(s) processed, '))
+        self.assertIn('Deleted 250 alarm(s)', self.app.stdout.getvalue())
+
+    def test_delete_by_filter_requires_yes(self):
+        args = self._parse(['--filter', 'project_id=p1'])
+        self.assertRaises(exceptions.CommandError,
+                          self.cli_alarm_delete.take_action, args)
+        self.alarm_mgr_mock.delete_many.assert_not_called()
+
+    def test_delete_by_filter_and_id(self):
+        args = self._parse(['--filter', 'project_id=p1', '--yes', 'a1'])
+        self.assertRaises(exceptions.CommandError,
+                          self.cli_alarm_delete.take_action, args)
+
+
+class AlarmNameCacheTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.EnvironmentVariable(
+            'XDG_CACHE_HOME', cache_dir))
+        self.useFixture(fixtures.EnvironmentVariable(
+            'AODH_ALARM_NAME_CACHE_TTL', '60'))
+        self.app = mock.Mock()
+        self.client = self.app.client_manager.alarming
+        self.client.api.get_endpoint.return_value = 'http://aodh'
+        self.client.api.get_project_id.return_value = 'p1'
+        self.alarm = {'alarm_id': 'id1', 'name': 'alarm1', 'state': 'ok',
+                      'time_constraints': []}
+        self.client.alarm.query.return_value = [self.alarm]
+        self.client.alarm.get.return_value = self.alarm
+        self.parser = mock.Mock()
+
+    def _run(self, cls, argv):
+        cmd = cls(self.app, self.parser)
+        parser = cmd.get_parser('aodh')
+        return cmd.take_action(parser.parse_args(argv))
+
+    def test_state_get_uses_cache(self):
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        ret = self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self.assertEqual(('ok',), ret[1])
+        self.assertEqual(1, self.client.alarm.query.call_count)
+        self.client.alarm.get.assert_called_once_with(alarm_id='id1')
+        self.client.alarm.get_state.assert_not_called()
+
+    def test_show_uses_cache(self):
+        self._run(alarm_cli.CliAlarmShow, ['--name', 'alarm1'])
+        self._run(alarm_cli.CliAlarmShow, ['--name', 'alarm1'])
+        self.assertEqual(1, self.client.alarm.query.call_count)
+        self.assertEqual(1, self.client.alarm.get.call_count)
+
+    def test_update_uses_cache(self):
+        self.client.alarm.update.return_value = self.alarm
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self._run(alarm_cli.CliAlarmUpdate, ['--name', 'alarm1',
+                                             '--description', 'foo'])
+        self.assertEqual(1, self.client.alarm.query.call_count)
+        self.assertEqual(1, self.client.alarm.get.call_count)
+        kwargs = self.client.alarm.update.call_args[1]
+        self.assertEqual('id1', kwargs['alarm_id'])
+        self.assertEqual('foo', kwargs['alarm_update']['description'])
+        self.assertIs(self.alarm, kwargs['alarm'])
+
+    def test_cache_disabled(self):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'AODH_ALARM_NAME_CACHE_TTL'))
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self.assertEqual(2, self.client.alarm.query.call_count)
+
+    def test_cache_scoped_by_project(self):
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self.client.api.get_project_id.return_value = 'p2'
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self.assertEqual(2, self.client.alarm.query.call_count)
+
+    def test_invalidation_on_not_found(self):
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self.client.alarm.query.return_value = [
+            {'alarm_id': 'id2', 'name': 'alarm1', 'state': 'alarm'}]
+        self.client.alarm.get.side_effect = exceptions.NotFound()
+        ret = self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self.assertEqual(('state',), ret[0])
+        self.assertEqual(('alarm',), ret[1])
+        self.assertEqual(2, self.client.alarm.query.call_count)
+        self.client.alarm.get_state.assert_not_called()
+
+    def test_invalidation_on_delete(self):
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self._run(alarm_cli.CliAlarmDelete, ['--name', 'alarm1'])
+        self.client.alarm.delete.assert_called_once_with('id1')
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self.assertEqual(2, self.client.alarm.query.call_count)
+
+    def test_delete_checks_cached_name(self):
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        # NOTE: id1 has been renamed and id2 now has its name
+        self.client.alarm.get.return_value = {'alarm_id': 'id1',
+                                              'name': 'renamed'}
+        self.client.alarm.query.return_value = [
+            {'alarm_id': 'id2', 'name': 'alarm1'}]
+        self._run(alarm_cli.CliAlarmDelete, ['--name', 'alarm1'])
+        self.client.alarm.get.assert_called_once_with(alarm_id='id1')
+        self.client.alarm.delete.assert_called_once_with('id2')
+
+    def test_show_checks_cached_name(self):
+        self._run(alarm_cli.CliAlarmStateGet, ['--name', 'alarm1'])
+        self.client.alarm.get.return_value = {
+            'alarm_id': 'id1', 'name': 'renamed', 'time_constraints': []}
+        self.client.alarm.query.return_value = [
+            {'alarm_id': 'id2', 'name': 'alarm1', 'time_constraints': []}]
+        self._run(alarm_cli.CliAlarmShow, ['--name', 'alarm1'])
+        self.client.alarm.get.assert_called_once_with(alarm_id='id1')
+        self.assertEqual(2, self.client.alarm.query.call_count)
+
+
 class CliAlarmCreateTest(testtools.TestCase):
 
     def setUp(self):
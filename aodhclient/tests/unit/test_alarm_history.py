@@ -13,12 +13,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-
+import itertools
 from unittest import mock
 
 import testtools
 
+from oslo_serialization import jsonutils
+
+from aodhclient import exceptions
+from aodhclient import utils
 from aodhclient.v2 import alarm_history
+from aodhclient.v2 import alarm_history_cli
 
 
 class AlarmHistoryManagerTest(testtools.TestCase):
@@ -49,3 +54,214 @@ class AlarmHistoryManagerTest(testtools.TestCase):
             'v2/query/alarms/history',
             data=expected_called_data,
             headers={'Content-Type': 'application/json'})
+
+    @mock.patch.object(alarm_history.AlarmHistoryManager, '_post')
+    def test_search_stream(self, mock_ahm):
+        mock_ahm.return_value.iter_content.return_value = [
+            b'[{"event_id": "e1"},', b' {"event_id": "e2"}]']
+        ahm = alarm_history.AlarmHistoryManager(self.client)
+        history = ahm.search(stream=True)
+        mock_ahm.assert_called_with(
+            'v2/query/alarms/history', data='{}', stream=True,
+            headers={'Content-Type': 'application/json'})
+        self.assertEqual(['e1', 'e2'], [h['event_id'] for h in history])
+
+    @mock.patch.object(alarm_history.AlarmHistoryManager, '_post')
+    def test_search_limit_orderby(self, mock_ahm):
+        ahm = alarm_history.AlarmHistoryManager(self.client)
+        ahm.search(limit=10, orderby=[{'timestamp': 'desc'}])
+        body = jsonutils.loads(mock_ahm.call_args[1]['data'])
+        self.assertEqual({'limit': 10,
+                          'orderby': '[{"timestamp": "desc"}]'}, body)
+
+    @mock.patch.object(alarm_history.AlarmHistoryManager, 'search')
+    def test_iter_search(self, mock_search):
+        def entry(event_id, timestamp):
+            return {'event_id': event_id, 'timestamp': timestamp}
+
+        mock_search.side_effect = [
+            iter([entry('e1', 't1'), entry('e2', 't2')]),
+            iter([entry('e3', 't2'), entry('e4', 't3')]),
+            iter([entry('e4', 't3'), entry('e5', 't3')]),
+            iter([]),
+        ]
+        ahm = alarm_history.AlarmHistoryManager(self.client)
+        history = ahm.iter_search('{"=": {"type": "creation"}}', page_size=2,
+                                  end='t9')
+        self.assertEqual(['e1', 'e2', 'e3', 'e4', 'e5'],
+                         [h['event_id'] for h in history])
+        queries = [jsonutils.loads(c[0][0])
+                   for c in mock_search.call_args_list]
+        self.assertEqual({'and': [{'=': {'type': 'creation'}},
+                                  {'<': {'timestamp': 't9'}}]}, queries[0])
+        self.assertEqual({'and': [{'=': {'type': 'creation'}},
+                                  {'<': {'timestamp': 't9'}},
+                                  {'>=': {'timestamp': 't2'}},
+                                  {'not': {'in': {'event_id': ['e2']}}}]},
+                         queries[1])
+        self.assertEqual({'not': {'in': {'event_id': ['e4', 'e5']}}},
+                         queries[3]['and'][-1])
+        mock_search.assert_called_with(mock.ANY, stream=True, limit=2,
+                                       orderby=[{'timestamp': 'asc'}])
+
+    @mock.patch.object(alarm_history.AlarmHistoryManager, 'search')
+    def test_iter_search_no_progress(self, mock_search):
+        entries = [{'event_id': 'e1', 'timestamp': 't1'}]
+        mock_search.side_effect = lambda *a, **kw: iter(entries)
+        ahm = alarm_history.AlarmHistoryManager(self.client)
+        self.assertEqual(entries, list(ahm.iter_search(page_size=1)))
+        self.assertEqual(2, mock_search.call_count)
+
+
+def _entry(event_id, timestamp, alarm_id='a1'):
+    return {'event_id': event_id, 'timestamp': timestamp,
+            'alarm_id': alarm_id, 'type': 'state transition',
+            'detail': '{}'}
+
+
+class AlarmHistoryTailTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ahm = alarm_history.AlarmHistoryManager(mock.Mock())
+
+    @mock.patch.object(alarm_history.AlarmHistoryManager, 'get')
+    def test_tail_alarm(self, mock_get):
+        mock_get.side_effect = [
+            [_entry('e3', 't3'), _entry('e2', 't2')],
+            [_entry('e3', 't3'), _entry('e2', 't2')],
+            [_entry('e5', 't4'), _entry('e4', 't3'), _entry('e3', 't3'),
+             _entry('e2', 't2')],
+        ]
+        history = self.ahm.tail('a1', lines=2, interval=2, page_size=10)
+        self.assertEqual(['e2', 'e3', 'e4', 'e5'],
+                         [e['event_id'] for e in itertools.islice(history,
+                                                                  4)])
+        self.assertEqual([mock.call(2), mock.call(4)],
+                         self.sleep.call_args_list)
+        mock_get.assert_has_calls([
+            mock.call('a1', limit=2, sorts=['timestamp:desc']),
+            mock.call('a1', limit=10, marker=None, sorts=['timestamp:desc'])])
+
+    @mock.patch.object(alarm_history.AlarmHistoryManager, 'get')
+    def test_tail_alarm_pages(self, mock_get):
+        mock_get.side_effect = [
+            [_entry('e1', 't1')],
+            [_entry('e4', 't4'), _entry('e3', 't3')],
+            [_entry('e2', 't2'), _entry('e1', 't1')],
+            [],
+        ]
+        history = self.ahm.tail('a1', lines=0, page_size=2)
+        self.assertEqual(['e2', 'e3', 'e4'],
+                         [e['event_id'] for e in itertools.islice(history,
+                                                                  3)])
+        mock_get.assert_called_with('a1', limit=2, marker='e1',
+                                    sorts=['timestamp:desc'])
+
+    @mock.patch.object(alarm_history.AlarmHistoryManager, 'get',
+                       return_value=[])
+    def test_max_interval(self, mock_get):
+        self.sleep.side_effect = [None, None, None, KeyboardInterrupt]
+        history = self.ahm.tail('a1', interval=1, max_interval=3)
+        self.assertRaises(KeyboardInterrupt, list, history)
+        self.assertEqual([mock.call(1), mock.call(2), mock.call(3),
+                          mock.call(3)], self.sleep.call_args_list)
+
+    @mock.patch.object(alarm_history.AlarmHistoryManager, 'iter_search')
+    @mock.patch.object(alarm_history.AlarmHistoryManager, 'search')
+    def test_tail_query(self, mock_search, mock_iter_search):
+        mock_search.return_value = [_entry('e2', 't2'), _entry('e1', 't2')]
+        mock_iter_search.return_value = iter(
+            [_entry('e1', 't2'), _entry('e2', 't2'), _entry('e3', 't2')])
+        history = self.ahm.tail(query='{"=": {"type": "creation"}}',
+                                lines=1)
+        self.assertEqual(['e2', 'e3'],
+                         [e['event_id'] for e in itertools.islice(history,
+                                                                  2)])
+        mock_search.assert_called_once_with(
+            '{"=": {"type": "creation"}}', limit=1,
+            orderby=[{'timestamp': 'desc'}])
+        mock_iter_search.assert_called_once_with(
+            '{"=": {"type": "creation"}}', page_size=100, start='t2')
+
+
+class CliAlarmHistorySearchTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = mock.Mock()
+        self.history_mgr = self.app.client_manager.alarming.alarm_history
+        self.cli = alarm_history_cli.CliAlarmHistorySearch(self.app,
+                                                           mock.Mock())
+
+    def _take_action(self, args):
+        parsed_args = self.cli.get_parser('aodh').parse_args(args)
+        cols, rows = self.cli.take_action(parsed_args)
+        return list(rows)
+
+    def test_search_streamed(self):
+        self.history_mgr.search.return_value = iter([
+            {'alarm_id': 'a1', 'timestamp': 't1', 'type': 'creation',
+             'detail': '{}'}])
+        rows = self._take_action(['--limit', '5', '--sort', 'timestamp:desc',
+                                  '--sort', 'type'])
+        self.assertEqual([('a1', 't1', 'creation', '{}')], rows)
+        self.history_mgr.search.assert_called_once_with(
+            query=None, stream=True, limit=5,
+            orderby=[{'timestamp': 'desc'}, {'type': 'asc'}])
+
+    def test_search_page_size(self):
+        self.history_mgr.iter_search.return_value = iter([])
+        self.assertEqual([], self._take_action(
+            ['--query', 'type=creation', '--page-size', '100']))
+        self.history_mgr.iter_search.assert_called_once_with(
+            query='{"=": {"type": "creation"}}', page_size=100)
+
+    def test_search_page_size_and_limit(self):
+        self.assertRaises(exceptions.CommandError, self._take_action,
+                          ['--page-size', '100', '--limit', '5'])
+
+
+class CliAlarmHistoryTailTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = mock.Mock()
+        self.history_mgr = self.app.client_manager.alarming.alarm_history
+        self.cli = alarm_history_cli.CliAlarmHistoryTail(self.app,
+                                                         mock.Mock())
+
+    def _parse(self, args):
+        return self.cli.get_parser('aodh').parse_args(args)
+
+    def test_tail(self):
+        def tail(**kwargs):
+            yield _entry('e1', 't1')
+            raise KeyboardInterrupt
+
+        self.history_mgr.tail.side_effect = tail
+        self.cli.take_action(self._parse(['a1', '-n', '5']))
+        self.app.stdout.write.assert_called_once_with(
+            't1 a1 state transition {}\n')
+        self.history_mgr.tail.assert_called_once_with(
+            alarm_id='a1', query=None, lines=5, interval=2, max_interval=30)
+
+    def test_query_help_example(self):
+        query = [a for a in self.cli.get_parser('aodh')._actions
+                 if a.dest == 'query'][0]
+        example = query.help.split('e.g. ', 1)[1]
+        self.assertEqual({'and': [{'=': {'type': 'state transition'}},
+                                  {'=': {'project_id': 'my-id'}}]},
+                         utils.search_query_builder(example))
+
+    def test_tail_alarm_and_query(self):
+        self.assertRaises(exceptions.CommandError, self.cli.take_action,
+                          self._parse(['a1', '--query', 'type=creation']))
+
+    def test_tail_invalid_interval(self):
+        self.assertRaises(exceptions.CommandError, self.cli.take_action,
+                          self._parse(['--interval', '10',
+                                       '--max-interval', '5']))
@@ -0,0 +1,152 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+from unittest import mock
+
+import fixtures
+from oslo_utils import importutils
+import testtools
+
+from aodhclient import exceptions
+from aodhclient import utils
+from aodhclient.v2 import alarm_history_cli
+from aodhclient.v2 import alarm_history_store
+
+ENTRIES = [{'event_id': 'e%d' % i, 'alarm_id': 'a%d' % (i % 3),
+            'timestamp': '2024-01-01T00:00:%02d' % i,
+            'type': 'creation' if i % 2 else 'state transition',
+            'detail': '{}', 'user_id': '%d' % (i * 5), 'project_id': 'p1'}
+           for i in range(20)]
+QUERY = ("alarm_id=a1 and (type=creation or "
+         "timestamp>'2024-01-01T00:00:15') and not event_id=e1")
+
+
+class _StoreTestMixin:
+    extension = None
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'history.' + self.extension)
+        self.store = alarm_history_store.open_store(self.path)
+        self.assertEqual(20, self.store.write(iter(ENTRIES)))
+
+    def _search(self, query=None, **kwargs):
+        if query:
+            query = utils.search_query_builder(query)
+        return [e['event_id'] for e in self.store.search(query, **kwargs)]
+
+    def test_search(self):
+        self.assertEqual(['e7', 'e13', 'e16', 'e19'], self._search(QUERY))
+        self.assertEqual(ENTRIES[0],
+                         {k: v for k, v in
+                          next(self.store.search(None)).items() if v})
+
+    def test_search_orderby_limit(self):
+        self.assertEqual(['e19', 'e16'], self._search(
+            QUERY, limit=2, orderby=[{'timestamp': 'desc'}]))
+
+    def test_search_null(self):
+        self.assertEqual(20, len(self._search('severity=None')))
+        self.assertEqual([], self._search('project_id=None'))
+
+    def test_search_number(self):
+        self.assertEqual(['e2'], self._search('user_id=10'))
+        self.assertEqual(['e0', 'e1', 'e2', 'e3'],
+                         self._search('user_id<20'))
+        self.assertEqual(['e19'], self._search('user_id>=92.5'))
+        self.assertEqual([], self._search('type>0'))
+
+    def test_search_boolean(self):
+        self.assertEqual([], self._search('type=true'))
+        self.assertEqual(20, len(self._search('type!=false')))
+
+    def test_search_unknown_field(self):
+        self.assertRaises(ValueError, self._search, 'foo=bar')
+
+
+class SQLiteStoreTest(_StoreTestMixin, testtools.TestCase):
+    extension = 'sqlite'
+
+    def test_write_merges(self):
+        entry = dict(ENTRIES[0], type='deletion')
+        self.assertEqual(1, self.store.write([entry]))
+        self.assertEqual(20, len(self._search()))
+        self.assertEqual(['e0'], self._search('type=deletion'))
+
+
+@testtools.skipIf(importutils.try_import('pyarrow') is None,
+                  "pyarrow is not installed")
+class ParquetStoreTest(_StoreTestMixin, testtools.TestCase):
+    extension = 'parquet'
+
+
+@testtools.skipIf(importutils.try_import('pyarrow') is None,
+                  "pyarrow is not installed")
+class ArrowStoreTest(_StoreTestMixin, testtools.TestCase):
+    extension = 'arrow'
+
+
+class OpenStoreTest(testtools.TestCase):
+
+    def test_unknown_extension(self):
+        self.assertRaises(ValueError, alarm_history_store.open_store,
+                          'history.csv')
+
+    @mock.patch.object(importutils, 'try_import', return_value=None)
+    def test_pyarrow_missing(self, mock_import):
+        self.assertRaises(ImportError, alarm_history_store.open_store,
+                          'history.parquet')
+
+
+class CliAlarmHistoryExportTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = mock.Mock()
+        self.history_mgr = self.app.client_manager.alarming.alarm_history
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'history.sqlite')
+
+    def _take_action(self, cls, args):
+        cli = cls(self.app, mock.Mock())
+        return cli.take_action(cli.get_parser('aodh').parse_args(args))
+
+    def test_export_and_search_local(self):
+        self.history_mgr.iter_search.return_value = iter(ENTRIES)
+        self._take_action(alarm_history_cli.CliAlarmHistoryExport,
+                          ['--query', 'project_id=p1', '--output',
+                           self.path, '--page-size', '500'])
+        self.history_mgr.iter_search.assert_called_once_with(
+            query='{"=": {"project_id": "p1"}}', page_size=500)
+        self.app.stdout.write.assert_called_once_with(
+            'Exported 20 alarm history entries to %s\n' % self.path)
+
+        cols, rows = self._take_action(
+            alarm_history_cli.CliAlarmHistorySearch,
+            ['--local', self.path, '--query', QUERY, '--limit', '1'])
+        self.assertEqual([('a1', '2024-01-01T00:00:07', 'creation', '{}')],
+                         list(rows))
+        self.history_mgr.search.assert_not_called()
+
+    def test_search_local_invalid_query(self):
+        alarm_history_store.SQLiteStore(self.path).write([])
+        self.assertRaises(exceptions.CommandError, self._take_action,
+                          alarm_history_cli.CliAlarmHistorySearch,
+                          ['--local', self.path, '--query', 'foo=bar'])
+
+    def test_export_unsupported_file(self):
+        self.assertRaises(exceptions.CommandError, self._take_action,
+                          alarm_history_cli.CliAlarmHistoryExport,
+                          ['--output', 'history.csv'])
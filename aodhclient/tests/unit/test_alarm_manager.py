@@ -16,6 +16,9 @@
 import testtools
 from unittest import mock
 
+from oslo_serialization import jsonutils
+
+from aodhclient import exceptions
 from aodhclient.v2 import alarm
 
 
@@ -45,6 +48,45 @@ class AlarmManagerTest(testtools.TestCase):
         am.list()
         mock_am.assert_called_with('v2/alarms')
 
+    @mock.patch.object(alarm.AlarmManager, '_get')
+    def test_iter_list(self, mock_am):
+        mock_am.return_value.json.side_effect = [
+            [{'alarm_id': 'a1'}, {'alarm_id': 'a2'}],
+            [{'alarm_id': 'a3'}],
+        ]
+        am = alarm.AlarmManager(self.client)
+        alarms = am.iter_list(page_size=2, sorts=['name:asc'])
+        self.assertEqual(['a1', 'a2', 'a3'],
+                         [a['alarm_id'] for a in alarms])
+        mock_am.assert_has_calls([
+            mock.call('v2/alarms?limit=2&sort=name%3Aasc'),
+            mock.call().json(),
+            mock.call('v2/alarms?limit=2&marker=a2&sort=name%3Aasc'),
+            mock.call().json()])
+
+    @mock.patch.object(alarm.AlarmManager, '_get')
+    def test_iter_list_with_prefetch(self, mock_am):
+        mock_am.return_value.json.side_effect = [
+            [{'alarm_id': 'a1'}, {'alarm_id': 'a2'}],
+            [{'alarm_id': 'a3'}, {'alarm_id': 'a4'}],
+            [],
+        ]
+        am = alarm.AlarmManager(self.client)
+        alarms = am.iter_list(page_size=2, prefetch=1)
+        self.assertEqual(['a1', 'a2', 'a3', 'a4'],
+                         [a['alarm_id'] for a in alarms])
+        self.assertEqual(3, mock_am.call_count)
+
+    @mock.patch.object(alarm.AlarmManager, '_get')
+    def test_iter_list_without_page_size(self, mock_am):
+        mock_am.return_value.json.side_effect = [
+            [{'alarm_id': 'a1'}, {'alarm_id': 'a2'}],
+            [],
+        ]
+        am = alarm.AlarmManager(self.client)
+        self.assertEqual(2, len(list(am.iter_list())))
+        mock_am.assert_called_with('v2/alarms?marker=a2')
+
     @mock.patch.object(alarm.AlarmManager, '_post')
     def test_query(self, mock_am):
         am = alarm.AlarmManager(self.client)
@@ -59,6 +101,26 @@ class AlarmManagerTest(testtools.TestCase):
             data=expected_value,
             headers=headers_value)
 
+    @mock.patch.object(alarm.AlarmManager, '_get')
+    def test_list_stream(self, mock_am):
+        mock_am.return_value.iter_content.return_value = [
+            b'[{"alarm_id": "a1"}, {"ala', b'rm_id": "a2"}]']
+        am = alarm.AlarmManager(self.client)
+        alarms = am.list(limit=2, stream=True)
+        mock_am.assert_called_with('v2/alarms?limit=2', stream=True)
+        self.assertEqual(['a1', 'a2'], [a['alarm_id'] for a in alarms])
+        mock_am.return_value.close.assert_called_once_with()
+
+    @mock.patch.object(alarm.AlarmManager, '_post')
+    def test_query_stream(self, mock_am):
+        mock_am.return_value.iter_content.return_value = [b'[{"a": 1}]']
+        am = alarm.AlarmManager(self.client)
+        alarms = am.query('{"=": {"type": "event"}}', stream=True)
+        self.assertEqual({'a': 1}, next(alarms))
+        alarms.close()
+        mock_am.return_value.close.assert_called_once_with()
+        self.assertTrue(mock_am.call_args[1]['stream'])
+
     @mock.patch.object(alarm.AlarmManager, '_get')
     def test_list_with_filters(self, mock_am):
         am = alarm.AlarmManager(self.client)
@@ -76,6 +138,71 @@ class AlarmManagerTest(testtools.TestCase):
         mock_am.assert_called_with(
             'v2/alarms/01919bbd-8b0e-451c-be28-abe250ae9b1b')
 
+    @mock.patch.object(alarm.AlarmManager, 'create')
+    def test_create_many(self, mock_create):
+        error = exceptions.Conflict()
+
+        def create(alarm):
+            if alarm['name'] == 'a2':
+                raise error
+            return dict(alarm, alarm_id=alarm['name'] + '-id')
+
+        mock_create.side_effect = create
+        am = alarm.AlarmManager(self.client)
+        alarms = [{'name': 'a%d' % i, 'type': 'event'} for i in range(5)]
+        results = am.create_many(alarms, concurrency=2)
+        self.assertEqual(5, mock_create.call_count)
+        self.assertEqual((None, error), results[2])
+        self.assertEqual(['a0-id', 'a1-id', None, 'a3-id', 'a4-id'],
+                         [r[0] and r[0]['alarm_id'] for r in results])
+
+    @mock.patch.object(alarm.AlarmManager, '_put')
+    @mock.patch.object(alarm.AlarmManager, '_get')
+    def test_update_merges_rule(self, mock_get, mock_put):
+        mock_get.return_value.json.return_value = {
+            'name': 'alarm1', 'type': 'threshold',
+            'threshold_rule': {'meter_name': 'cpu', 'threshold': 80.0}}
+        am = alarm.AlarmManager(self.client)
+        am.update('a1', {'threshold_rule': {'threshold': 90.0},
+                         'event_rule': {}, 'composite_rule': None,
+                         'severity': 'low'})
+        mock_get.assert_called_once_with('v2/alarms/a1')
+        self.assertEqual(
+            {'name': 'alarm1', 'type': 'threshold', 'severity': 'low',
+             'threshold_rule': {'meter_name': 'cpu', 'threshold': 90.0}},
+            jsonutils.loads(mock_put.call_args[1]['data']))
+
+    @mock.patch.object(alarm.AlarmManager, '_put')
+    @mock.patch.object(alarm.AlarmManager, '_get')
+    def test_update_with_alarm(self, mock_get, mock_put):
+        current = {'name': 'alarm1', 'type': 'composite',
+                   'composite_rule': {'or': [{'threshold': 1}]}}
+        am = alarm.AlarmManager(self.client)
+        am.update('a1', {'composite_rule': {'and': [{'threshold': 2}]}},
+                  alarm=current)
+        mock_get.assert_not_called()
+        self.assertEqual(
+            {'name': 'alarm1', 'type': 'composite',
+             'composite_rule': {'and': [{'threshold': 2}]}},
+            jsonutils.loads(mock_put.call_args[1]['data']))
+        # The given alarm is left untouched
+        self.assertEqual({'or': [{'threshold': 1}]},
+                         current['composite_rule'])
+
+    @mock.patch.object(alarm.AlarmManager, '_put')
+    def test_update_type_change(self, mock_put):
+        current = {'name': 'alarm1', 'type': 'event',
+                   'event_rule': {'event_type': 'compute.*'}}
+        am = alarm.AlarmManager(self.client)
+        am.update('a1', {'type': 'gnocchi_resources_threshold',
+                         'gnocchi_resources_threshold_rule': {'metric': 'm'},
+                         'event_rule': {'event_type': 'x'}},
+                  alarm=current)
+        self.assertEqual(
+            {'name': 'alarm1', 'type': 'gnocchi_resources_threshold',
+             'gnocchi_resources_threshold_rule': {'metric': 'm'}},
+            jsonutils.loads(mock_put.call_args[1]['data']))
+
     @mock.patch.object(alarm.AlarmManager, '_delete')
     def test_delete(self, mock_am):
         am = alarm.AlarmManager(self.client)
@@ -83,6 +210,25 @@ class AlarmManagerTest(testtools.TestCase):
         mock_am.assert_called_with(
             'v2/alarms/01919bbd-8b0e-451c-be28-abe250ae9b1b')
 
+    @mock.patch.object(alarm.AlarmManager, 'delete')
+    def test_delete_many(self, mock_delete):
+        error = exceptions.NotFound()
+        mock_delete.side_effect = lambda alarm_id: (
+            self._raise(error) if alarm_id == 'a3' else None)
+        progress = mock.Mock()
+        am = alarm.AlarmManager(self.client)
+        failures = am.delete_many(iter(['a1', 'a2', 'a3', 'a4']),
+                                  concurrency=3, progress=progress)
+        self.assertEqual([('a3', error)], failures)
+        self.assertEqual(4, mock_delete.call_count)
+        self.assertEqual(4, progress.call_count)
+        progress.assert_any_call('a3', error)
+        progress.assert_any_call('a1', None)
+
+    @staticmethod
+    def _raise(error):
+        raise error
+
     def test_clean_rules_event_alarm(self):
         am = alarm.AlarmManager(self.client)
         alarm_value = self.alarms.get('event_alarm')
@@ -0,0 +1,105 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+import testtools
+
+from aodhclient import client
+from aodhclient import exceptions
+from aodhclient.tests.perf import bench_api
+from aodhclient.tests.perf import bench_format
+from aodhclient.tests.perf import fake_api
+from aodhclient import utils
+from aodhclient.v2 import alarm_cli
+
+
+class FakeAodhAPITest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = fake_api.FakeAodhAPI(alarms=len(alarm_cli.ALARM_TYPES) * 2,
+                                        history=3)
+        self.api.start()
+        self.addCleanup(self.api.stop)
+        self.aodh = client.Client('2', session=client.create_session(),
+                                  endpoint_override=self.api.url)
+
+    def test_alarms(self):
+        alarms = self.aodh.alarm.list()
+        self.assertEqual(set(alarm_cli.ALARM_TYPES),
+                         {a['type'] for a in alarms})
+        page = self.aodh.alarm.list(limit=3, marker=alarms[2]['alarm_id'])
+        self.assertEqual(alarms[3:6], page)
+        self.assertEqual(alarms[0], self.aodh.alarm.get(alarms[0]['alarm_id']))
+        events = self.aodh.alarm.query(json.dumps({'=': {'type': 'event'}}))
+        self.assertEqual(2, len(events))
+        self.assertRaises(exceptions.NotFound, self.aodh.alarm.get, 'unknown')
+
+    def test_update_and_delete(self):
+        alarm_id = next(iter(self.api.alarms))
+        alarm = self.aodh.alarm.update(alarm_id, {'name': 'renamed'})
+        self.assertEqual('renamed', self.aodh.alarm.get(alarm_id)['name'])
+        self.assertEqual(alarm_id, alarm['alarm_id'])
+        self.aodh.alarm.delete(alarm_id)
+        self.assertNotIn(alarm_id, self.api.alarms)
+
+    def test_history(self):
+        alarm_id = next(iter(self.api.alarms))
+        history = self.aodh.alarm_history.get(alarm_id)
+        self.assertEqual(['state transition', 'state transition',
+                          'creation'], [h['type'] for h in history])
+        entries = self.aodh.alarm_history.search(
+            json.dumps({'=': {'type': 'creation'}}), limit=5,
+            orderby=[{'timestamp': 'desc'}])
+        self.assertEqual(5, len(entries))
+        timestamps = [e['timestamp'] for e in entries]
+        self.assertEqual(sorted(timestamps, reverse=True), timestamps)
+
+
+class BenchAPITest(testtools.TestCase):
+
+    def test_run_and_compare(self):
+        only = ['alarm.get', 'alarm.create_many+delete_many',
+                'command:alarm show']
+        results = bench_api.run(alarms=10, history=2, iterations=2,
+                                concurrency=2, only=only)
+        self.assertEqual(only, [r['name'] for r in results['results']])
+        bulk = results['results'][1]
+        self.assertEqual((2, 40, 40), (bulk['iterations'],
+                                       bulk['operations'], bulk['requests']))
+        self.assertEqual(10, results['config']['alarms'])
+
+        baseline = json.loads(json.dumps(results))
+        baseline['results'][0]['latency_mean'] /= 2
+        changes = bench_api.compare(baseline, results)
+        self.assertEqual(3, len(changes))
+        self.assertEqual(('alarm.get', 100.0),
+                         (changes[0][0], round(changes[0][3], 6)))
+
+
+class BenchFormatTest(testtools.TestCase):
+
+    def test_run_matches_baseline(self):
+        results = bench_format.run(rows=[20], repeat=1)
+        with open(bench_format.BASELINE) as f:
+            baseline = json.load(f)
+        names = {r['name'].split('/')[0] for r in results['results']}
+        self.assertEqual(names, {r['name'].split('/')[0]
+                                 for r in baseline['results']})
+        self.assertTrue(all(r['time'] > 0 for r in results['results']))
+
+    def test_queries_parse(self):
+        queries = bench_format._queries(bench_format._alarm_pool()[:16])
+        for query in queries:
+            self.assertTrue(utils.cli_to_array(query))
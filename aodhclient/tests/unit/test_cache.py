@@ -0,0 +1,297 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import json
+import os
+import stat
+from unittest import mock
+
+import fixtures
+from keystoneauth1 import access
+from keystoneauth1 import fixture as ks_fixture
+from keystoneauth1.identity import v3
+from oslo_utils import timeutils
+import testtools
+
+from aodhclient import cache
+from aodhclient import client
+from aodhclient.v2 import client as v2_client
+
+
+class FileCacheTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'sub', 'cache.json')
+        self.cache = cache.FileCache(self.path, ttl=60, maxsize=2)
+
+    def test_set_get(self):
+        self.assertIsNone(self.cache.get('foo'))
+        self.cache.set('foo', 'bar')
+        self.assertEqual('bar', self.cache.get('foo'))
+        self.assertEqual('bar', cache.FileCache(self.path).get('foo'))
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.path).st_mode))
+        self.assertEqual(
+            0o700, stat.S_IMODE(os.stat(os.path.dirname(self.path)).st_mode))
+
+    @mock.patch('time.time')
+    def test_expiry(self, mock_time):
+        mock_time.return_value = 1000
+        self.cache.set('foo', 'bar')
+        self.cache.set('short', 'lived', ttl=1)
+        mock_time.return_value = 1030
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual('bar', self.cache.get('foo'))
+        mock_time.return_value = 1061
+        self.assertIsNone(self.cache.get('foo'))
+
+    def test_maxsize(self):
+        self.cache.set('a', 1, ttl=10)
+        self.cache.set('b', 2, ttl=30)
+        self.cache.set('c', 3, ttl=20)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(2, self.cache.get('b'))
+        self.assertEqual(3, self.cache.get('c'))
+
+    def test_delete(self):
+        self.cache.set('a', 'id1')
+        self.cache.set('b', 'id2')
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.delete_value('id2')
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_corrupted_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        self.assertIsNone(self.cache.get('foo'))
+        self.cache.set('foo', 'bar')
+        self.assertEqual('bar', self.cache.get('foo'))
+
+
+class MemoryCacheTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = cache.MemoryCache(ttl=60, maxsize=2)
+
+    @mock.patch('time.time')
+    def test_expiry(self, mock_time):
+        mock_time.return_value = 1000
+        self.cache.set('foo', 'bar')
+        self.cache.set('short', 'lived', ttl=1)
+        mock_time.return_value = 1030
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual('bar', self.cache.get('foo'))
+        mock_time.return_value = 1061
+        self.assertIsNone(self.cache.get('foo'))
+
+    def test_lru(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.assertEqual(1, self.cache.get('a'))
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(1, self.cache.get('a'))
+        self.assertEqual(3, self.cache.get('c'))
+
+    def test_delete_prefix(self):
+        self.cache.set('v2/alarms/1', 1)
+        self.cache.set('v2/capabilities', 2)
+        self.cache.delete_prefix('v2/alarms')
+        self.assertIsNone(self.cache.get('v2/alarms/1'))
+        self.assertEqual(2, self.cache.get('v2/capabilities'))
+
+
+def _response(status_code, body=None, **headers):
+    resp = mock.Mock(status_code=status_code, headers=headers)
+    resp.text = body
+    resp.json.side_effect = lambda: json.loads(body)
+    return resp
+
+
+class ResponseCacheTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for name, value in (('get_endpoint', 'http://aodh'),
+                            ('get_project_id', 'proj')):
+            patcher = mock.patch.object(client.SessionClient, name,
+                                        return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(client.SessionClient, 'request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = cache.ResponseCache()
+        self.client = v2_client.Client(response_cache=self.cache)
+
+    def _headers(self, call=-1):
+        return self.request.call_args_list[call][1]['headers']
+
+    def test_not_modified(self):
+        self.request.side_effect = [
+            _response(200, '{"name": "foo"}', ETag='"v1"',
+                      **{'Content-Type': 'application/json'}),
+            _response(304, ETag='"v1"'),
+        ]
+        self.assertEqual({'name': 'foo'}, self.client.alarm.get('id1'))
+        self.assertNotIn('If-None-Match', self._headers())
+        self.assertEqual({'name': 'foo'}, self.client.alarm.get('id1'))
+        self.assertEqual('"v1"', self._headers()['If-None-Match'])
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+
+    def test_modified(self):
+        lm = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        self.request.side_effect = [
+            _response(200, '{"tenant": 1}', **{'Last-Modified': lm}),
+            _response(200, '{"tenant": 2}', **{'Last-Modified': lm}),
+        ]
+        self.client.capabilities.list()
+        self.assertEqual({'tenant': 2}, self.client.capabilities.list())
+        self.assertEqual(lm, self._headers()['If-Modified-Since'])
+        self.assertEqual(2, self.cache.misses)
+
+    def test_no_validators(self):
+        self.request.return_value = _response(200, '{}')
+        self.client.capabilities.list()
+        self.client.capabilities.list()
+        self.assertNotIn('If-None-Match', self._headers())
+        self.assertNotIn('If-Modified-Since', self._headers())
+
+    def test_invalidated_by_write(self):
+        self.request.return_value = _response(200, '{}', ETag='"v1"')
+        self.client.alarm.get('id1')
+        self.client.alarm.delete('id1')
+        self.request.return_value = _response(404, '{}')
+        self.client.alarm.get('id1')
+        self.assertNotIn('If-None-Match', self._headers())
+
+    def test_invalidated_after_write(self):
+        def request(url, method, **kwargs):
+            if method == 'DELETE':
+                # NOTE: a GET sent while the alarm is being deleted
+                self.client.alarm.get('id1')
+            return _response(200, '{}', ETag='"v1"')
+        self.request.side_effect = request
+        self.client.alarm.delete('id1')
+        self.client.alarm.get('id1')
+        self.assertNotIn('If-None-Match', self._headers())
+
+    def test_not_invalidated_by_query(self):
+        self.request.return_value = _response(200, '[]')
+        with mock.patch.object(self.cache, 'invalidate') as invalidate:
+            self.client.alarm.query('{}')
+            self.client.alarm_history.search('{}')
+            invalidate.assert_not_called()
+            self.client.alarm.delete('id1')
+            invalidate.assert_called_once_with(self.client.api,
+                                               'v2/alarms/id1')
+
+    def test_scoped_by_project(self):
+        self.request.return_value = _response(200, '{}', ETag='"v1"')
+        self.client.alarm.get('id1')
+        with mock.patch.object(client.SessionClient, 'get_project_id',
+                               return_value='other'):
+            self.client.alarm.get('id1')
+        self.assertNotIn('If-None-Match', self._headers())
+
+    def test_file_backend(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'responses.json')
+        self.client.response_cache = cache.ResponseCache(
+            cache.FileCache(path))
+        self.request.return_value = _response(200, '[1]', ETag='"v1"')
+        self.client.quota.list()
+        other = v2_client.Client(
+            response_cache=cache.ResponseCache(cache.FileCache(path)))
+        self.request.return_value = _response(304)
+        self.assertEqual([1], other.quota.list())
+
+
+class AuthCacheTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'auth.json')
+        self.cache = cache.AuthCache(self.path)
+
+    @staticmethod
+    def _plugin(password='secret', expires_in=3600):
+        plugin = v3.Password(auth_url='http://keystone/v3', username='foo',
+                             password=password, project_id='bar',
+                             user_domain_id='default')
+        token = ks_fixture.V3Token(
+            project_id='bar',
+            expires=timeutils.utcnow() + datetime.timedelta(
+                seconds=expires_in))
+        token.add_service('alarming').add_standard_endpoints(
+            public='http://aodh')
+        plugin.auth_ref = access.create(body=token, auth_token='tok')
+        return plugin
+
+    def test_save_load(self):
+        self.cache.save(self._plugin())
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.path).st_mode))
+
+        plugin = self._plugin()
+        plugin.auth_ref = None
+        self.assertTrue(cache.AuthCache(self.path).load(plugin))
+        self.assertEqual('tok', plugin.auth_ref.auth_token)
+        self.assertEqual(
+            'http://aodh', plugin.auth_ref.service_catalog.url_for(
+                service_type='alarming', interface='public'))
+
+    def test_load_other_credentials(self):
+        self.cache.save(self._plugin())
+        plugin = self._plugin(password='other')
+        plugin.auth_ref = None
+        self.assertFalse(cache.AuthCache(self.path).load(plugin))
+        self.assertIsNone(plugin.auth_ref)
+
+    def test_load_does_not_replace_auth(self):
+        self.cache.save(self._plugin())
+        plugin = self._plugin()
+        auth_ref = plugin.auth_ref
+        self.assertFalse(self.cache.load(plugin))
+        self.assertIs(auth_ref, plugin.auth_ref)
+
+    def test_save_expired(self):
+        self.cache.save(self._plugin(expires_in=-10))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_load_untrusted_file(self):
+        self.cache.save(self._plugin())
+        os.chmod(self.path, 0o666)
+        plugin = self._plugin()
+        plugin.auth_ref = None
+        self.assertFalse(cache.AuthCache(self.path).load(plugin))
+
+    def test_plugin_without_cache_id(self):
+        plugin = mock.Mock()
+        plugin.get_cache_id.return_value = None
+        self.cache.save(plugin)
+        self.assertFalse(self.cache.load(plugin))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_from_env(self):
+        self.useFixture(fixtures.EnvironmentVariable('AODH_AUTH_CACHE'))
+        self.assertIsNone(cache.AuthCache.from_env())
+        self.useFixture(fixtures.EnvironmentVariable('AODH_AUTH_CACHE',
+                                                     'true'))
+        self.assertIsInstance(cache.AuthCache.from_env(), cache.AuthCache)
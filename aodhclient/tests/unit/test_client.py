@@ -0,0 +1,63 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+
+from keystoneauth1 import session
+import testtools
+
+from aodhclient import client
+from aodhclient.v2 import client as v2_client
+
+
+class ConnectionPoolTest(testtools.TestCase):
+
+    @staticmethod
+    def _socket_options(adapter):
+        return adapter.poolmanager.connection_pool_kw['socket_options']
+
+    def test_create_session(self):
+        sess = client.create_session(pool_maxsize=30, pool_block=True)
+        for scheme in ('http://', 'https://'):
+            adapter = sess.session.get_adapter(scheme)
+            self.assertEqual(30, adapter._pool_maxsize)
+            self.assertEqual(30, adapter._pool_connections)
+            self.assertTrue(adapter._pool_block)
+            self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+                          self._socket_options(adapter))
+
+    def test_no_keep_alive(self):
+        sess = client.create_session(keep_alive=False)
+        adapter = sess.session.get_adapter('https://')
+        self.assertEqual(client.DEFAULT_POOL_MAXSIZE, adapter._pool_maxsize)
+        self.assertEqual([(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)],
+                         self._socket_options(adapter))
+
+    def test_tls_options_kept(self):
+        sess = session.Session(tls_min_version='1.3')
+        client.configure_connection_pool(sess, pool_maxsize=20)
+        adapter = sess.session.get_adapter('https://')
+        self.assertEqual(20, adapter._pool_maxsize)
+        self.assertEqual('1.3', adapter.tls_min_version)
+
+    def test_client_pool_options(self):
+        sess = session.Session()
+        adapter = sess.session.get_adapter('https://')
+        v2_client.Client(session=sess)
+        self.assertIs(adapter, sess.session.get_adapter('https://'))
+
+        aodh = v2_client.Client(session=sess, pool_maxsize=40)
+        other = v2_client.Client(session=sess)
+        adapter = sess.session.get_adapter('https://')
+        self.assertEqual(40, adapter._pool_maxsize)
+        self.assertIs(aodh.api.session, other.api.session)
@@ -0,0 +1,151 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+from unittest import mock
+
+import testtools
+
+from aodhclient import client
+from aodhclient import coalesce
+from aodhclient.v2 import client as v2_client
+
+
+class RequestCoalescerTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.coalescer = coalesce.RequestCoalescer()
+        self.release = threading.Event()
+        self.func = mock.Mock(side_effect=self._blocking_call)
+
+    def _blocking_call(self, value):
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def _run_concurrently(self, key, value, count):
+        results = []
+
+        def run():
+            try:
+                results.append(self.coalescer.call(key, self.func, value))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 5
+        while (self.coalescer.coalesced < count - 1 and
+               time.monotonic() < deadline):
+            time.sleep(0.001)
+        self.release.set()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_coalesced(self):
+        results = self._run_concurrently('k', 'result', 5)
+        self.assertEqual(['result'] * 5, results)
+        self.assertEqual(1, self.func.call_count)
+        self.assertEqual(5, self.coalescer.calls)
+        self.assertEqual(4, self.coalescer.coalesced)
+
+    def test_error_shared(self):
+        error = ValueError('boom')
+        results = self._run_concurrently('k', error, 3)
+        self.assertEqual([error] * 3, results)
+        self.assertEqual(1, self.func.call_count)
+
+    def test_distinct_keys(self):
+        self.release.set()
+        self.assertEqual(1, self.coalescer.call('a', self.func, 1))
+        self.assertEqual(2, self.coalescer.call('b', self.func, 2))
+        self.assertEqual(1, self.coalescer.call('a', self.func, 1))
+        self.assertEqual(3, self.func.call_count)
+        self.assertEqual(0, self.coalescer.coalesced)
+
+    @mock.patch('time.monotonic')
+    def test_ttl(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.release.set()
+        self.coalescer = coalesce.RequestCoalescer(ttl=2)
+        self.coalescer.call('k', self.func, 1)
+        self.assertEqual(1, self.coalescer.call('k', self.func, 2))
+        self.assertEqual(1, self.coalescer.cached)
+        mock_monotonic.return_value = 102
+        self.assertEqual(2, self.coalescer.call('k', self.func, 2))
+        self.assertEqual(2, self.func.call_count)
+
+    def test_ttl_maxsize(self):
+        self.release.set()
+        self.coalescer = coalesce.RequestCoalescer(ttl=60, maxsize=2)
+        for key in ('a', 'b', 'c'):
+            self.coalescer.call(key, self.func, key)
+        self.coalescer.call('a', self.func, 'a')
+        self.assertEqual(4, self.func.call_count)
+
+    def test_errors_not_cached(self):
+        self.release.set()
+        self.coalescer = coalesce.RequestCoalescer(ttl=60)
+        self.assertRaises(ValueError, self.coalescer.call, 'k', self.func,
+                          ValueError())
+        self.assertEqual(1, self.coalescer.call('k', self.func, 1))
+
+
+class ManagerCoalescingTest(testtools.TestCase):
+
+    @mock.patch.object(client.SessionClient, 'request')
+    def test_get_coalesced(self, mock_request):
+        coalescer = coalesce.RequestCoalescer(ttl=60)
+        aodh = v2_client.Client(request_coalescer=coalescer)
+        mock_request.return_value.json.side_effect = lambda: {'a': 1}
+        first = aodh.capabilities.list()
+        second = aodh.capabilities.list()
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        aodh.alarm.get('id1')
+        self.assertEqual(2, mock_request.call_count)
+        self.assertEqual(1, coalescer.cached)
+
+        aodh.alarm.delete('id1')
+        aodh.capabilities.list()
+        self.assertEqual(4, mock_request.call_count)
+
+    @mock.patch.object(client.SessionClient, 'request')
+    def test_cleared_after_write(self, mock_request):
+        coalescer = coalesce.RequestCoalescer(ttl=60)
+        aodh = v2_client.Client(request_coalescer=coalescer)
+
+        def request(url, method, **kwargs):
+            if method == 'DELETE':
+                # NOTE: a GET sent while the alarm is being deleted
+                aodh.alarm.get('id1')
+            return mock.DEFAULT
+        mock_request.side_effect = request
+        aodh.alarm.delete('id1')
+        aodh.alarm.get('id1')
+        self.assertEqual(3, mock_request.call_count)
+
+    @mock.patch.object(client.SessionClient, 'request')
+    def test_not_cleared_by_query(self, mock_request):
+        coalescer = coalesce.RequestCoalescer(ttl=60)
+        aodh = v2_client.Client(request_coalescer=coalescer)
+        aodh.capabilities.list()
+        aodh.alarm.query('{}')
+        aodh.alarm_history.search('{}')
+        aodh.capabilities.list()
+        self.assertEqual(3, mock_request.call_count)
@@ -12,6 +12,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from email import utils as email_utils
+import time
 from unittest import mock
 
 from oslotest import base
@@ -36,3 +38,28 @@ class AodhclientExceptionsTest(base.BaseTestCase):
         self.assertIsInstance(e, exceptions.ClientException)
         self.assertEqual('Of course I still love you (HTTP 520) '
                          '(Request-ID: fake-request-id)', '%s' % e)
+
+    def test_retry_after_exception_from_response(self):
+        resp = mock.MagicMock(status_code=503)
+        resp.headers = {'Content-Type': 'text/plain', 'retry-after': '12'}
+        resp.text = 'Down for maintenance'
+        e = exceptions.from_response(resp, 'http://no.where:2333/v2/alarms')
+        self.assertIsInstance(e, exceptions.ServiceUnavailable)
+        self.assertEqual(12, e.retry_after)
+
+    def test_retry_after_ignored_from_response(self):
+        resp = mock.MagicMock(status_code=500)
+        resp.headers = {'Content-Type': 'text/plain', 'retry-after': '12'}
+        resp.text = 'Oops'
+        e = exceptions.from_response(resp, 'http://no.where:2333/v2/alarms')
+        self.assertIsInstance(e, exceptions.ClientException)
+        self.assertFalse(hasattr(e, 'retry_after'))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(3, exceptions.parse_retry_after('3'))
+        self.assertEqual(0, exceptions.parse_retry_after('-3'))
+        self.assertEqual(0, exceptions.parse_retry_after('soon'))
+        self.assertEqual(0, exceptions.parse_retry_after(
+            'Wed, 21 Oct 2015 07:28:00 GMT'))
+        self.assertIn(exceptions.parse_retry_after(
+            email_utils.formatdate(time.time() + 60, usegmt=True)), (60, 61))
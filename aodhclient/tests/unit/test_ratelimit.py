@@ -0,0 +1,102 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from keystoneauth1 import adapter
+from keystoneauth1 import session
+import testtools
+
+from aodhclient import client
+from aodhclient import ratelimit
+
+
+class TokenBucketTest(testtools.TestCase):
+
+    @mock.patch('time.monotonic', return_value=100)
+    def test_reserve(self, mock_monotonic):
+        bucket = ratelimit.TokenBucket(rate=2, burst=2)
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0.5, bucket.reserve())
+        self.assertEqual(1, bucket.reserve())
+        mock_monotonic.return_value = 101
+        # the reserved tokens have been refilled
+        self.assertEqual(0.5, bucket.reserve())
+        mock_monotonic.return_value = 110
+        # but no more than the burst
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0.5, bucket.reserve())
+
+    def test_invalid_rate(self):
+        self.assertRaises(ValueError, ratelimit.TokenBucket, 0)
+
+
+class RateLimiterTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(ratelimit.RateLimiter, '_sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('time.monotonic', return_value=100)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_global_limit(self):
+        limiter = ratelimit.RateLimiter(rate=100)
+        limiter.acquire('GET', 'v2/capabilities')
+        limiter.acquire('PUT', 'v2/alarms/a1')
+        self.sleep.assert_called_once_with(0.01)
+
+    def test_limits(self):
+        limiter = ratelimit.RateLimiter(
+            method_rates={'put': 1},
+            endpoint_rates={'v2/alarms': 10, '/v2/alarms/a1/state': 2})
+        limiter.acquire('GET', 'v2/capabilities')
+        limiter.acquire('GET', 'v2/capabilities')
+        self.assertFalse(self.sleep.called)
+
+        limiter.acquire('GET', 'v2/alarms/a1/state')
+        limiter.acquire('GET', 'v2/alarms/a1/state')
+        self.sleep.assert_called_with(0.5)
+        limiter.acquire('GET', 'v2/alarms/a1')
+        limiter.acquire('GET', 'v2/alarms/a1')
+        self.sleep.assert_called_with(0.1)
+
+        limiter.acquire('PUT', 'v2/alarms/a2')
+        self.sleep.assert_called_with(0.2)
+        limiter.acquire('PUT', 'v2/alarms/a2')
+        self.sleep.assert_called_with(1)
+        self.assertEqual(4, limiter.waits)
+        self.assertAlmostEqual(1.8, limiter.wait_time)
+
+    def test_from_specs(self):
+        limiter = ratelimit.RateLimiter.from_specs(
+            ['20', 'put=5', 'v2/alarms=10'])
+        self.assertEqual(20, limiter._bucket.rate)
+        self.assertEqual(5, limiter._method_buckets['PUT'].rate)
+        self.assertEqual('v2/alarms', limiter._endpoint_buckets[0][0])
+        self.assertRaises(ValueError, ratelimit.RateLimiter.from_specs,
+                          ['PUT=fast'])
+        self.assertRaises(ValueError, ratelimit.RateLimiter.from_specs,
+                          ['0'])
+
+    @mock.patch.object(adapter.Adapter, 'request')
+    def test_session_client(self, mock_request):
+        mock_request.return_value = mock.Mock(status_code=200)
+        limiter = mock.Mock()
+        api = client.SessionClient(session.Session(), rate_limiter=limiter)
+        api.request('v2/alarms', 'GET')
+        limiter.acquire.assert_called_once_with('GET', 'v2/alarms')
@@ -0,0 +1,132 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from email import utils as email_utils
+import time
+from unittest import mock
+
+from keystoneauth1 import adapter
+from keystoneauth1 import session
+import testtools
+
+from aodhclient import client
+from aodhclient import exceptions
+from aodhclient import retry
+
+
+def _response(status_code, retry_after=None):
+    resp = mock.Mock(status_code=status_code, url='http://aodh/v2/alarms')
+    resp.headers = {}
+    if retry_after is not None:
+        resp.headers['retry-after'] = retry_after
+    return resp
+
+
+class RetryPolicyTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.policy = retry.RetryPolicy(max_retries=3, backoff=1,
+                                        max_backoff=5)
+        patcher = mock.patch.object(retry.RetryPolicy, '_sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_should_retry(self):
+        self.assertTrue(self.policy.should_retry('POST', 429))
+        self.assertTrue(self.policy.should_retry('POST', 413))
+        self.assertTrue(self.policy.should_retry('GET', 503))
+        self.assertTrue(self.policy.should_retry('delete', 502))
+        self.assertFalse(self.policy.should_retry('POST', 503))
+        self.assertFalse(self.policy.should_retry('GET', 500))
+        self.assertFalse(self.policy.should_retry('GET', 404))
+
+    def test_get_delay(self):
+        self.assertEqual(7, self.policy.get_delay(0, '7'))
+        for attempt in range(6):
+            delay = self.policy.get_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5, 2 ** attempt))
+
+    def test_get_delay_http_date(self):
+        retry_after = email_utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertIn(self.policy.get_delay(0, retry_after), (30, 31))
+        with mock.patch('random.uniform', return_value=0.25):
+            # a date in the past falls back to the backoff
+            self.assertEqual(0.25, self.policy.get_delay(
+                0, 'Wed, 21 Oct 2015 07:28:00 GMT'))
+
+    def test_wait(self):
+        self.assertTrue(self.policy.wait('POST', _response(429, '2'), 0, 0))
+        self.sleep.assert_called_once_with(2)
+        self.assertEqual(1, self.policy.retries)
+        self.assertEqual(2, self.policy.backoff_time)
+
+    def test_wait_max_retries(self):
+        self.assertFalse(self.policy.wait('GET', _response(503), 3, 0))
+        self.assertFalse(self.sleep.called)
+        self.assertEqual(0, self.policy.retries)
+
+    @mock.patch('time.monotonic', return_value=100)
+    def test_wait_deadline(self, mock_monotonic):
+        self.policy.deadline = 10
+        self.assertTrue(self.policy.wait('GET', _response(429, '5'), 0, 95))
+        self.assertFalse(self.policy.wait('GET', _response(429, '6'), 1, 95))
+        self.assertEqual(1, self.policy.retries)
+        self.assertEqual(5, self.policy.backoff_time)
+
+
+class SessionClientRetryTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(retry.RetryPolicy, '_sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(adapter.Adapter, 'request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.policy = retry.RetryPolicy(max_retries=2)
+        self.api = client.SessionClient(session.Session(),
+                                        retry_policy=self.policy)
+
+    def test_retry_then_success(self):
+        ok = _response(200)
+        failed = [_response(429, '1'), _response(503)]
+        self.request.side_effect = failed + [ok]
+        self.assertIs(ok, self.api.request('v2/alarms', 'GET'))
+        self.assertEqual(3, self.request.call_count)
+        self.assertEqual(2, self.policy.retries)
+        for resp in failed:
+            resp.close.assert_called_once_with()
+        ok.close.assert_not_called()
+
+    def test_retry_exhausted(self):
+        self.request.return_value = _response(429, '1')
+        e = self.assertRaises(exceptions.RateLimit,
+                              self.api.request, 'v2/alarms', 'POST')
+        self.assertEqual(1, e.retry_after)
+        self.assertEqual(3, self.request.call_count)
+
+    def test_no_retry_non_idempotent(self):
+        self.request.return_value = _response(503)
+        self.assertRaises(exceptions.ServiceUnavailable,
+                          self.api.request, 'v2/alarms', 'POST')
+        self.assertEqual(1, self.request.call_count)
+
+    def test_no_policy(self):
+        self.api.retry_policy = None
+        self.request.return_value = _response(429)
+        self.assertRaises(exceptions.RateLimit,
+                          self.api.request, 'v2/alarms', 'GET')
+        self.assertEqual(1, self.request.call_count)
@@ -13,13 +13,19 @@
 # under the License.
 
 import io
+import pstats
+import subprocess
 import sys
 from unittest import mock
 
+from cliff import command
+import fixtures
 from keystoneauth1 import exceptions
+from osprofiler import profiler
 import testtools
 
 from aodhclient import shell
+from aodhclient import timing
 
 
 class CliTest(testtools.TestCase):
@@ -37,3 +43,246 @@ class CliTest(testtools.TestCase):
         shell.AodhShell().clean_up(None, None, exceptions.HttpError('foo'))
         stderr_lines = sys.stderr.getvalue().splitlines()
         self.assertEqual(0, len(stderr_lines))
+
+    def test_cli_clean_up_saves_auth_cache(self):
+        aodh_shell = shell.AodhShell()
+        aodh_shell._client = mock.Mock()
+        aodh_shell._auth_cache = mock.Mock()
+        aodh_shell.clean_up(None, 0, None)
+        aodh_shell._auth_cache.save.assert_called_once_with(
+            aodh_shell._client.api.session.auth)
+
+
+class FakeCommand(command.Command):
+    """Fake command printing its argument"""
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument('value')
+        parser.add_argument('--status', type=int, default=0)
+        return parser
+
+    def take_action(self, parsed_args):
+        self.app.stdout.write(parsed_args.value + '\n')
+        self.app.clients.append(id(self.app.client))
+        return parsed_args.status
+
+
+class BatchTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.stdout = self.useFixture(
+            fixtures.MonkeyPatch('sys.stdout', io.StringIO())).new_value
+        self.stderr = self.useFixture(
+            fixtures.MonkeyPatch('sys.stderr', io.StringIO())).new_value
+        self.shell = shell.AodhShell()
+        self.shell._client = mock.Mock()
+        self.shell.clients = []
+        self.shell.command_manager.add_command('fake', FakeCommand)
+
+    def _run_batch(self, content):
+        path = self.useFixture(fixtures.TempDir()).join('commands')
+        with open(path, 'w') as f:
+            f.write(content)
+        return self.shell.run(['--os-auth-type', 'none', '--batch', path])
+
+    def test_batch(self):
+        result = self._run_batch('# comment\n'
+                                 'fake one\n'
+                                 '\n'
+                                 'fake "two words"\n')
+        self.assertEqual(0, result)
+        self.assertEqual('one\ntwo words\n', self.stdout.getvalue())
+        self.assertEqual(2, len(self.shell.clients))
+        self.assertEqual(1, len(set(self.shell.clients)))
+        self.assertIn('2 command(s) run, 0 failed', self.stderr.getvalue())
+
+    def test_batch_failures(self):
+        result = self._run_batch('fake one --status 3\n'
+                                 'fake\n'
+                                 'fake "unterminated\n'
+                                 'fake two\n')
+        self.assertEqual(1, result)
+        self.assertEqual('one\ntwo\n', self.stdout.getvalue())
+        stderr = self.stderr.getvalue()
+        self.assertIn("Line 1: 'fake one --status 3' failed with exit "
+                      "status 3", stderr)
+        self.assertIn("Line 2: 'fake' failed with exit status 2", stderr)
+        self.assertIn("Line 3: 'fake \"unterminated' failed with exit "
+                      "status 2", stderr)
+        self.assertIn('4 command(s) run, 3 failed', stderr)
+
+    def test_batch_stdin(self):
+        self.shell.stdin = io.StringIO('fake one\n')
+        self.assertEqual(0, self.shell.run(['--os-auth-type', 'none',
+                                            '--batch', '-']))
+        self.assertEqual('one\n', self.stdout.getvalue())
+
+    def test_batch_with_command(self):
+        self.assertEqual(1, self.shell.run(['--os-auth-type', 'none',
+                                            '--batch', '-', 'fake', 'one']))
+        self.assertEqual('', self.stdout.getvalue())
+
+
+class TimingTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.stdout = self.useFixture(
+            fixtures.MonkeyPatch('sys.stdout', io.StringIO())).new_value
+        self.stderr = self.useFixture(
+            fixtures.MonkeyPatch('sys.stderr', io.StringIO())).new_value
+        self.shell = shell.AodhShell()
+        self.shell._client = mock.Mock()
+        self.shell._timings = timing.TimingCollector()
+        self.shell.clients = []
+        self.shell.command_manager.add_command('fake', FakeCommand)
+
+    def test_timing(self):
+        self.shell._timings.record('GET', 'v2/alarms/1', 200, bytes=10,
+                                   latency=0.25)
+        self.assertEqual(0, self.shell.run(['--os-auth-type', 'none',
+                                            '--timing', 'fake', 'one']))
+        self.assertEqual('one\n', self.stdout.getvalue())
+        # NOTE: the timings are reset when the command starts
+        lines = self.stderr.getvalue().splitlines()
+        self.assertEqual(1, len(lines))
+        self.assertTrue(lines[0].startswith('Time: import '))
+        self.assertIn('HTTP 0.000s', lines[0])
+        self.assertIn('wait 0.000s', lines[0])
+
+    def test_timing_requests(self):
+        def take_action(cmd, parsed_args):
+            self.shell._timings.record('GET', 'v2/alarms/1', 200, bytes=10,
+                                       latency=0.25)
+        with mock.patch.object(FakeCommand, 'take_action', take_action):
+            self.shell.run(['--os-auth-type', 'none', '--timing', 'fake',
+                            'one'])
+        lines = self.stderr.getvalue().splitlines()
+        self.assertEqual(['Method', 'URL', 'Status', 'Count', 'Total',
+                          '(s)'], lines[0].split()[:6])
+        self.assertEqual(['GET', 'v2/alarms/{id}', '200', '1', '0.250',
+                          '0.250', '0.250', '0.000', '10'], lines[1].split())
+        self.assertIn('HTTP 0.250s', lines[2])
+
+    def test_profile(self):
+        path = self.useFixture(fixtures.TempDir()).join('aodh.prof')
+        self.assertEqual(0, self.shell.run(['--os-auth-type', 'none',
+                                            '--profile', path, 'fake',
+                                            'one']))
+        stats = pstats.Stats(path)
+        self.assertTrue(any(func[2] == 'take_action'
+                            for func in stats.stats))
+        self.assertIn('Time: import ', self.stderr.getvalue())
+
+    def test_no_timing(self):
+        self.shell.run(['--os-auth-type', 'none', 'fake', 'one'])
+        self.assertEqual('', self.stderr.getvalue())
+
+
+class OsProfileTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.stdout = self.useFixture(
+            fixtures.MonkeyPatch('sys.stdout', io.StringIO())).new_value
+        self.stderr = self.useFixture(
+            fixtures.MonkeyPatch('sys.stderr', io.StringIO())).new_value
+        self.notify = self.useFixture(
+            fixtures.MockPatch('osprofiler.notifier.notify')).mock
+        self.shell = shell.AodhShell()
+        self.shell._client = mock.Mock()
+        self.shell.clients = []
+        self.shell.command_manager.add_command('fake', FakeCommand)
+
+    def test_os_profile(self):
+        self.assertEqual(0, self.shell.run(['--os-auth-type', 'none',
+                                            '--os-profile', 'key', 'fake',
+                                            'one']))
+        self.assertEqual('one\n', self.stdout.getvalue())
+        start, stop = (c[0][0] for c in self.notify.call_args_list)
+        self.assertEqual(('shell-start', 'fake one'),
+                         (start['name'], start['info']['command']))
+        self.assertEqual('shell-stop', stop['name'])
+        self.assertEqual(
+            "Trace ID: %s\nDisplay the trace with: osprofiler trace show "
+            "--html %s\n" % (start['base_id'], start['base_id']),
+            self.stderr.getvalue())
+        self.assertIsNone(profiler.get())
+
+    @mock.patch('osprofiler.notifier.set')
+    @mock.patch('osprofiler.notifier.create')
+    def test_os_profile_connection_string(self, mock_create, mock_set):
+        self.shell.run(['--os-auth-type', 'none', '--os-profile', 'key',
+                        '--os-profile-connection-string',
+                        'redis://localhost:6379', 'fake', 'one'])
+        mock_create.assert_called_once_with(
+            'redis://localhost:6379', project='aodhclient', service='shell',
+            host=mock.ANY)
+        mock_set.assert_called_once_with(mock_create.return_value)
+
+    def test_no_os_profile(self):
+        self.shell.run(['--os-auth-type', 'none', 'fake', 'one'])
+        self.notify.assert_not_called()
+        self.assertEqual('', self.stderr.getvalue())
+
+
+class ImportTimeTest(testtools.TestCase):
+    """Ensure costly modules are not imported by the shell at startup."""
+
+    @staticmethod
+    def _imported_modules(statement):
+        # NOTE: -X importtime writes one "import time: self | cumulative |
+        # module" line on stderr for each module imported. Only the module
+        # names are checked, timings are too noisy to be asserted.
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                               statement],
+                              capture_output=True, text=True, check=True)
+        return {line.rpartition("|")[2].strip()
+                for line in proc.stderr.splitlines()
+                if line.startswith("import time:")}
+
+    def test_shell_import(self):
+        modules = self._imported_modules("import aodhclient.shell")
+        self.assertIn("aodhclient.shell", modules)
+        for module in ("aodhclient.v2.alarm_cli",
+                       "aodhclient.v2.alarm_history_cli",
+                       "aodhclient.v2.capabilities_cli",
+                       "aodhclient.v2.metrics_cli",
+                       "oslo_utils.strutils",
+                       "pyparsing"):
+            self.assertNotIn(module, modules)
+
+    def test_client_import(self):
+        modules = self._imported_modules("import aodhclient.v2.client")
+        self.assertIn("aodhclient.v2.alarm_cli", modules)
+        for module in ("oslo_utils.strutils", "pyparsing"):
+            self.assertNotIn(module, modules)
+
+    def test_import_without_osprofiler(self):
+        # NOTE: keystoneauth1 imports osprofiler by itself when installed,
+        # make sure that aodhclient does not need it to be imported.
+        modules = self._imported_modules(
+            "import sys; sys.modules['osprofiler'] = None; "
+            "import aodhclient.shell, aodhclient.v2.client")
+        self.assertIn("aodhclient.v2.client", modules)
+
+
+class AodhCommandManagerTest(testtools.TestCase):
+
+    def test_commands_are_loaded_lazily(self):
+        manager = shell.AodhCommandManager('aodhclient')
+        self.assertEqual(set(manager.SHELL_COMMANDS), set(manager.commands))
+        for name, path in manager.SHELL_COMMANDS.items():
+            command_class = manager.commands[name].load()
+            self.assertEqual(path, "%s.%s" % (command_class.__module__,
+                                              command_class.__name__))
+
+    def test_find_command(self):
+        manager = shell.AodhCommandManager('aodhclient')
+        command_class, name, args = manager.find_command(
+            ['alarm', 'state', 'get', 'foo'])
+        self.assertEqual('CliAlarmStateGet', command_class.__name__)
+        self.assertEqual('alarm state get', name)
+        self.assertEqual(['foo'], args)
@@ -0,0 +1,190 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import json
+import os
+import time
+from unittest import mock
+
+import fixtures
+from keystoneauth1 import adapter
+import testtools
+
+from aodhclient import client
+from aodhclient import exceptions
+from aodhclient import retry
+from aodhclient import timing
+from aodhclient.v2 import client as v2_client
+
+ALARM_ID = '01919bbd-8b0e-451c-be28-abe250ae9b1b'
+
+
+class TimingCollectorTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.collector = timing.TimingCollector()
+        for latency in (0.1, 0.2, 0.3, 0.4):
+            self.collector.record('GET', 'v2/alarms/%s' % ALARM_ID, 200,
+                                  bytes=100, latency=latency,
+                                  decode_time=0.01)
+        self.collector.record('GET', 'v2/alarms?limit=10', 200, bytes=10,
+                              latency=0.05)
+
+    def test_url_template(self):
+        self.assertEqual('v2/alarms/{id}/history',
+                         timing.url_template('v2/alarms/%s/history?limit=1'
+                                             % ALARM_ID))
+        self.assertEqual('v2/capabilities/',
+                         timing.url_template('v2/capabilities/'))
+
+    def test_summary(self):
+        summary = self.collector.summary()
+        self.assertEqual(2, len(summary))
+        first = summary[0]
+        self.assertEqual(('GET', 'v2/alarms/{id}', 200, 4, 400),
+                         (first['method'], first['url'], first['status'],
+                          first['count'], first['bytes']))
+        self.assertAlmostEqual(1.0, first['latency_total'])
+        self.assertAlmostEqual(0.25, first['latency_mean'])
+        self.assertEqual(0.4, first['latency_max'])
+        self.assertEqual(0.4, first['latency_p95'])
+        self.assertAlmostEqual(0.04, first['decode_time_total'])
+        self.assertEqual('v2/alarms', summary[1]['url'])
+
+    def test_to_json(self):
+        data = json.loads(self.collector.to_json())
+        self.assertEqual(5, data['requests'])
+        self.assertEqual(410, data['bytes'])
+        self.assertEqual(2, len(data['endpoints']))
+
+    def test_to_prometheus(self):
+        text = self.collector.to_prometheus()
+        labels = 'method="GET",url="v2/alarms/{id}",status="200"'
+        self.assertIn('# TYPE aodhclient_request_duration_seconds summary\n',
+                      text)
+        self.assertIn('aodhclient_request_duration_seconds_count{%s} 4\n'
+                      % labels, text)
+        self.assertIn('aodhclient_response_bytes_total{%s} 400\n' % labels,
+                      text)
+        self.assertIn('aodhclient_request_duration_seconds{%s,'
+                      'quantile="0.95"} 0.4\n' % labels, text)
+
+    def test_write_prometheus(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'aodh.prom')
+        self.collector.write_prometheus(path)
+        with open(path) as f:
+            self.assertEqual(self.collector.to_prometheus(), f.read())
+
+    def test_listener_and_maxsize(self):
+        collector = timing.TimingCollector(maxsize=2)
+        seen = []
+        collector.add_listener(seen.append)
+        for i in range(3):
+            collector.record('DELETE', 'v2/alarms/%d' % i, 204)
+        self.assertEqual(3, len(seen))
+        self.assertEqual(2, len(collector.timings))
+        self.assertEqual('v2/alarms/{id}', seen[0].url)
+
+    def test_prometheus_counters_include_dropped(self):
+        collector = timing.TimingCollector(maxsize=2)
+        collector.record('GET', 'v2/capabilities', 200, bytes=10,
+                         latency=0.5)
+        for i in range(3):
+            collector.record('GET', 'v2/alarms/%d' % i, 200, bytes=100,
+                             latency=0.1, decode_time=0.01)
+        text = collector.to_prometheus()
+        labels = 'method="GET",url="v2/alarms/{id}",status="200"'
+        self.assertIn('aodhclient_request_duration_seconds_count{%s} 3\n'
+                      % labels, text)
+        self.assertIn('aodhclient_response_bytes_total{%s} 300\n' % labels,
+                      text)
+        labels = 'method="GET",url="v2/capabilities",status="200"'
+        self.assertIn('aodhclient_request_duration_seconds_sum{%s} 0.5\n'
+                      % labels, text)
+        self.assertIn('aodhclient_response_bytes_total{%s} 10\n' % labels,
+                      text)
+        self.assertNotIn('url="v2/capabilities",status="200",quantile',
+                         text)
+
+    def test_prometheus_label_escaping(self):
+        collector = timing.TimingCollector()
+        collector.record('GET', 'v2/a"b\\c\nd', 200)
+        self.assertIn('url="v2/a\\"b\\\\c\\nd"', collector.to_prometheus())
+
+
+class ManagerTimingTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(client.SessionClient, 'request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.collector = timing.TimingCollector()
+        self.aodh = v2_client.Client(timings=self.collector)
+
+    def test_timings_recorded(self):
+        resp = self.request.return_value
+        resp.status_code = 200
+        resp.content = b'{"alarm_id": "a1"}'
+        resp.elapsed = datetime.timedelta(seconds=0.5)
+        resp.json.side_effect = lambda: json.loads(resp.content)
+        self.assertEqual({'alarm_id': 'a1'}, self.aodh.alarm.get(ALARM_ID))
+
+        t, = self.collector.timings
+        self.assertEqual(('GET', 'v2/alarms/{id}', 200, 18, 0.5),
+                         (t.method, t.url, t.status, t.bytes,
+                          t.server_time))
+        self.assertGreater(t.latency, 0)
+        self.assertGreater(t.decode_time, 0)
+
+    def test_error_recorded(self):
+        self.request.side_effect = exceptions.NotFound()
+        self.assertRaises(exceptions.NotFound, self.aodh.alarm.delete,
+                          ALARM_ID)
+        t, = self.collector.timings
+        self.assertEqual(('DELETE', 'v2/alarms/{id}', 404),
+                         (t.method, t.url, t.status))
+
+    def test_stream_bytes(self):
+        resp = self.request.return_value
+        resp.status_code = 200
+        resp.elapsed = None
+        resp.iter_content.return_value = [b'[{"a": 1},', b' {"a": 2}]']
+        self.assertEqual(2, len(list(self.aodh.alarm.list(stream=True))))
+        self.assertEqual(20, self.collector.timings[0].bytes)
+
+
+class WaitTimingTest(testtools.TestCase):
+
+    @mock.patch.object(adapter.Adapter, 'request')
+    def test_wait_not_in_latency(self, mock_request):
+        collector = timing.TimingCollector()
+        limiter = mock.Mock()
+        limiter.acquire.side_effect = lambda method, url: time.sleep(0.05)
+        policy = retry.RetryPolicy(max_retries=1)
+        self.useFixture(fixtures.MockPatchObject(
+            policy, 'get_delay', return_value=0.05))
+        aodh = v2_client.Client(timings=collector, rate_limiter=limiter,
+                                retry_policy=policy)
+        unavailable = mock.Mock(status_code=503, headers={}, elapsed=None)
+        ok = mock.Mock(status_code=200, content=b'{}', elapsed=None)
+        mock_request.side_effect = [unavailable, ok]
+        aodh.alarm.get(ALARM_ID)
+
+        t, = collector.timings
+        self.assertEqual(200, t.status)
+        self.assertGreaterEqual(t.wait_time, 0.15)
+        self.assertLess(t.latency, 0.05)
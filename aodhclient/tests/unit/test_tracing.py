@@ -0,0 +1,93 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import base64
+import json
+from unittest import mock
+
+from osprofiler import profiler
+from osprofiler import web
+import testtools
+
+from aodhclient import client
+from aodhclient import exceptions
+from aodhclient import tracing
+from aodhclient.v2 import client as v2_client
+
+ALARM = {'alarm_id': 'a1', 'type': 'event', 'name': 'foo',
+         'event_rule': {'event_type': '*'}}
+
+
+class TracingTest(testtools.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('osprofiler.notifier.notify')
+        self.notify = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(client.SessionClient, 'request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.request.return_value.json.side_effect = lambda: dict(ALARM)
+        self.addCleanup(profiler.clean)
+        self.aodh = v2_client.Client()
+
+    def _spans(self):
+        return [(c[0][0]['name'], c[0][0]['info'].get('request', {}).get(
+            'method')) for c in self.notify.call_args_list]
+
+    def test_not_traced(self):
+        self.assertIsNone(tracing.get_profiler())
+        self.assertEqual({}, tracing.get_trace_id_headers())
+        self.aodh.alarm.update('a1', {'name': 'bar'})
+        self.notify.assert_not_called()
+
+    def test_manager_spans(self):
+        profiler.init('key')
+        self.aodh.alarm.update('a1', {'name': 'bar'})
+        self.assertEqual([('alarm.update-start', None),
+                          ('http-start', 'GET'), ('http-stop', None),
+                          ('http-start', 'PUT'), ('http-stop', None),
+                          ('alarm.update-stop', None)], self._spans())
+
+    def test_error_span(self):
+        profiler.init('key')
+        self.request.side_effect = exceptions.NotFound()
+        self.assertRaises(exceptions.NotFound, self.aodh.alarm.delete, 'a1')
+        info = self.notify.call_args_list[-1][0][0]['info']
+        self.assertEqual('alarm.delete-stop',
+                         self.notify.call_args_list[-1][0][0]['name'])
+        self.assertEqual('NotFound', info['etype'])
+
+    def test_trace_id_headers(self):
+        trace = profiler.init('key')
+        with tracing.span('http'):
+            headers = tracing.get_trace_id_headers()
+            span_id = trace.get_id()
+        info = json.loads(base64.urlsafe_b64decode(
+            headers[web.X_TRACE_INFO]))
+        self.assertEqual({'base_id': trace.get_base_id(),
+                          'parent_id': span_id}, info)
+
+    def test_propagated_to_worker_threads(self):
+        trace = profiler.init('key')
+        self.aodh.alarm.delete_many(['a1', 'a2'], concurrency=2)
+        payloads = [c[0][0] for c in self.notify.call_args_list]
+        self.assertEqual(10, len(payloads))
+        self.assertEqual({trace.get_base_id()},
+                         {p['base_id'] for p in payloads})
+        self.assertEqual('alarm.delete_many-start', payloads[0]['name'])
+        deletes = [p for p in payloads if p['name'] == 'alarm.delete-start']
+        self.assertEqual(2, len(deletes))
+        self.assertEqual({payloads[0]['trace_id']},
+                         {p['parent_id'] for p in deletes})
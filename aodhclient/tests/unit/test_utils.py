@@ -11,8 +11,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+
 from oslotest import base
 
+from aodhclient.tests.perf import bench_query
+from aodhclient.tests.perf import legacy_query
 from aodhclient import utils
 
 
@@ -69,6 +73,42 @@ class SearchQueryBuilderTest(base.BaseTestCase):
                           ]}
                       ]})
 
+    def test_search_query_builder_keywords_need_word_boundary(self):
+        self._do_test('nothing=1', {"=": {"nothing": 1.0}})
+        self._do_test('orders=1 and android=2',
+                      {"and": [{"=": {"android": 2.0}},
+                               {"=": {"orders": 1.0}}]})
+        self._do_test('not=1', {"=": {"not": 1.0}})
+        self._do_test('foo="and"', {"=": {"foo": "and"}})
+
+    def test_search_query_builder_invalid(self):
+        for query in ('', 'foo', 'foo=', '(foo=bar', 'foo=bar baz=1',
+                      'foo=bar and', 'foo=2016-03-09', 'foo==bar'):
+            self.assertRaises(ValueError, utils.search_query_builder, query)
+
+    def test_search_query_builder_returns_copies(self):
+        query = 'foo=bar and not bar=foo'
+        utils.search_query_builder(query)["and"].append("oops")
+        self.assertEqual({"and": [{"not": {"=": {"bar": "foo"}}},
+                                  {"=": {"foo": "bar"}}]},
+                         utils.search_query_builder(query))
+
+    def test_search_query_builder_pyparsing_parity(self):
+        queries = [
+            'foo=bar', "foo='bar baz'", 'foo="a\\tb"', 'foo>=-1.5e3',
+            'foo eq 3', 'foo=None', 'foo=false', '1<foo',
+            'foo=0a1b2c3d-4e5f-6a7b-8c9d-0e1f2a3b4c5d',
+            'not not foo=bar', '((foo=bar))',
+            'a=1 and b=2 and c=3', 'a=1 or b=2 or c=3',
+            'a=1 and (b=2 and c=3)', '(a=1 and b=2) and c=3',
+            'a=1 or (b=2 or c=3) or d=4', 'not (a=1 and b=2) or c=3',
+            'a=1 and b=2 or c=3 and not d=4 or (e=5 or f=6) and g=7',
+        ]
+        queries.extend(bench_query.make_query(n) for n in (1, 2, 10, 42))
+        for query in queries:
+            self.assertEqual(legacy_query.search_query_builder(query),
+                             utils.search_query_builder(query), query)
+
 
 class CliQueryToArray(base.BaseTestCase):
     def test_cli_query_to_arrary(self):
@@ -78,3 +118,66 @@ class CliQueryToArray(base.BaseTestCase):
             {"field": "this", "type": "", "value": "34", "op": "le"},
             {"field": "that", "type": "string", "value": "foo", "op": "eq"}]
         self.assertEqual(expected_query, ret_array)
+
+
+class PrefetchTest(base.BaseTestCase):
+    def test_prefetch(self):
+        self.assertEqual(list(range(10)),
+                         list(utils.prefetch(iter(range(10)), depth=2)))
+
+    def test_prefetch_producer_error(self):
+        def producer():
+            yield 1
+            raise ValueError("boom")
+
+        items = utils.prefetch(producer())
+        self.assertEqual(1, next(items))
+        self.assertRaises(ValueError, next, items)
+
+    def test_prefetch_stops_producer_on_close(self):
+        produced = []
+
+        def producer():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        items = utils.prefetch(producer(), depth=1)
+        self.assertEqual(0, next(items))
+        items.close()
+        count = len(produced)
+        self.assertLess(count, 100)
+
+
+class IterJsonArrayTest(base.BaseTestCase):
+    DATA = [{'alarm_id': 'a1', 'detail': '{"state": "ok"}', 'n': 1234},
+            {'name': 'café ☃', 'ok': True, 'none': None},
+            [], -1.5e3, "]", 0]
+
+    def _chunks(self, data, size):
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_all_chunk_sizes(self):
+        data = json.dumps(self.DATA, ensure_ascii=False).encode('utf-8')
+        for size in range(1, len(data) + 1):
+            self.assertEqual(
+                self.DATA,
+                list(utils.iter_json_array(self._chunks(data, size))))
+
+    def test_whitespace_and_empty(self):
+        self.assertEqual([], list(utils.iter_json_array([b' [ ', b'] \n'])))
+        self.assertEqual([1, 2], list(utils.iter_json_array(
+            [b'\n[\n  1 ,', b'\n  2\n]\n'])))
+
+    def test_items_yielded_as_received(self):
+        def chunks():
+            yield b'[{"a": 1}, '
+            self.fail('read past the first item')
+
+        self.assertEqual({'a': 1}, next(utils.iter_json_array(chunks())))
+
+    def test_invalid(self):
+        for data in (b'{"a": 1}', b'[1, 2', b'[1 2]', b'[1,]', b'[1] 2',
+                     b'[tru]', b''):
+            self.assertRaises(ValueError, list,
+                              utils.iter_json_array([data]))
@@ -0,0 +1,271 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Timing of the requests sent by the API managers."""
+
+import collections
+import json
+import os
+import re
+import tempfile
+import threading
+
+_ID_RE = re.compile(r"^(?:[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?"
+                    r"[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}|\d+)$")
+
+
+def url_template(url):
+    """Return the URL without its query string and with IDs replaced.
+
+    For example v2/alarms/<uuid>/history?limit=10 becomes
+    v2/alarms/{id}/history, so the requests of an endpoint are grouped.
+    """
+    path = url.split('?', 1)[0]
+    return '/'.join('{id}' if _ID_RE.match(part) else part
+                    for part in path.split('/'))
+
+
+def percentile(sorted_values, percent):
+    """Return a percentile of sorted values, 0.0 if there are none."""
+    if not sorted_values:
+        return 0.0
+    index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace(
+        '\n', '\\n').replace('"', '\\"')
+
+
+class RequestTiming:
+    """Timing of one request.
+
+    :ivar latency: seconds between sending the request and receiving the
+                   whole response, or its headers for streamed responses
+    :ivar server_time: seconds until the response headers were received,
+                       which includes the connection set up and the time
+                       spent by the server
+    :ivar decode_time: seconds spent decoding the JSON body, it is not
+                       measured for streamed responses as it overlaps their
+                       download
+    :ivar bytes: size of the response body
+    :ivar wait_time: seconds spent waiting for the rate limiter and before
+                     retrying the request, they are not in the latency
+    """
+
+    __slots__ = ('method', 'url', 'status', 'bytes', 'latency',
+                 'server_time', 'decode_time', 'wait_time')
+
+    def __init__(self, method, url, status, bytes=0, latency=0.0,
+                 server_time=None, decode_time=0.0, wait_time=0.0):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.bytes = bytes
+        self.latency = latency
+        self.server_time = server_time
+        self.decode_time = decode_time
+        self.wait_time = wait_time
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class TimingCollector:
+    """Collect the timings of the requests sent by a client.
+
+    Each request sent by the managers is recorded as a
+    :py:class:`RequestTiming`, its URL being reduced to its template. The
+    callbacks registered with :py:meth:`add_listener` are called with each
+    timing once the response is received, the decode time of the body is
+    added to it later.
+
+    :param maxsize: maximum number of timings kept, the oldest ones are
+                    dropped beyond it but still counted in the totals of
+                    :py:meth:`to_prometheus`
+    :type maxsize: int
+    """
+
+    def __init__(self, maxsize=10000):
+        self.timings = collections.deque(maxlen=maxsize)
+        self.listeners = []
+        self._lock = threading.Lock()
+        # NOTE: totals of the dropped timings per (method, url, status),
+        # the Prometheus counters must never decrease.
+        self._dropped = {}
+
+    def add_listener(self, callback):
+        """Call callback(timing) for each request recorded."""
+        self.listeners.append(callback)
+
+    def record(self, method, url, status, **kwargs):
+        timing = RequestTiming(method, url_template(url), status, **kwargs)
+        with self._lock:
+            if len(self.timings) == self.timings.maxlen:
+                self._drop(self.timings[0])
+            self.timings.append(timing)
+        for callback in self.listeners:
+            callback(timing)
+        return timing
+
+    def _drop(self, timing):
+        totals = self._dropped.setdefault(
+            (timing.method, timing.url, timing.status),
+            {'count': 0, 'latency_total': 0.0, 'bytes': 0,
+             'decode_time_total': 0.0})
+        totals['count'] += 1
+        totals['latency_total'] += timing.latency
+        totals['bytes'] += timing.bytes or 0
+        totals['decode_time_total'] += timing.decode_time
+
+    def clear(self):
+        with self._lock:
+            self.timings.clear()
+            self._dropped.clear()
+
+    def summary(self):
+        """Return the statistics of the requests per method, URL and status.
+
+        :return: a list of dicts sorted by decreasing total latency
+        """
+        groups = collections.defaultdict(list)
+        with self._lock:
+            for t in self.timings:
+                groups[(t.method, t.url, t.status)].append(t)
+        summary = []
+        for (method, url, status), timings in groups.items():
+            latencies = sorted(t.latency for t in timings)
+            summary.append({
+                'method': method,
+                'url': url,
+                'status': status,
+                'count': len(timings),
+                'bytes': sum(t.bytes or 0 for t in timings),
+                'latency_total': sum(latencies),
+                'latency_mean': sum(latencies) / len(latencies),
+                'latency_p50': percentile(latencies, 50),
+                'latency_p95': percentile(latencies, 95),
+                'latency_max': latencies[-1],
+                'server_time_total': sum(t.server_time or 0
+                                         for t in timings),
+                'decode_time_total': sum(t.decode_time for t in timings),
+                'wait_time_total': sum(t.wait_time for t in timings),
+            })
+        summary.sort(key=lambda s: s['latency_total'], reverse=True)
+        return summary
+
+    def to_json(self, **kwargs):
+        """Return the summary and the totals as a JSON document."""
+        summary = self.summary()
+        return json.dumps({
+            'requests': sum(s['count'] for s in summary),
+            'latency_total': sum(s['latency_total'] for s in summary),
+            'decode_time_total': sum(s['decode_time_total']
+                                     for s in summary),
+            'bytes': sum(s['bytes'] for s in summary),
+            'endpoints': summary,
+        }, **kwargs)
+
+    def to_prometheus(self, prefix='aodhclient'):
+        """Return the summary in the Prometheus text exposition format.
+
+        The quantiles are computed from the timings kept, the sums and the
+        counters include the dropped timings.
+        """
+        with self._lock:
+            dropped = {k: dict(v) for k, v in self._dropped.items()}
+        series = {(s['method'], s['url'], s['status']): s
+                  for s in self.summary()}
+        for key, totals in dropped.items():
+            s = series.setdefault(key, {'method': key[0], 'url': key[1],
+                                        'status': key[2], 'count': 0,
+                                        'latency_total': 0.0, 'bytes': 0,
+                                        'decode_time_total': 0.0})
+            for total, value in totals.items():
+                s[total] += value
+        series = sorted(series.values(), key=lambda s: s['latency_total'],
+                        reverse=True)
+        metrics = (
+            ('request_duration_seconds', 'summary',
+             'Latency of the requests sent to the Aodh API.'),
+            ('response_bytes_total', 'counter',
+             'Size of the response bodies received from the Aodh API.'),
+            ('decode_duration_seconds_total', 'counter',
+             'Time spent decoding the JSON responses of the Aodh API.'),
+        )
+        lines = []
+        for name, kind, help_text in metrics:
+            name = '%s_%s' % (prefix, name)
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for s in series:
+                labels = 'method="%s",url="%s",status="%s"' % (
+                    _label_value(s['method']), _label_value(s['url']),
+                    _label_value(s['status']))
+                if kind == 'summary':
+                    for quantile, key in (('0.5', 'latency_p50'),
+                                          ('0.95', 'latency_p95')):
+                        if key in s:
+                            lines.append('%s{%s,quantile="%s"} %r' % (
+                                name, labels, quantile, s[key]))
+                    lines.append('%s_sum{%s} %r' % (name, labels,
+                                                    s['latency_total']))
+                    lines.append('%s_count{%s} %d' % (name, labels,
+                                                      s['count']))
+                elif name.endswith('bytes_total'):
+                    lines.append('%s{%s} %d' % (name, labels, s['bytes']))
+                else:
+                    lines.append('%s{%s} %r' % (name, labels,
+                                                s['decode_time_total']))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='aodhclient'):
+        """Write the metrics to a file, e.g. for a textfile collector.
+
+        The file is replaced atomically, so it is never read partially.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.to_prometheus(prefix))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class TimedResponse:
+    """Response proxy adding the time spent decoding it to its timing."""
+
+    def __init__(self, response, timing, clock):
+        self._response = response
+        self._timing = timing
+        self._clock = clock
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def json(self, **kwargs):
+        start = self._clock()
+        try:
+            return self._response.json(**kwargs)
+        finally:
+            self._timing.decode_time += self._clock() - start
+
+    def iter_content(self, *args, **kwargs):
+        for chunk in self._response.iter_content(*args, **kwargs):
+            self._timing.bytes += len(chunk)
+            yield chunk
@@ -0,0 +1,105 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""osprofiler spans of the client.
+
+osprofiler is slow to import, it is never imported by aodhclient unless a
+trace is started, e.g. by ``aodh --os-profile``. A trace can only be in
+progress once its profiler module has been imported by the caller, so the
+spans cost a dict lookup when not tracing.
+"""
+
+import contextlib
+import functools
+import inspect
+import sys
+
+
+def get_profiler():
+    """Return the osprofiler profiler module if the thread is traced."""
+    profiler = sys.modules.get('osprofiler.profiler')
+    if profiler is None or profiler.get() is None:
+        return None
+    return profiler
+
+
+def get_trace_id_headers():
+    """Return the headers continuing the current trace on the server."""
+    if get_profiler() is None:
+        return {}
+    from osprofiler import web
+    return web.get_trace_id_headers()
+
+
+@contextlib.contextmanager
+def span(name, info=None):
+    """Trace the code run in the context in a span."""
+    profiler = get_profiler()
+    if profiler is None:
+        yield
+        return
+    profiler.start(name, info=info)
+    stop_info = None
+    try:
+        yield
+    except Exception as e:
+        stop_info = {'etype': type(e).__name__, 'message': str(e)}
+        raise
+    finally:
+        profiler.stop(info=stop_info)
+
+
+def _traced(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def trace_cls(name):
+    """Trace the public methods of a class in spans named <name>.<method>.
+
+    Generator methods are not traced, their span would end before they
+    run. The requests they send are traced.
+    """
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if (attr.startswith('_') or not inspect.isfunction(value) or
+                    inspect.isgeneratorfunction(value)):
+                continue
+            setattr(cls, attr, _traced('%s.%s' % (name, attr), value))
+        return cls
+    return decorator
+
+
+def propagate(func):
+    """Return func continuing the trace of the caller in another thread.
+
+    osprofiler traces are thread local, the function returned is to be
+    called by a worker thread.
+    """
+    profiler = get_profiler()
+    if profiler is None:
+        return func
+    current = profiler.get()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler.init(current.hmac_key, base_id=current.get_base_id(),
+                      parent_id=current.get_id())
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.clean()
+    return wrapper
@@ -10,41 +10,15 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import codecs
+import copy
+import functools
+import json
+import queue
 import re
+import threading
 from urllib import parse as urllib_parse
 
-import pyparsing as pp
-
-uninary_operators = ("not", )
-binary_operator = (">=", "<=", "!=", ">", "<", "=", "==", "eq", "ne",
-                   "lt", "gt", "ge", "le")
-multiple_operators = ("and", "or")
-
-operator = pp.Regex("|".join(binary_operator))
-null = pp.Regex("None|none|null").set_parse_action(pp.replace_with(None))
-boolean = "False|True|false|true"
-boolean = pp.Regex(boolean).set_parse_action(lambda t: t[0].lower() == "true")
-hex_string = lambda n: pp.Word(pp.hexnums, exact=n)  # noqa: E731
-uuid = pp.Combine(hex_string(8) + ("-" + hex_string(4)) * 3 +
-                  "-" + hex_string(12))
-number = r"[+-]?\d+(:?\.\d*)?(:?[eE][+-]?\d+)?"
-number = pp.Regex(number).set_parse_action(lambda t: float(t[0]))
-identifier = pp.Word(pp.alphas, pp.alphanums + "_")
-quoted_string = pp.QuotedString('"') | pp.QuotedString("'")
-comparison_term = pp.Forward()
-in_list = pp.Group(pp.Suppress('[') +
-                   pp.Optional(pp.DelimitedList(comparison_term)) +
-                   pp.Suppress(']'))("list")
-comparison_term << (null | boolean | uuid | identifier | number |
-                    quoted_string)
-condition = pp.Group(comparison_term + operator + comparison_term)
-
-expr = pp.infix_notation(condition, [
-    ("not", 1, pp.opAssoc.RIGHT, ),
-    ("and", 2, pp.opAssoc.LEFT, ),
-    ("or", 2, pp.opAssoc.LEFT, ),
-])
-
 OP_LOOKUP = {'!=': 'ne',
              '>=': 'ge',
              '<=': 'le',
@@ -56,40 +30,136 @@ OP_LOOKUP_KEYS = '|'.join(sorted(OP_LOOKUP.keys(), key=len, reverse=True))
 OP_SPLIT_RE = re.compile(r'(%s)' % OP_LOOKUP_KEYS)
 
 
-def _parsed_query2dict(parsed_query):
-    result = None
-    while parsed_query:
-        part = parsed_query.pop()
-        if part in binary_operator:
-            result = {part: {parsed_query.pop(): result}}
+_WORD_END = r"(?![A-Za-z0-9_])"
+_WHITESPACES_RE = re.compile(r"[ \t\n\r]*")
+_KEYWORD_RES = {k: re.compile(k + _WORD_END) for k in ("not", "and", "or")}
+_BINARY_OPERATOR_RE = re.compile(
+    ">=|<=|!=|>|<|=|==|eq|ne|lt|gt|ge|le")
+_WHITESPACE_ESCAPES = {r"\t": "\t", r"\n": "\n", r"\f": "\f", r"\r": "\r"}
+_TERM_RES = (
+    (re.compile("(?:None|none|null)" + _WORD_END), lambda v: None),
+    (re.compile("(?:False|True|false|true)" + _WORD_END),
+     lambda v: v.lower() == "true"),
+    (re.compile("[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}"
+                "(?![0-9a-fA-F])"), str),
+    (re.compile("[A-Za-z][A-Za-z0-9_]*"), str),
+    (re.compile(r"[+-]?\d+(?:\.\d*)?(?:[eE][+-]?\d+)?"), float),
+    (re.compile(r'"[^"\n]*"|' + r"'[^'\n]*'"),
+     lambda v: re.sub(r"\\[tnfr]", lambda m: _WHITESPACE_ESCAPES[m[0]],
+                      v[1:-1])),
+)
+
+
+class _QueryParser:
+    """Recursive descent parser of the rich query syntax.
+
+    The grammar is, from the lowest to the highest precedence::
+
+        expr      := and_expr ("or" and_expr)*
+        and_expr  := not_expr ("and" not_expr)*
+        not_expr  := "not" not_expr | "(" expr ")" | condition
+        condition := term operator term
+    """
 
-        elif part in multiple_operators:
-            if result.get(part):
-                result[part].append(
-                    _parsed_query2dict(parsed_query.pop()))
-            else:
-                result = {part: [result]}
-
-        elif part in uninary_operators:
-            result = {part: result}
-        elif isinstance(part, pp.ParseResults):
-            kind = part.get_name()
-            if kind == "list":
-                res = part.as_list()
-            else:
-                res = _parsed_query2dict(part)
-            if result is None:
-                result = res
-            elif isinstance(result, dict):
-                list(result.values())[0].append(res)
-        else:
-            result = part
-    return result
+    def __init__(self, query):
+        self.query = query
+        self.pos = 0
+
+    def _skip_whitespaces(self):
+        self.pos = _WHITESPACES_RE.match(self.query, self.pos).end()
+
+    def _match(self, regex):
+        self._skip_whitespaces()
+        m = regex.match(self.query, self.pos)
+        if m:
+            self.pos = m.end()
+        return m
+
+    def _literal(self, char):
+        self._skip_whitespaces()
+        if self.query.startswith(char, self.pos):
+            self.pos += 1
+            return True
+        return False
+
+    def _error(self, expected):
+        self._skip_whitespaces()
+        return ValueError("Invalid query %r: %s expected at position %d" %
+                          (self.query, expected, self.pos))
+
+    def _term(self):
+        for regex, convert in _TERM_RES:
+            m = self._match(regex)
+            if m:
+                return convert(m[0])
+        raise self._error("a field or a value")
+
+    def _condition(self):
+        left = self._term()
+        op = self._match(_BINARY_OPERATOR_RE)
+        if not op:
+            raise self._error("an operator")
+        return {op[0]: {left: self._term()}}
+
+    def _not_expr(self):
+        start = self.pos
+        if self._match(_KEYWORD_RES["not"]):
+            try:
+                return {"not": self._not_expr()}
+            except ValueError:
+                # Maybe a field named not
+                self.pos = start
+        if self._literal("("):
+            expr = self._expr()
+            if not self._literal(")"):
+                raise self._error("')'")
+            return expr
+        return self._condition()
+
+    def _operands(self, keyword, parse_operand):
+        operands = [parse_operand()]
+        while self._match(_KEYWORD_RES[keyword]):
+            operands.append(parse_operand())
+        if len(operands) == 1:
+            return operands[0]
+        # NOTE: operands are listed from the last one and the operands of
+        # the last one are merged when it uses the same operator, as done
+        # by the pyparsing based implementation this parser replaced.
+        last = operands.pop()
+        if not (isinstance(last, dict) and last.get(keyword)):
+            last = {keyword: [last]}
+        last[keyword].extend(reversed(operands))
+        return last
+
+    def _and_expr(self):
+        return self._operands("and", self._not_expr)
+
+    def _expr(self):
+        return self._operands("or", self._and_expr)
+
+    def parse(self):
+        expr = self._expr()
+        self._skip_whitespaces()
+        if self.pos != len(self.query):
+            raise self._error("'and', 'or' or the end of the query")
+        return expr
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_query(query):
+    return _QueryParser(query).parse()
 
 
 def search_query_builder(query):
-    parsed_query = expr.parse_string(query)[0]
-    return _parsed_query2dict(parsed_query)
+    """Convert a rich query to the complex query format of the API.
+
+    For example 'state=alarm and not type="event"' gives
+    {"and": [{"not": {"=": {"type": "event"}}}, {"=": {"state": "alarm"}}]}
+
+    :raises ValueError: if the query is invalid
+    """
+    # NOTE: parsed queries are cached, return a copy the caller can modify
+    return copy.deepcopy(_parse_query(query))
 
 
 def list2cols(cols, objs):
@@ -97,6 +167,13 @@ def list2cols(cols, objs):
                   for o in objs]
 
 
+def iter2cols(cols, objs):
+    # NOTE: same as list2cols but rows are produced lazily, so formatters
+    # able to stream (value, csv...) can output them as objs is consumed.
+    return cols, (tuple([o[k] for k in cols])
+                  for o in objs)
+
+
 def format_string_list(objs, field):
     objs[field] = ", ".join(objs[field])
 
@@ -199,6 +276,127 @@ def get_pagination_options(limit=None, marker=None, sorts=None):
     return "&".join(options)
 
 
+def prefetch(iterable, depth=1):
+    """Consume an iterable in a background thread.
+
+    Up to `depth` items are produced ahead of the consumer and kept in a
+    bounded queue, so a slow producer (e.g. the next page of an API
+    listing) runs while the current item is being processed. Exceptions
+    raised by the producer are re-raised in the consumer.
+
+    :param iterable: the iterable to consume
+    :param depth: maximum number of items buffered ahead of the consumer
+    :type depth: int
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((end, e))
+        else:
+            put((end, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # NOTE: also reached when the consumer stops early, this unblocks
+        # the producer so the thread does not linger.
+        stop.set()
+
+
+_JSON_WS = ' \t\n\r'
+
+
+def iter_json_array(chunks):
+    """Decode a JSON array from chunks of UTF-8 bytes, item by item.
+
+    Each item of the array is yielded as soon as it has been received, so
+    only one item and one chunk are held in memory at a time, whatever the
+    size of the array.
+
+    :param chunks: iterable of bytes, e.g. the iter_content() of a response
+    :raises ValueError: if the chunks are not a valid JSON array
+    """
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    decoder = json.JSONDecoder()
+    buf = ''
+    state = 'start'
+    chunks = iter(chunks)
+    final = False
+    while not final:
+        chunk = next(chunks, None)
+        final = chunk is None
+        buf += utf8.decode(b'' if final else chunk, final=final)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in _JSON_WS:
+                pos += 1
+            if pos == len(buf):
+                break
+            if state == 'start':
+                if buf[pos] != '[':
+                    raise ValueError("Expecting a JSON array")
+                pos += 1
+                state = 'first'
+            elif state in ('first', 'item'):
+                if state == 'first' and buf[pos] == ']':
+                    pos += 1
+                    state = 'end'
+                    continue
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if final:
+                        raise
+                    break
+                # NOTE: a number at the end of the buffer, or followed by
+                # an incomplete exponent or fraction, may continue in the
+                # next chunk.
+                if not final and (end == len(buf) or
+                                  buf[end] not in _JSON_WS + ',]'):
+                    break
+                yield item
+                pos = end
+                state = 'separator'
+            elif state == 'separator':
+                if buf[pos] == ',':
+                    state = 'item'
+                elif buf[pos] == ']':
+                    state = 'end'
+                else:
+                    raise ValueError("Expecting ',' or ']' between the items "
+                                     "of the JSON array")
+                pos += 1
+            else:
+                raise ValueError("Extra data after the JSON array")
+        buf = buf[pos:]
+    if state != 'end':
+        raise ValueError("Unterminated JSON array")
+
+
 def get_client(obj):
     if hasattr(obj.app, 'client_manager'):
         # NOTE(liusheng): cliff objects loaded by OSC
@@ -0,0 +1,120 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Asyncio client for the Aodh v2 API."""
+
+import asyncio
+from concurrent import futures
+import functools
+import inspect
+
+from aodhclient import tracing
+from aodhclient.v2 import client
+
+
+class AsyncManager:
+    """Expose the public methods of a manager as coroutines.
+
+    Calls are run by the client worker threads, so the event loop is never
+    blocked by HTTP requests. Generator methods such as
+    :py:meth:`aodhclient.v2.alarm.AlarmManager.iter_list` are exposed as
+    asynchronous generators.
+    """
+
+    def __init__(self, manager, executor):
+        self._manager = manager
+        self._executor = executor
+
+    def __getattr__(self, name):
+        attr = getattr(self._manager, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        if inspect.isgeneratorfunction(attr):
+            wrapper = self._wrap_generator(attr)
+        else:
+            wrapper = self._wrap(attr)
+        # NOTE: cache the wrapper, __getattr__ is not called anymore then
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def _wrap(self, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor,
+                tracing.propagate(functools.partial(func, *args, **kwargs)))
+        return wrapper
+
+    def _wrap_generator(self, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            items = func(*args, **kwargs)
+            next_item = tracing.propagate(next)
+            end = object()
+            try:
+                while True:
+                    item = await loop.run_in_executor(
+                        self._executor, next_item, items, end)
+                    if item is end:
+                        return
+                    yield item
+            finally:
+                # NOTE: release the connection of the response being read
+                # when the caller stops early.
+                await loop.run_in_executor(self._executor,
+                                           tracing.propagate(items.close))
+        return wrapper
+
+
+class Client:
+    """Asyncio client for the Aodh v2 API.
+
+    It has the same managers as :py:class:`aodhclient.v2.client.Client`,
+    but their methods are awaitable. Up to `max_concurrency` requests are
+    in flight at the same time, all of them sharing the connection pool of
+    the session.
+
+    :param string session: session
+    :type session: :py:class:`keystoneauth.adapter.Adapter`
+    :param max_concurrency: maximum number of concurrent requests
+    :type max_concurrency: int
+    """
+
+    def __init__(self, session=None, service_type='alarming',
+                 max_concurrency=10, **kwargs):
+        """Initialize a new asyncio client for the Aodh v2 API."""
+        kwargs.setdefault('pool_maxsize', max_concurrency)
+        self.sync_client = client.Client(session, service_type=service_type,
+                                         **kwargs)
+        self._executor = futures.ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix='aodhclient')
+        self.alarm = AsyncManager(self.sync_client.alarm, self._executor)
+        self.alarm_history = AsyncManager(self.sync_client.alarm_history,
+                                          self._executor)
+        self.capabilities = AsyncManager(self.sync_client.capabilities,
+                                         self._executor)
+        self.quota = AsyncManager(self.sync_client.quota, self._executor)
+        self.metrics = AsyncManager(self.sync_client.metrics, self._executor)
+
+    def close(self):
+        """Wait for the pending requests and release the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
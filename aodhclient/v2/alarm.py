@@ -11,13 +11,21 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+
 from oslo_serialization import jsonutils
 
+from aodhclient import tracing
 from aodhclient import utils
 from aodhclient.v2 import alarm_cli
 from aodhclient.v2 import base
 
+# NOTE: the rules of these alarm types are replaced as a whole on update,
+# the other ones are merged with the current rule.
+REPLACED_RULE_TYPES = ('composite', 'loadbalancer_member_health')
+
 
+@tracing.trace_cls('alarm')
 class AlarmManager(base.Manager):
 
     url = "v2/alarms"
@@ -31,7 +39,7 @@ class AlarmManager(base.Manager):
         return '&'.join(urls)
 
     def list(self, filters=None, limit=None,
-             marker=None, sorts=None):
+             marker=None, sorts=None, stream=False):
         """List alarms.
 
         :param filters: A dict includes filters parameters, for example,
@@ -47,6 +55,9 @@ class AlarmManager(base.Manager):
         :type marker: str
         :param sorts: list of resource attributes to order by.
         :type sorts: list of str
+        :param stream: return an iterator decoding the alarms as they are
+                       received, instead of a list
+        :type stream: bool
         """
         pagination = utils.get_pagination_options(limit, marker, sorts)
         filter_string = (self._filtersdict_to_url(filters) if
@@ -59,9 +70,49 @@ class AlarmManager(base.Manager):
             options.append(pagination)
         if options:
             url += "?" + "&".join(options)
+        if stream:
+            return self._iter_json(self._get(url, stream=True))
         return self._get(url).json()
 
-    def query(self, query=None):
+    def _iter_pages(self, filters, page_size, sorts, marker):
+        while True:
+            alarms = self.list(filters=filters, limit=page_size,
+                               marker=marker, sorts=sorts)
+            yield alarms
+            if not alarms or (page_size and len(alarms) < page_size):
+                return
+            marker = alarms[-1]['alarm_id']
+
+    def iter_list(self, filters=None, page_size=None, sorts=None,
+                  marker=None, prefetch=0):
+        """Iterate over all alarms, following the pagination markers.
+
+        Pages are requested one after the other and their alarms are
+        yielded as soon as each page is received, so the whole result set
+        is never held in memory.
+
+        :param filters: A dict includes filters parameters, see
+                        :py:meth:`list`.
+        :type filters: dict
+        :param page_size: number of alarms to request per page
+                          (Default is server default)
+        :type page_size: int
+        :param sorts: list of resource attributes to order by.
+        :type sorts: list of str
+        :param marker: the alarm_id after which to start the iteration.
+        :type marker: str
+        :param prefetch: number of pages to request in a background thread
+                         ahead of the one being consumed, 0 disables
+                         prefetching.
+        :type prefetch: int
+        """
+        pages = self._iter_pages(filters, page_size, sorts, marker)
+        if prefetch:
+            pages = utils.prefetch(pages, prefetch)
+        for alarms in pages:
+            yield from alarms
+
+    def query(self, query=None, stream=False):
         """Query alarms.
 
         :param query: A json format complex query expression, like this:
@@ -69,9 +120,16 @@ class AlarmManager(base.Manager):
                       expression is used to query all the
                       gnocchi_resources_threshold type alarms.
         :type query: json
+        :param stream: return an iterator decoding the alarms as they are
+                       received, instead of a list
+        :type stream: bool
         """
         query = {'filter': query}
         url = "v2/query/alarms"
+        if stream:
+            return self._iter_json(self._post(
+                url, headers={'Content-Type': "application/json"},
+                data=jsonutils.dumps(query), stream=True))
         return self._post(url,
                           headers={'Content-Type': "application/json"},
                           data=jsonutils.dumps(query)).json()
@@ -101,87 +159,64 @@ class AlarmManager(base.Manager):
             self.url, headers={'Content-Type': "application/json"},
             data=jsonutils.dumps(alarm)).json()
 
-    def update(self, alarm_id, alarm_update):
+    def create_many(self, alarms, concurrency=10):
+        """Create several alarms concurrently
+
+        A failure to create an alarm does not stop the creation of the
+        others.
+
+        :param alarms: the alarms
+        :type alarms: list of dict
+        :param concurrency: maximum number of alarms created at the same time
+        :type concurrency: int
+        :return: for each alarm, in the same order, a (created alarm, None)
+                 tuple on success or a (None, exception) tuple on failure
+        :rtype: list of tuple
+        """
+        results = [None] * len(alarms)
+        for index, _alarm, created, error in self._run_concurrently(
+                self.create, alarms, concurrency):
+            results[index] = (created, error)
+        return results
+
+    @staticmethod
+    def _merge_rule(alarm, alarm_update):
+        alarm_type = alarm_update.get('type', alarm['type'])
+        rule_key = '%s_rule' % alarm_type
+        if rule_key not in alarm_update:
+            return
+        rule = alarm_update.pop(rule_key)
+        if alarm_type != alarm['type']:
+            alarm.pop('%s_rule' % alarm['type'], None)
+            if rule is not None:
+                alarm[rule_key] = rule
+        elif rule is not None:
+            if (alarm_type in REPLACED_RULE_TYPES or
+                    not isinstance(alarm.get(rule_key), dict)):
+                alarm[rule_key] = rule
+            else:
+                alarm[rule_key].update(rule)
+
+    def update(self, alarm_id, alarm_update, alarm=None):
         """Update an alarm
 
         :param alarm_id: ID of the alarm
         :type alarm_id: str
-        :param attributes: Attributes of the alarm
-        :type attributes: dict
+        :param alarm_update: Attributes of the alarm to update
+        :type alarm_update: dict
+        :param alarm: the current alarm, as returned by :py:meth:`get`. If
+                      provided, the update is applied on it instead of on
+                      an alarm requested again from the API. It is not
+                      modified.
+        :type alarm: dict
         """
-        alarm = self._get(self.url + '/' + alarm_id).json()
-        if 'type' not in alarm_update:
-            self._clean_rules(alarm['type'], alarm_update)
+        if alarm is None:
+            alarm = self._get(self.url + '/' + alarm_id).json()
         else:
-            self._clean_rules(alarm_update['type'], alarm_update)
-
-        if 'prometheus_rule' in alarm_update:
-            rule = alarm_update.get('prometheus_rule')
-            alarm['prometheus_rule'].update(rule)
-            alarm_update.pop('prometheus_rule')
-        elif 'threshold_rule' in alarm_update:
-            alarm['threshold_rule'].update(alarm_update.get('threshold_rule'))
-            alarm_update.pop('threshold_rule')
-        elif 'event_rule' in alarm_update:
-            if ('type' in alarm_update and
-                    alarm_update['type'] != alarm['type']):
-                alarm.pop('%s_rule' % alarm['type'], None)
-                alarm['event_rule'] = alarm_update['event_rule']
-            else:
-                alarm['event_rule'].update(alarm_update.get('event_rule'))
-            alarm_update.pop('event_rule')
-        elif 'gnocchi_resources_threshold_rule' in alarm_update:
-            if ('type' in alarm_update and
-                    alarm_update['type'] != alarm['type']):
-                alarm.pop('%s_rule' % alarm['type'], None)
-                alarm['gnocchi_resources_threshold_rule'] = alarm_update[
-                    'gnocchi_resources_threshold_rule']
-            else:
-                alarm['gnocchi_resources_threshold_rule'].update(
-                    alarm_update.get('gnocchi_resources_threshold_rule'))
-            alarm_update.pop('gnocchi_resources_threshold_rule')
-        elif 'gnocchi_aggregation_by_metrics_threshold_rule' in alarm_update:
-            if ('type' in alarm_update and
-                    alarm_update['type'] != alarm['type']):
-                alarm.pop('%s_rule' % alarm['type'], None)
-                alarm['gnocchi_aggregation_by_metrics_threshold_rule'] = \
-                    alarm_update[
-                        'gnocchi_aggregation_by_metrics_threshold_rule']
-            else:
-                alarm['gnocchi_aggregation_by_metrics_threshold_rule'].update(
-                    alarm_update.get(
-                        'gnocchi_aggregation_by_metrics_threshold_rule'))
-            alarm_update.pop('gnocchi_aggregation_by_metrics_threshold_rule')
-        elif 'gnocchi_aggregation_by_resources_threshold_rule' in alarm_update:
-            if ('type' in alarm_update and
-                    alarm_update['type'] != alarm['type']):
-                alarm.pop('%s_rule' % alarm['type'], None)
-                alarm['gnocchi_aggregation_by_resources_threshold_rule'] = \
-                    alarm_update[
-                        'gnocchi_aggregation_by_resources_threshold_rule']
-            else:
-                alarm['gnocchi_aggregation_by_resources_threshold_rule'].\
-                    update(alarm_update.get(
-                        'gnocchi_aggregation_by_resources_threshold_rule'))
-            alarm_update.pop(
-                'gnocchi_aggregation_by_resources_threshold_rule')
-        elif 'composite_rule' in alarm_update:
-            if ('type' in alarm_update and
-                    alarm_update['type'] != alarm['type']):
-                alarm.pop('%s_rule' % alarm['type'], None)
-            if alarm_update['composite_rule'] is not None:
-                alarm['composite_rule'] = alarm_update[
-                    'composite_rule']
-            alarm_update.pop('composite_rule')
-        elif 'loadbalancer_member_health_rule' in alarm_update:
-            if ('type' in alarm_update and
-                    alarm_update['type'] != alarm['type']):
-                alarm.pop('%s_rule' % alarm['type'], None)
-            if alarm_update['loadbalancer_member_health_rule'] is not None:
-                alarm['loadbalancer_member_health_rule'] = alarm_update[
-                    'loadbalancer_member_health_rule']
-            alarm_update.pop('loadbalancer_member_health_rule')
-
+            alarm = copy.deepcopy(alarm)
+        self._clean_rules(alarm_update.get('type', alarm['type']),
+                          alarm_update)
+        self._merge_rule(alarm, alarm_update)
         alarm.update(alarm_update)
 
         return self._put(
@@ -197,6 +232,31 @@ class AlarmManager(base.Manager):
         """
         self._delete(self.url + '/' + alarm_id)
 
+    def delete_many(self, alarm_ids, concurrency=10, progress=None):
+        """Delete several alarms concurrently
+
+        A failure to delete an alarm does not stop the deletion of the
+        others.
+
+        :param alarm_ids: IDs of the alarms, they are consumed lazily
+        :type alarm_ids: iterable of str
+        :param concurrency: maximum number of alarms deleted at the same time
+        :type concurrency: int
+        :param progress: callable called with the alarm ID and the exception
+                         (or None on success) after each deletion
+        :type progress: callable
+        :return: a (alarm ID, exception) tuple for each failed deletion
+        :rtype: list of tuple
+        """
+        failures = []
+        for _index, alarm_id, _result, error in self._run_concurrently(
+                self.delete, alarm_ids, concurrency):
+            if error is not None:
+                failures.append((alarm_id, error))
+            if progress is not None:
+                progress(alarm_id, error)
+        return failures
+
     def get_state(self, alarm_id):
         """Get the state of an alarm
 
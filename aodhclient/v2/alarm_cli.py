@@ -12,18 +12,25 @@
 #    under the License.
 
 import argparse
+import logging
+import os
+import sys
+import time
 
 from cliff import command
 from cliff import lister
 from cliff import show
 from oslo_serialization import jsonutils
-from oslo_utils import strutils
 from oslo_utils import uuidutils
 
+from aodhclient import cache
 from aodhclient import exceptions
 from aodhclient.i18n import _
 from aodhclient import utils
 
+LOG = logging.getLogger(__name__)
+
+
 ALARM_TYPES = ['prometheus', 'event', 'composite', 'threshold',
                'gnocchi_resources_threshold',
                'gnocchi_aggregation_by_metrics_threshold',
@@ -37,6 +44,13 @@ STATISTICS = ['max', 'min', 'avg', 'sum', 'count']
 ALARM_LIST_COLS = ['alarm_id', 'type', 'name', 'state', 'severity', 'enabled']
 
 
+def _bool_from_string(value):
+    # NOTE: oslo_utils.strutils compiles many regexes when imported, only
+    # import it when a boolean option is actually given.
+    from oslo_utils import strutils
+    return strutils.bool_from_string(value)
+
+
 class CliAlarmList(lister.Lister):
     """List alarms"""
 
@@ -54,7 +68,8 @@ class CliAlarmList(lister.Lister):
         exclusive_group.add_argument(
             "--query",
             help="List alarms using rich queries API, "
-                 "e.g. project_id!=my-id user_id=foo or user_id=bar."
+                 "e.g. project_id!='my-id' and "
+                 "(user_id=foo or user_id=bar)."
         )
         exclusive_group.add_argument(
             '--filter',
@@ -77,17 +92,35 @@ class CliAlarmList(lister.Lister):
                             metavar="<SORT_KEY:SORT_DIR>",
                             help="Sort of resource attribute, "
                                  "e.g. name:asc")
+        parser.add_argument("--page-size", type=int, metavar="<PAGE_SIZE>",
+                            help="List all alarms, fetching them page by "
+                                 "page with this number of alarms per "
+                                 "request. The next page is requested "
+                                 "while the current one is output.")
         return parser
 
     def take_action(self, parsed_args):
         if parsed_args.query:
-            if any([parsed_args.limit, parsed_args.sort, parsed_args.marker]):
+            if any([parsed_args.limit, parsed_args.sort, parsed_args.marker,
+                    parsed_args.page_size]):
                 raise exceptions.CommandError(
                     "Query and pagination options are mutually "
                     "exclusive.")
             query = jsonutils.dumps(
                 utils.search_query_builder(parsed_args.query))
-            alarms = utils.get_client(self).alarm.query(query=query)
+            alarms = utils.get_client(self).alarm.query(query=query,
+                                                        stream=True)
+            return utils.iter2cols(ALARM_LIST_COLS, alarms)
+        elif parsed_args.page_size:
+            if parsed_args.limit:
+                raise exceptions.CommandError(
+                    "Limit and page size options are mutually exclusive.")
+            filters = dict(parsed_args.filter) if parsed_args.filter else None
+            alarms = utils.get_client(self).alarm.iter_list(
+                filters=filters, sorts=parsed_args.sort,
+                page_size=parsed_args.page_size, marker=parsed_args.marker,
+                prefetch=1)
+            return utils.iter2cols(ALARM_LIST_COLS, alarms)
         else:
             filters = dict(parsed_args.filter) if parsed_args.filter else None
             alarms = utils.get_client(self).alarm.list(
@@ -118,7 +151,67 @@ def _format_alarm(alarm):
     return alarm
 
 
-def _find_alarm_by_name(client, name):
+class AlarmNameCache:
+    """On-disk cache of the IDs of the alarms looked up by name.
+
+    It is enabled by setting the AODH_ALARM_NAME_CACHE_TTL environment
+    variable to the number of seconds the entries are kept. Entries are
+    scoped by API endpoint and project.
+
+    The alarm of a cached ID is got to check that it still has the name,
+    the commands then use it: show and state get send no other request,
+    update sends no other GET before its PUT. delete and state set send
+    this GET instead of a complex query.
+    """
+
+    TTL_ENV = 'AODH_ALARM_NAME_CACHE_TTL'
+
+    def __init__(self, client, ttl):
+        self.client = client
+        self.cache = cache.FileCache(cache.default_path('alarm-names.json'),
+                                     ttl=ttl, maxsize=1000)
+
+    @classmethod
+    def from_env(cls, client):
+        try:
+            ttl = float(os.environ.get(cls.TTL_ENV) or 0)
+        except ValueError:
+            ttl = 0
+        if ttl > 0:
+            return cls(client, ttl)
+
+    def _key(self, name):
+        return '|'.join([self.client.api.get_endpoint() or '',
+                         self.client.api.get_project_id() or '', name])
+
+    def get(self, name):
+        return self.cache.get(self._key(name))
+
+    def set(self, name, alarm_id):
+        self.cache.set(self._key(name), alarm_id)
+
+    def get_alarm(self, name):
+        """Return the alarm cached for the name, if it still has it."""
+        alarm_id = self.get(name)
+        if not alarm_id:
+            return None
+        try:
+            alarm = self.client.alarm.get(alarm_id=alarm_id)
+        except exceptions.NotFound:
+            alarm = None
+        if alarm is None or alarm.get('name') != name:
+            self.forget(name)
+            return None
+        return alarm
+
+    def forget(self, name):
+        self.cache.delete(self._key(name))
+
+    def forget_id(self, alarm_id):
+        self.cache.delete_value(alarm_id)
+
+
+def _find_alarm_by_name(client, name, names=None):
     # then try to get entity as name
     query = jsonutils.dumps({"=": {"name": name}})
     alarms = client.alarm.query(query)
@@ -130,12 +223,36 @@ def _find_alarm_by_name(client, name):
         msg = (_("Alarm %s not found") % name)
         raise exceptions.NotFound(msg)
     else:
+        if names is not None:
+            names.set(name, alarms[0]['alarm_id'])
         return alarms[0]
 
 
-def _find_alarm_id_by_name(client, name):
-    alarm = _find_alarm_by_name(client, name)
-    return alarm['alarm_id']
+def _call_with_alarm_id(client, id_or_name, func, is_name=False):
+    """Call func with the ID of an alarm given by ID or by name.
+
+    func is called with the ID and the alarm, when it has been fetched to
+    find the ID, so that it does not request it again. The alarm is None
+    when it is given by ID.
+    """
+    names = AlarmNameCache.from_env(client)
+    if names is not None:
+        # NOTE: the cached alarm may have been renamed, and another alarm
+        # may have its name now, check it before modifying it.
+        alarm = names.get_alarm(id_or_name)
+        if alarm is not None:
+            try:
+                return func(alarm['alarm_id'], alarm)
+            except exceptions.NotFound:
+                names.forget(id_or_name)
+    if not is_name and uuidutils.is_uuid_like(id_or_name):
+        try:
+            return func(id_or_name, None)
+        except exceptions.NotFound:
+            # Maybe it was not an ID after all
+            pass
+    alarm = _find_alarm_by_name(client, id_or_name, names)
+    return func(alarm['alarm_id'], alarm)
 
 
 def _check_name_and_id_coexist(parsed_args, action):
@@ -184,18 +301,10 @@ class CliAlarmShow(show.ShowOne):
     def take_action(self, parsed_args):
         _check_name_and_id(parsed_args, 'query')
         c = utils.get_client(self)
-        if parsed_args.name:
-            alarm = _find_alarm_by_name(c, parsed_args.name)
-        else:
-            if uuidutils.is_uuid_like(parsed_args.id):
-                try:
-                    alarm = c.alarm.get(alarm_id=parsed_args.id)
-                except exceptions.NotFound:
-                    # Maybe it's a name
-                    alarm = _find_alarm_by_name(c, parsed_args.id)
-            else:
-                alarm = _find_alarm_by_name(c, parsed_args.id)
-
+        alarm = _call_with_alarm_id(
+            c, parsed_args.name or parsed_args.id,
+            lambda _id, alarm: alarm or c.alarm.get(alarm_id=_id),
+            is_name=bool(parsed_args.name))
         return self.dict2columns(_format_alarm(alarm))
 
 
@@ -230,7 +339,7 @@ class CliAlarmCreate(show.ShowOne):
                             choices=ALARM_SEVERITY,
                             help='Severity of the alarm, one of: '
                             + str(ALARM_SEVERITY))
-        parser.add_argument('--enabled', type=strutils.bool_from_string,
+        parser.add_argument('--enabled', type=_bool_from_string,
                             metavar='{True|False}',
                             help=('True if alarm evaluation is enabled'))
         parser.add_argument('--alarm-action', dest='alarm_actions',
@@ -262,7 +371,7 @@ class CliAlarmCreate(show.ShowOne):
                   '[timezone=<IANA Timezone>]]'))
         parser.add_argument('--repeat-actions', dest='repeat_actions',
                             metavar='{True|False}',
-                            type=strutils.bool_from_string,
+                            type=_bool_from_string,
                             help=('True if actions should be repeatedly '
                                   'notified while alarm remains in target '
                                   'state'))
@@ -489,6 +598,74 @@ class CliAlarmCreate(show.ShowOne):
         return self.dict2columns(_format_alarm(alarm))
 
 
+class CliAlarmBulkCreate(lister.Lister):
+    """Create alarms from a file"""
+
+    COLS = ('line', 'alarm_id', 'name', 'status')
+    failures = 0
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument('--from-file', metavar='<FILE>', required=True,
+                            help='File with one alarm per line, in the JSON '
+                                 'format of the alarm API. Use - to read '
+                                 'from standard input.')
+        parser.add_argument('--concurrency', type=int, metavar='<N>',
+                            default=10,
+                            help='Number of alarms created at the same '
+                                 'time (Default is 10)')
+        return parser
+
+    @staticmethod
+    def _read_alarms(stream):
+        lines, alarms = [], []
+        for lineno, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                alarm = jsonutils.loads(line)
+            except ValueError as e:
+                raise exceptions.CommandError(
+                    "Invalid alarm at line %d: %s" % (lineno, e))
+            if not isinstance(alarm, dict) or 'type' not in alarm:
+                raise exceptions.CommandError(
+                    "Invalid alarm at line %d: an alarm object with "
+                    "a type is expected" % lineno)
+            lines.append(lineno)
+            alarms.append(alarm)
+        return lines, alarms
+
+    def take_action(self, parsed_args):
+        if parsed_args.concurrency < 1:
+            raise exceptions.CommandError(
+                "Concurrency must be a positive integer.")
+        if parsed_args.from_file == '-':
+            lines, alarms = self._read_alarms(sys.stdin)
+        else:
+            with open(parsed_args.from_file) as f:
+                lines, alarms = self._read_alarms(f)
+        names = [alarm.get('name') for alarm in alarms]
+        results = utils.get_client(self).alarm.create_many(
+            alarms, concurrency=parsed_args.concurrency)
+        rows = []
+        self.failures = 0
+        for lineno, name, (created, error) in zip(lines, names, results):
+            if error is None:
+                rows.append((lineno, created['alarm_id'], name, 'created'))
+            else:
+                self.failures += 1
+                rows.append((lineno, None, name, str(error)))
+        return self.COLS, rows
+
+    def run(self, parsed_args):
+        result = super().run(parsed_args)
+        if self.failures:
+            LOG.error("%d of the alarms could not be created",
+                      self.failures)
+            return 1
+        return result
+
+
 class CliAlarmUpdate(CliAlarmCreate):
     """Update an alarm"""
 
@@ -503,21 +680,17 @@ class CliAlarmUpdate(CliAlarmCreate):
         _check_name_and_id_exist(parsed_args, 'update')
         c = utils.get_client(self)
 
-        if uuidutils.is_uuid_like(parsed_args.id):
-            try:
-                alarm = c.alarm.update(alarm_id=parsed_args.id,
-                                       alarm_update=attributes)
-            except exceptions.NotFound:
-                # Maybe it was not an ID but a name, damn
-                _id = _find_alarm_id_by_name(c, parsed_args.id)
-            else:
-                return self.dict2columns(_format_alarm(alarm))
-        elif parsed_args.id:
-            _id = _find_alarm_id_by_name(c, parsed_args.id)
-        else:
-            _id = _find_alarm_id_by_name(c, parsed_args.name)
-
-        alarm = c.alarm.update(alarm_id=_id, alarm_update=attributes)
+        alarm = _call_with_alarm_id(
+            c, parsed_args.id or parsed_args.name,
+            lambda _id, alarm: c.alarm.update(alarm_id=_id,
+                                              alarm_update=attributes,
+                                              alarm=alarm),
+            is_name=not parsed_args.id)
+        if parsed_args.id and parsed_args.name:
+            # The alarm has been renamed
+            names = AlarmNameCache.from_env(c)
+            if names is not None:
+                names.forget_id(alarm['alarm_id'])
         return self.dict2columns(_format_alarm(alarm))
 
 
@@ -525,26 +698,100 @@ class CliAlarmDelete(command.Command):
     """Delete an alarm"""
 
     def get_parser(self, prog_name):
-        return _add_name_to_parser(
+        parser = _add_name_to_parser(
             _add_id_to_parser(
                 super().get_parser(prog_name)))
+        bulk_group = parser.add_argument_group(
+            'bulk deletion',
+            'Delete all the alarms matching a filter or a query')
+        exclusive_group = bulk_group.add_mutually_exclusive_group()
+        exclusive_group.add_argument(
+            '--filter',
+            dest='filter',
+            metavar='<KEY1=VALUE1;KEY2=VALUE2...>',
+            type=CliAlarmList.split_filter_param,
+            action='append',
+            help='Filter parameters of the alarms to delete.')
+        exclusive_group.add_argument(
+            '--query',
+            help="Rich query matching the alarms to delete, "
+                 "e.g. project_id='my-id' and state=alarm.")
+        bulk_group.add_argument(
+            '--yes', action='store_true',
+            help='Confirm the deletion of all the matching alarms.')
+        bulk_group.add_argument(
+            '--concurrency', type=int, metavar='<N>', default=10,
+            help='Number of alarms deleted at the same time '
+                 '(Default is 10)')
+        return parser
 
     def take_action(self, parsed_args):
+        if parsed_args.filter or parsed_args.query:
+            return self._bulk_delete(parsed_args)
+
         _check_name_and_id(parsed_args, 'delete')
         c = utils.get_client(self)
+        names = AlarmNameCache.from_env(c)
+
+        def delete(_id, alarm):
+            c.alarm.delete(_id)
+            if names is not None:
+                names.forget_id(_id)
+
+        _call_with_alarm_id(c, parsed_args.name or parsed_args.id, delete,
+                            is_name=bool(parsed_args.name))
+
+    def _bulk_delete(self, parsed_args):
+        if parsed_args.id or parsed_args.name:
+            raise exceptions.CommandError(
+                "Alarm ID or name and --filter/--query options are "
+                "mutually exclusive.")
+        if not parsed_args.yes:
+            raise exceptions.CommandError(
+                "Deleting all the alarms matching a filter or a query "
+                "requires the --yes option.")
+        if parsed_args.concurrency < 1:
+            raise exceptions.CommandError(
+                "Concurrency must be a positive integer.")
+        c = utils.get_client(self)
 
-        if parsed_args.name:
-            _id = _find_alarm_id_by_name(c, parsed_args.name)
-        elif uuidutils.is_uuid_like(parsed_args.id):
-            try:
-                return c.alarm.delete(parsed_args.id)
-            except exceptions.NotFound:
-                # Maybe it was not an ID after all
-                _id = _find_alarm_id_by_name(c, parsed_args.id)
+        if parsed_args.query:
+            query = jsonutils.dumps(
+                utils.search_query_builder(parsed_args.query))
+            alarm_ids = (a['alarm_id']
+                         for a in c.alarm.query(query=query, stream=True))
         else:
-            _id = _find_alarm_id_by_name(c, parsed_args.id)
-
-        c.alarm.delete(_id)
+            # NOTE: the IDs are all collected before deleting anything, as
+            # the next page of the listing would be requested with a marker
+            # alarm that may already be deleted.
+            alarm_ids = [a['alarm_id'] for a in c.alarm.iter_list(
+                filters=dict(parsed_args.filter), page_size=1000)]
+
+        counts = {'deleted': 0, 'failed': 0}
+        start = time.monotonic()
+
+        def progress(alarm_id, error):
+            if error is None:
+                counts['deleted'] += 1
+            else:
+                counts['failed'] += 1
+                LOG.error("Unable to delete alarm %s: %s",
+                          alarm_id, error)
+            done = counts['deleted'] + counts['failed']
+            if done % 100 == 0:
+                self.app.stderr.write("%d alarm(s) processed, %.1f/s\n" % (
+                    done, done / max(time.monotonic() - start, 1e-6)))
+
+        c.alarm.delete_many(alarm_ids, concurrency=parsed_args.concurrency,
+                            progress=progress)
+        elapsed = time.monotonic() - start
+        done = counts['deleted'] + counts['failed']
+        self.app.stdout.write(
+            "Deleted %d alarm(s) in %.2fs (%.1f/s), %d failed\n" % (
+                counts['deleted'], elapsed, done / max(elapsed, 1e-6),
+                counts['failed']))
+        if counts['failed']:
+            return 1
 
 
 class CliAlarmStateGet(show.ShowOne):
@@ -559,20 +806,13 @@ class CliAlarmStateGet(show.ShowOne):
         _check_name_and_id(parsed_args, 'get state of')
         c = utils.get_client(self)
 
-        if parsed_args.name:
-            _id = _find_alarm_id_by_name(c, parsed_args.name)
-        elif uuidutils.is_uuid_like(parsed_args.id):
-            try:
-                state = c.alarm.get_state(parsed_args.id)
-            except exceptions.NotFound:
-                # Maybe it was not an ID after all
-                _id = _find_alarm_id_by_name(c, parsed_args.id)
-            else:
-                return self.dict2columns({'state': state})
-        else:
-            _id = _find_alarm_id_by_name(c, parsed_args.id)
-
-        state = c.alarm.get_state(_id)
+        # NOTE: the state of an alarm fetched to find its ID is used as
+        # is, it is as recent as the one get_state() would return.
+        state = _call_with_alarm_id(
+            c, parsed_args.name or parsed_args.id,
+            lambda _id, alarm: (alarm['state'] if alarm is not None
+                                else c.alarm.get_state(_id)),
+            is_name=bool(parsed_args.name))
         return self.dict2columns({'state': state})
 
 
@@ -594,18 +834,8 @@ class CliAlarmStateSet(show.ShowOne):
         _check_name_and_id(parsed_args, 'set state of')
         c = utils.get_client(self)
 
-        if parsed_args.name:
-            _id = _find_alarm_id_by_name(c, parsed_args.name)
-        elif uuidutils.is_uuid_like(parsed_args.id):
-            try:
-                state = c.alarm.set_state(parsed_args.id, parsed_args.state)
-            except exceptions.NotFound:
-                # Maybe it was not an ID after all
-                _id = _find_alarm_id_by_name(c, parsed_args.id)
-            else:
-                return self.dict2columns({'state': state})
-        else:
-            _id = _find_alarm_id_by_name(c, parsed_args.id)
-
-        state = c.alarm.set_state(_id, parsed_args.state)
+        state = _call_with_alarm_id(
+            c, parsed_args.name or parsed_args.id,
+            lambda _id, alarm: c.alarm.set_state(_id, parsed_args.state),
+            is_name=bool(parsed_args.name))
         return self.dict2columns({'state': state})
@@ -11,12 +11,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
 from oslo_serialization import jsonutils
 
+from aodhclient import tracing
 from aodhclient import utils
 from aodhclient.v2 import base
 
 
+@tracing.trace_cls('alarm_history')
 class AlarmHistoryManager(base.Manager):
 
     url = "v2/alarms/%s/history"
@@ -40,13 +44,166 @@ class AlarmHistoryManager(base.Manager):
             url = f"{url}?{pagination}"
         return self._get(url).json()
 
-    def search(self, query=None):
+    def search(self, query=None, stream=False, limit=None, orderby=None):
         """List of history matching corresponding query
 
         :param query: The query dictionary
         :type query: dict
+        :param stream: return an iterator decoding the history entries as
+                       they are received, instead of a list
+        :type stream: bool
+        :param limit: maximum number of entries to return
+        :type limit: int
+        :param orderby: attributes to order the entries by, for example
+                        [{"timestamp": "desc"}]
+        :type orderby: list of dict
         """
         query = {'filter': query} if query else {}
+        if orderby:
+            query['orderby'] = jsonutils.dumps(orderby)
+        if limit:
+            query['limit'] = limit
         url = "v2/query/alarms/history"
+        if stream:
+            return self._iter_json(self._post(
+                url, headers={'Content-Type': "application/json"},
+                data=jsonutils.dumps(query), stream=True))
         return self._post(url, headers={'Content-Type': "application/json"},
                           data=jsonutils.dumps(query)).json()
+
+    def iter_search(self, query=None, page_size=1000, start=None, end=None):
+        """Iterate over the history matching a query, in timestamp order.
+
+        The entries are requested in windows of at most `page_size` entries
+        starting at the timestamp of the last entry received. The entries of
+        that timestamp already received are excluded by event_id, so the
+        ties between pages are neither lost nor repeated. Each page is
+        streamed.
+
+        :param query: The query, in the format of :py:meth:`search`
+        :type query: str
+        :param page_size: number of entries to request per page
+        :type page_size: int
+        :param start: timestamp of the first entries to return
+        :type start: str
+        :param end: timestamp before which to stop
+        :type end: str
+        """
+        if page_size < 1:
+            raise ValueError("The page size must be positive")
+        base_filter = []
+        if query:
+            base_filter.append(jsonutils.loads(query)
+                               if isinstance(query, str) else query)
+        if end:
+            base_filter.append({"<": {"timestamp": end}})
+        last_timestamp = start
+        seen = []
+        while True:
+            page_filter = list(base_filter)
+            if last_timestamp:
+                page_filter.append({">=": {"timestamp": last_timestamp}})
+            if seen:
+                page_filter.append({"not": {"in": {"event_id": seen}}})
+            if not page_filter:
+                page_query = None
+            elif len(page_filter) == 1:
+                page_query = jsonutils.dumps(page_filter[0])
+            else:
+                page_query = jsonutils.dumps({"and": page_filter})
+            count = new = 0
+            for entry in self.search(page_query, stream=True,
+                                     limit=page_size,
+                                     orderby=[{"timestamp": "asc"}]):
+                count += 1
+                if entry['event_id'] in seen:
+                    continue
+                new += 1
+                yield entry
+                if entry['timestamp'] != last_timestamp:
+                    last_timestamp = entry['timestamp']
+                    seen = []
+                seen.append(entry['event_id'])
+            # NOTE: a full page without new entries would be requested
+            # again and again.
+            if count < page_size or not new:
+                return
+
+    def _latest(self, alarm_id, query, count):
+        """Return the `count` latest entries, newest first."""
+        if alarm_id:
+            return self.get(alarm_id, limit=count, sorts=['timestamp:desc'])
+        return self.search(query, limit=count,
+                           orderby=[{"timestamp": "desc"}])
+
+    def _since(self, alarm_id, query, timestamp, page_size):
+        """Yield the entries from a timestamp, in any order."""
+        if not alarm_id:
+            yield from self.iter_search(query, page_size=page_size,
+                                        start=timestamp)
+            return
+        marker = None
+        while True:
+            page = self.get(alarm_id, limit=page_size, marker=marker,
+                            sorts=['timestamp:desc'])
+            for entry in page:
+                if entry['timestamp'] < timestamp:
+                    return
+                yield entry
+            if len(page) < page_size:
+                return
+            marker = page[-1]['event_id']
+
+    def tail(self, alarm_id=None, query=None, lines=10, interval=2,
+             max_interval=30, page_size=100):
+        """Follow the new history entries of an alarm or of a query.
+
+        The `lines` latest entries are yielded first, then the history is
+        polled and only the entries newer than the high-water mark, the
+        timestamp of the last entry yielded and the event_ids seen for it,
+        are yielded, in timestamp order. The polling interval doubles after
+        each poll without new entries, up to `max_interval`, and is reset
+        when new entries are found. The generator never ends by itself.
+
+        :param alarm_id: ID of the alarm to follow, all the history visible
+                         to the project is followed if not set
+        :type alarm_id: str
+        :param query: query of the entries to follow, in the format of
+                      :py:meth:`search`, when no alarm_id is set
+        :type query: str
+        :param lines: number of existing entries to yield first
+        :type lines: int
+        :param interval: minimum number of seconds between polls
+        :type interval: float
+        :param max_interval: maximum number of seconds between polls
+        :type max_interval: float
+        :param page_size: number of entries requested per page
+        :type page_size: int
+        """
+        if alarm_id and query:
+            raise ValueError("alarm_id and query are mutually exclusive")
+        # NOTE: at least one entry is needed to set the high-water mark
+        latest = self._latest(alarm_id, query, max(lines, 1))
+        timestamp = latest[0]['timestamp'] if latest else ''
+        seen = {e['event_id'] for e in latest
+                if e['timestamp'] == timestamp}
+        yield from reversed(latest[:lines])
+
+        delay = interval
+        while True:
+            time.sleep(delay)
+            new = [e for e in self._since(alarm_id, query, timestamp,
+                                          page_size)
+                   if e['timestamp'] > timestamp or
+                   e['event_id'] not in seen]
+            if not new:
+                delay = min(delay * 2, max_interval)
+                continue
+            delay = interval
+            new.sort(key=lambda e: e['timestamp'])
+            for entry in new:
+                if entry['timestamp'] != timestamp:
+                    timestamp = entry['timestamp']
+                    seen = set()
+                seen.add(entry['event_id'])
+                yield entry
@@ -10,10 +10,16 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import itertools
+import os
+
+from cliff import command
 from cliff import lister
 from oslo_serialization import jsonutils
 
+from aodhclient import exceptions
 from aodhclient import utils
+from aodhclient.v2 import alarm_history_store
 
 
 class CliAlarmHistorySearch(lister.Lister):
@@ -25,18 +31,73 @@ class CliAlarmHistorySearch(lister.Lister):
         parser = super().get_parser(prog_name)
         parser.add_argument("--query",
                             help="Rich query supported by aodh, "
-                                 "e.g. project_id!=my-id "
-                                 "user_id=foo or user_id=bar"),
+                                 "e.g. project_id!='my-id' and "
+                                 "(user_id=foo or user_id=bar)"),
+        parser.add_argument("--limit", type=int, metavar="<LIMIT>",
+                            help="Number of resources to return "
+                                 "(Default is server default)")
+        parser.add_argument("--sort", action="append",
+                            metavar="<SORT_KEY:SORT_DIR>",
+                            help="Sort of resource attribute, "
+                                 "e.g. timestamp:desc")
+        parser.add_argument("--page-size", type=int, metavar="<PAGE_SIZE>",
+                            help="Search all the history in timestamp "
+                                 "order, fetching it page by page with "
+                                 "this number of entries per request.")
+        parser.add_argument("--local", metavar="<FILE>",
+                            help="Search the history exported to a file "
+                                 "by alarm-history export instead of the "
+                                 "API.")
         return parser
 
+    @staticmethod
+    def _orderby(sorts):
+        orderby = []
+        for sort in sorts or []:
+            key, _, direction = sort.partition(':')
+            orderby.append({key: direction or 'asc'})
+        return orderby
+
+    def _search_local(self, parsed_args):
+        if parsed_args.page_size:
+            raise exceptions.CommandError(
+                "Local and page size options are mutually exclusive.")
+        if not os.path.exists(parsed_args.local):
+            raise exceptions.CommandError(
+                "File %s does not exist." % parsed_args.local)
+        query = None
+        if parsed_args.query:
+            query = utils.search_query_builder(parsed_args.query)
+        try:
+            store = alarm_history_store.open_store(parsed_args.local)
+            # NOTE: get the first entry so invalid queries fail here
+            history = store.search(query, limit=parsed_args.limit,
+                                   orderby=self._orderby(parsed_args.sort))
+            first = list(itertools.islice(history, 1))
+        except (ImportError, ValueError) as e:
+            raise exceptions.CommandError(str(e))
+        return utils.iter2cols(self.COLS, itertools.chain(first, history))
+
     def take_action(self, parsed_args):
+        if parsed_args.local:
+            return self._search_local(parsed_args)
         query = None
         if parsed_args.query:
             query = jsonutils.dumps(
                 utils.search_query_builder(parsed_args.query))
-        history = utils.get_client(self).alarm_history.search(
-            query=query)
-        return utils.list2cols(self.COLS, history)
+        c = utils.get_client(self)
+        if parsed_args.page_size:
+            if parsed_args.limit or parsed_args.sort:
+                raise exceptions.CommandError(
+                    "Page size, limit and sort options are mutually "
+                    "exclusive.")
+            history = c.alarm_history.iter_search(
+                query=query, page_size=parsed_args.page_size)
+        else:
+            history = c.alarm_history.search(
+                query=query, stream=True, limit=parsed_args.limit,
+                orderby=self._orderby(parsed_args.sort))
+        return utils.iter2cols(self.COLS, history)
 
 
 class CliAlarmHistoryShow(lister.Lister):
@@ -66,3 +127,96 @@ class CliAlarmHistoryShow(lister.Lister):
             alarm_id=parsed_args.alarm_id, sorts=parsed_args.sort,
             limit=parsed_args.limit, marker=parsed_args.marker)
         return utils.list2cols(self.COLS, history)
+
+
+class CliAlarmHistoryExport(command.Command):
+    """Export the alarm history matching a query to a local file"""
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument("--query",
+                            help="Rich query of the history entries to "
+                                 "export, e.g. project_id='my-id' and "
+                                 "timestamp>'2016-03-09T01:22:35'")
+        parser.add_argument("--output", metavar="<FILE>", required=True,
+                            help="File to export to, its format depends on "
+                                 "its extension: .sqlite, .parquet or "
+                                 ".arrow. The entries are added to an "
+                                 "existing SQLite file, other files are "
+                                 "replaced. Parquet and Arrow files "
+                                 "require pyarrow.")
+        parser.add_argument("--page-size", type=int, metavar="<PAGE_SIZE>",
+                            default=1000,
+                            help="Number of entries fetched per request "
+                                 "(Default is 1000)")
+        return parser
+
+    def take_action(self, parsed_args):
+        try:
+            store = alarm_history_store.open_store(parsed_args.output)
+        except (ImportError, ValueError) as e:
+            raise exceptions.CommandError(str(e))
+        query = None
+        if parsed_args.query:
+            query = jsonutils.dumps(
+                utils.search_query_builder(parsed_args.query))
+        history = utils.get_client(self).alarm_history.iter_search(
+            query=query, page_size=parsed_args.page_size)
+        count = store.write(history)
+        self.app.stdout.write("Exported %d alarm history entries to %s\n" %
+                              (count, parsed_args.output))
+
+
+class CliAlarmHistoryTail(command.Command):
+    """Follow the new history entries of an alarm or of a query"""
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument("alarm_id", metavar="<alarm-id>", nargs='?',
+                            help="ID of an alarm, the history of all the "
+                                 "alarms is followed if not set")
+        parser.add_argument("--query",
+                            help="Rich query of the history entries to "
+                                 "follow, e.g. project_id='my-id' and "
+                                 "type=\"state transition\"")
+        parser.add_argument("-n", "--lines", type=int, metavar="<LINES>",
+                            default=10,
+                            help="Number of existing entries to output "
+                                 "first (Default is 10)")
+        parser.add_argument("--interval", type=float, metavar="<SECONDS>",
+                            default=2,
+                            help="Minimum number of seconds between polls "
+                                 "(Default is 2)")
+        parser.add_argument("--max-interval", type=float,
+                            metavar="<SECONDS>", default=30,
+                            help="Maximum number of seconds between polls, "
+                                 "the interval grows up to it while there "
+                                 "are no new entries (Default is 30)")
+        return parser
+
+    def take_action(self, parsed_args):
+        if parsed_args.alarm_id and parsed_args.query:
+            raise exceptions.CommandError(
+                "Alarm ID and --query options are mutually exclusive.")
+        if parsed_args.interval <= 0 or (parsed_args.max_interval <
+                                         parsed_args.interval):
+            raise exceptions.CommandError(
+                "The interval must be positive and not greater than the "
+                "maximum interval.")
+        query = None
+        if parsed_args.query:
+            query = jsonutils.dumps(
+                utils.search_query_builder(parsed_args.query))
+        history = utils.get_client(self).alarm_history.tail(
+            alarm_id=parsed_args.alarm_id, query=query,
+            lines=max(parsed_args.lines, 0),
+            interval=parsed_args.interval,
+            max_interval=parsed_args.max_interval)
+        try:
+            for entry in history:
+                self.app.stdout.write("%s %s %s %s\n" % (
+                    entry['timestamp'], entry['alarm_id'], entry['type'],
+                    entry['detail']))
+                self.app.stdout.flush()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,250 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Local files storing alarm history exported from the API.
+
+SQLite files are indexed on alarm_id, timestamp and type. Parquet and Arrow
+files require pyarrow, their rows are stored in timestamp order so that the
+statistics of their row groups skip most of the file for time ranges.
+"""
+
+import functools
+import itertools
+import operator
+import os
+import re
+import sqlite3
+
+from oslo_utils import importutils
+
+COLUMNS = ('event_id', 'alarm_id', 'timestamp', 'type', 'detail',
+           'severity', 'user_id', 'project_id', 'on_behalf_of')
+INDEXED_COLUMNS = ('alarm_id', 'timestamp', 'type')
+
+_ARROW_OPERATORS = {'=': operator.eq, '!=': operator.ne,
+                    '<': operator.lt, '<=': operator.le,
+                    '>': operator.gt, '>=': operator.ge}
+_SQL_OPERATORS = {'=': '=', '==': '=', 'eq': '=', '!=': '!=', 'ne': '!=',
+                  '<': '<', 'lt': '<', '<=': '<=', 'le': '<=',
+                  '>': '>', 'gt': '>', '>=': '>=', 'ge': '>='}
+# NOTE: the fields are stored as received, as strings, the numbers and the
+# booleans of the queries are compared to the fields matching them.
+_NUMBER_RE = r"^\s*[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?\s*$"
+_NUMBER_MATCH = re.compile(_NUMBER_RE).match
+
+
+def _number(text):
+    """Return the number of a field, None if it is not a number."""
+    if text is None or not _NUMBER_MATCH(text):
+        return None
+    return float(text)
+
+
+def _condition(query):
+    """Return the (operator, field, value) of a query condition."""
+    if not isinstance(query, dict) or len(query) != 1:
+        raise ValueError("Invalid query %r" % query)
+    op, operand = next(iter(query.items()))
+    if op in ('and', 'or', 'not'):
+        return op, None, operand
+    if op not in _SQL_OPERATORS:
+        raise ValueError("Unsupported operator %r" % op)
+    if not isinstance(operand, dict) or len(operand) != 1:
+        raise ValueError("Invalid condition %r" % query)
+    field, value = next(iter(operand.items()))
+    if field not in COLUMNS:
+        raise ValueError("Unknown alarm history field %r, expected one of "
+                         "%s" % (field, ", ".join(COLUMNS)))
+    return _SQL_OPERATORS[op], field, value
+
+
+def _orderby(orderby):
+    for item in orderby or []:
+        for field, direction in item.items():
+            if field not in COLUMNS:
+                raise ValueError("Unknown alarm history field %r" % field)
+            if direction.lower() not in ('asc', 'desc'):
+                raise ValueError("Invalid sort direction %r" % direction)
+            yield field, direction.lower()
+
+
+class SQLiteStore:
+    """Alarm history stored in a SQLite database.
+
+    Entries are keyed by event_id, exporting again to the same file adds
+    the new entries and replaces the existing ones.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.create_function('aodh_number', 1, _number, deterministic=True)
+        conn.execute("CREATE TABLE IF NOT EXISTS alarm_history (%s)" %
+                     ", ".join(c + (" TEXT PRIMARY KEY" if c == 'event_id'
+                                    else " TEXT") for c in COLUMNS))
+        for column in INDEXED_COLUMNS:
+            conn.execute("CREATE INDEX IF NOT EXISTS alarm_history_%s "
+                         "ON alarm_history (%s)" % (column, column))
+        return conn
+
+    def write(self, entries, batch_size=1000):
+        """Store the entries, return their number."""
+        sql = "INSERT OR REPLACE INTO alarm_history VALUES (%s)" % (
+            ", ".join("?" * len(COLUMNS)))
+        count = 0
+        entries = iter(entries)
+        conn = self._connect()
+        try:
+            while True:
+                batch = [tuple(e.get(c) for c in COLUMNS)
+                         for e in itertools.islice(entries, batch_size)]
+                if not batch:
+                    return count
+                with conn:
+                    conn.executemany(sql, batch)
+                count += len(batch)
+        finally:
+            conn.close()
+
+    @classmethod
+    def _where(cls, query, params):
+        op, field, value = _condition(query)
+        if op in ('and', 'or'):
+            return "(%s)" % (" %s " % op.upper()).join(
+                cls._where(q, params) for q in value)
+        if op == 'not':
+            return "NOT (%s)" % cls._where(value, params)
+        if value is None and op in ('=', '!='):
+            return "%s IS %sNULL" % (field, "" if op == '=' else "NOT ")
+        if isinstance(value, bool):
+            params.append('true' if value else 'false')
+            return "LOWER(%s) %s ?" % (field, op)
+        params.append(value)
+        if isinstance(value, (int, float)):
+            return "aodh_number(%s) %s ?" % (field, op)
+        return "%s %s ?" % (field, op)
+
+    def search(self, query=None, limit=None, orderby=None):
+        """Yield the entries matching a query, as built by the CLI."""
+        params = []
+        sql = "SELECT %s FROM alarm_history" % ", ".join(COLUMNS)
+        if query:
+            sql += " WHERE " + self._where(query, params)
+        sort = ["%s %s" % s for s in _orderby(orderby)] or ["timestamp"]
+        sql += " ORDER BY " + ", ".join(sort)
+        if limit:
+            sql += " LIMIT %d" % limit
+        conn = self._connect()
+        try:
+            for row in conn.execute(sql, params):
+                yield dict(zip(COLUMNS, row))
+        finally:
+            conn.close()
+
+
+class ArrowStore:
+    """Alarm history stored in a Parquet or an Arrow IPC file.
+
+    Exporting to an existing file replaces it.
+    """
+
+    def __init__(self, path, file_format):
+        # NOTE: pyarrow is slow to import, only do it when needed
+        self.pyarrow = importutils.try_import('pyarrow')
+        if self.pyarrow is None:
+            raise ImportError("pyarrow is required to use %s files" %
+                              file_format)
+        self.path = path
+        self.file_format = file_format
+
+    def _schema(self):
+        return self.pyarrow.schema([(c, self.pyarrow.string())
+                                    for c in COLUMNS])
+
+    def _writer(self, schema):
+        if self.file_format == 'parquet':
+            from pyarrow import parquet
+            return parquet.ParquetWriter(self.path, schema)
+        from pyarrow import ipc
+        return ipc.new_file(self.path, schema)
+
+    def write(self, entries, batch_size=10000):
+        """Store the entries, return their number."""
+        schema = self._schema()
+        count = 0
+        entries = iter(entries)
+        with self._writer(schema) as writer:
+            while True:
+                batch = list(itertools.islice(entries, batch_size))
+                if not batch:
+                    return count
+                writer.write_table(self.pyarrow.Table.from_pylist(
+                    [{c: e.get(c) for c in COLUMNS} for e in batch],
+                    schema=schema))
+                count += len(batch)
+
+    @classmethod
+    def _expression(cls, query):
+        import pyarrow
+        from pyarrow import compute
+        op, field, value = _condition(query)
+        if op in ('and', 'or'):
+            return functools.reduce(
+                operator.and_ if op == 'and' else operator.or_,
+                [cls._expression(q) for q in value])
+        if op == 'not':
+            return ~cls._expression(value)
+        column = compute.field(field)
+        if value is None and op in ('=', '!='):
+            return column.is_null() if op == '=' else column.is_valid()
+        if isinstance(value, bool):
+            return _ARROW_OPERATORS[op](compute.utf8_lower(column),
+                                        'true' if value else 'false')
+        if isinstance(value, (int, float)):
+            number = compute.if_else(
+                compute.match_substring_regex(column, _NUMBER_RE), column,
+                pyarrow.scalar(None, pyarrow.string()))
+            return _ARROW_OPERATORS[op](number.cast('float64'), value)
+        return _ARROW_OPERATORS[op](column, str(value))
+
+    def search(self, query=None, limit=None, orderby=None):
+        """Yield the entries matching a query, as built by the CLI."""
+        from pyarrow import dataset
+        data = dataset.dataset(self.path, format=(
+            'parquet' if self.file_format == 'parquet' else 'ipc'))
+        filter_ = self._expression(query) if query else None
+        sort = list(_orderby(orderby))
+        if sort:
+            table = data.to_table(filter=filter_).sort_by(
+                [(f, 'ascending' if d == 'asc' else 'descending')
+                 for f, d in sort])
+            rows = iter(table.to_pylist())
+        else:
+            rows = (row for batch in data.to_batches(filter=filter_)
+                    for row in batch.to_pylist())
+        yield from itertools.islice(rows, limit or None)
+
+
+def open_store(path):
+    """Return the store of a file, its format depends on its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.sqlite', '.sqlite3', '.db'):
+        return SQLiteStore(path)
+    if ext == '.parquet':
+        return ArrowStore(path, 'parquet')
+    if ext in ('.arrow', '.feather'):
+        return ArrowStore(path, 'arrow')
+    raise ValueError("Unsupported file extension %r, use .sqlite, "
+                     ".parquet or .arrow" % ext)
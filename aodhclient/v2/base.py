@@ -13,6 +13,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from concurrent import futures
+import functools
+import time
+
+from aodhclient import exceptions
+from aodhclient import timing
+from aodhclient import tracing
+from aodhclient import utils
+
+# NOTE: size of the chunks read from the responses decoded in streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+QUERY_URL_PREFIX = 'v2/query/'
+
 
 class Manager:
     DEFAULT_HEADERS = {
@@ -30,22 +43,132 @@ class Manager:
         kwargs['headers'] = headers
         return kwargs
 
-    def _get(self, *args, **kwargs):
-        self._set_default_headers(kwargs)
-        return self.client.api.get(*args, **kwargs)
+    @property
+    def _response_cache(self):
+        return getattr(self.client, 'response_cache', None)
 
-    def _post(self, *args, **kwargs):
-        self._set_default_headers(kwargs)
-        return self.client.api.post(*args, **kwargs)
+    def _invalidate(self, url):
+        # NOTE: the complex queries are sent with POST but only read
+        if url.startswith(QUERY_URL_PREFIX):
+            return
+        if self._response_cache is not None:
+            self._response_cache.invalidate(self.client.api, url)
+        coalescer = getattr(self.client, 'request_coalescer', None)
+        if coalescer is not None:
+            coalescer.clear()
 
-    def _put(self, *args, **kwargs):
-        self._set_default_headers(kwargs)
-        return self.client.api.put(*args, **kwargs)
+    def _timed(self, method, send, url, *args, **kwargs):
+        with tracing.span('http', {'request': {'method': method,
+                                               'path': url}}):
+            return self._send_timed(method, send, url, *args, **kwargs)
+
+    def _send_timed(self, method, send, url, *args, **kwargs):
+        timings = getattr(self.client, 'timings', None)
+        if timings is None:
+            return send(url, *args, **kwargs)
+        # NOTE: the time the API client sleeps before sending the request
+        # or retrying it is not spent in HTTP.
+        waited = getattr(self.client.api, 'wait_time', 0.0)
+        start = time.perf_counter()
+        try:
+            resp = send(url, *args, **kwargs)
+        except exceptions.ClientException as e:
+            wait_time = getattr(self.client.api, 'wait_time', 0.0) - waited
+            timings.record(method, url, e.code,
+                           latency=time.perf_counter() - start - wait_time,
+                           wait_time=wait_time)
+            raise
+        wait_time = getattr(self.client.api, 'wait_time', 0.0) - waited
+        latency = time.perf_counter() - start - wait_time
+        elapsed = getattr(resp, 'elapsed', None)
+        record = timings.record(
+            method, url, resp.status_code, latency=latency,
+            wait_time=wait_time,
+            # NOTE: streamed bodies are counted as they are read
+            bytes=0 if kwargs.get('stream') else len(resp.content or b''),
+            server_time=elapsed.total_seconds() if elapsed else None)
+        return timing.TimedResponse(resp, record, time.perf_counter)
 
-    def _patch(self, *args, **kwargs):
+    def _send_get(self, url, **kwargs):
+        if self._response_cache is not None and not kwargs.get('stream'):
+            return self._timed(
+                'GET', functools.partial(self._response_cache.get,
+                                         self.client.api), url, **kwargs)
+        return self._timed('GET', self.client.api.get, url, **kwargs)
+
+    def _get(self, url, **kwargs):
         self._set_default_headers(kwargs)
-        return self.client.api.patch(*args, **kwargs)
+        coalescer = getattr(self.client, 'request_coalescer', None)
+        if coalescer is None or set(kwargs) != {'headers'}:
+            return self._send_get(url, **kwargs)
+        # NOTE: the responses are shared, json() returns new objects for
+        # each caller as it decodes the body on each call.
+        key = (id(self.client.api), url,
+               tuple(sorted(kwargs['headers'].items())))
+        return coalescer.call(key, self._send_get, url, **kwargs)
 
-    def _delete(self, *args, **kwargs):
+    def _write(self, method, send, url, *args, **kwargs):
         self._set_default_headers(kwargs)
-        return self.client.api.delete(*args, **kwargs)
+        try:
+            return self._timed(method, send, url, *args, **kwargs)
+        finally:
+            # NOTE: a GET sent during the write could cache the previous
+            # version again if invalidated before it.
+            self._invalidate(url)
+
+    def _post(self, url, *args, **kwargs):
+        return self._write('POST', self.client.api.post, url, *args,
+                           **kwargs)
+
+    def _put(self, url, *args, **kwargs):
+        return self._write('PUT', self.client.api.put, url, *args,
+                           **kwargs)
+
+    def _patch(self, url, *args, **kwargs):
+        return self._write('PATCH', self.client.api.patch, url, *args,
+                           **kwargs)
+
+    def _delete(self, url, *args, **kwargs):
+        return self._write('DELETE', self.client.api.delete, url, *args,
+                           **kwargs)
+
+    @staticmethod
+    def _iter_json(resp):
+        """Yield the items of the JSON array of a streamed response.
+
+        The connection is released once the array has been consumed, or
+        when the iterator is closed.
+        """
+        try:
+            yield from utils.iter_json_array(
+                resp.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        finally:
+            resp.close()
+
+    @staticmethod
+    def _run_concurrently(func, items, concurrency):
+        """Call func on each item from a pool of worker threads.
+
+        Items are consumed lazily and at most `concurrency` calls are in
+        flight at the same time. An (index, item, result, error) tuple is
+        yielded for each item as soon as its call is done, a failing call
+        does not stop the others.
+        """
+        func = tracing.propagate(func)
+        with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = {}
+
+            def collect(done):
+                for future in done:
+                    index, item = pending.pop(future)
+                    error = future.exception()
+                    result = None if error else future.result()
+                    yield index, item, result, error
+
+            for index, item in enumerate(items):
+                pending[executor.submit(func, item)] = index, item
+                if len(pending) >= concurrency:
+                    done, _ = futures.wait(
+                        pending, return_when=futures.FIRST_COMPLETED)
+                    yield from collect(done)
+            yield from collect(futures.as_completed(list(pending)))
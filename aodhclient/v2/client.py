@@ -26,10 +26,47 @@ class Client:
 
     :param string session: session
     :type session: :py:class:`keystoneauth.adapter.Adapter`
+    :param pool_maxsize: maximum number of connections kept open per host
+    :type pool_maxsize: int
+    :param pool_block: wait for a pooled connection instead of opening a new
+                       one when the pool is full
+    :type pool_block: bool
+    :param keep_alive: send TCP keep-alive probes on idle connections
+    :type keep_alive: bool
+    :param retry_policy: policy retrying the requests rejected by a rate
+                         limit or an unavailable server
+    :type retry_policy: :py:class:`aodhclient.retry.RetryPolicy`
+    :param rate_limiter: limiter of the rate of requests
+    :type rate_limiter: :py:class:`aodhclient.ratelimit.RateLimiter`
+    :param response_cache: cache of the GET responses, revalidated with
+                           conditional requests
+    :type response_cache: :py:class:`aodhclient.cache.ResponseCache`
+    :param request_coalescer: coalescer sharing one response between the
+                              identical GET requests sent at the same time
+    :type request_coalescer: :py:class:`aodhclient.coalesce.RequestCoalescer`
+    :param timings: collector of the timings of the requests
+    :type timings: :py:class:`aodhclient.timing.TimingCollector`
+
+    The connection pool options are applied to the session, and so to all
+    the clients sharing it. The session is left as is when none of them is
+    set, see :py:func:`aodhclient.client.create_session`.
     """
 
-    def __init__(self, session=None, service_type='alarming', **kwargs):
+    def __init__(self, session=None, service_type='alarming',
+                 pool_maxsize=None, pool_block=None, keep_alive=None,
+                 response_cache=None, request_coalescer=None, timings=None,
+                 **kwargs):
         """Initialize a new client for the Aodh v2 API."""
+        pool_options = (pool_maxsize, pool_block, keep_alive)
+        if session is not None and any(o is not None for o in pool_options):
+            client.configure_connection_pool(
+                session,
+                pool_maxsize=pool_maxsize or client.DEFAULT_POOL_MAXSIZE,
+                pool_block=bool(pool_block),
+                keep_alive=keep_alive is not False)
+        self.response_cache = response_cache
+        self.request_coalescer = request_coalescer
+        self.timings = timings
         self.api = client.SessionClient(session, service_type=service_type,
                                         **kwargs)
         self.alarm = alarm.AlarmManager(self)
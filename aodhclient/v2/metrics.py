@@ -11,9 +11,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from aodhclient import tracing
 from aodhclient.v2 import base
 
 
+@tracing.trace_cls('metrics')
 class MetricsManager(base.Manager):
 
     url = "v2/metrics"
@@ -12,9 +12,11 @@
 #    under the License.
 from oslo_serialization import jsonutils
 
+from aodhclient import tracing
 from aodhclient.v2 import base
 
 
+@tracing.trace_cls('quota')
 class QuotasManager(base.Manager):
     base_url = "v2/quotas"
 